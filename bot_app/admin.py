@@ -1,9 +1,13 @@
 from django.contrib import admin
+from django.db.models import F
+from django.utils import timezone
 
 from .models import (
     BotClient, PassengerTravel, PassengerPost,
-    Driver, Car, DriverTransaction, City, Order, Passenger, DriverGallery, CityPrice
+    Driver, Car, DriverTransaction, City, Order, Passenger, DriverGallery, CityPrice, TransactionKind
 )
+from .services.driver_ledger import driver_ledger
+from .services.driver_registry import driver_registry, safe_registry_call
 
 admin.site.site_header = "Taxi Bot Admin"
 admin.site.site_title = "Taxi Bot Administration"
@@ -66,10 +70,24 @@ class CarInline(admin.TabularInline):
 
 
 class DriverTransactionInline(admin.TabularInline):
+    """Ledger append-only: mavjud yozuvlar faqat o'qiladi, yangilari DriverAdmin.save_formset da"""
     model = DriverTransaction
     extra = 1
+    can_delete = False
+    fields = ("amount", "kind", "order", "created_at")
+    raw_id_fields = ("order",)
     readonly_fields = ("created_at",)
 
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def formfield_for_choice_field(self, db_field, request, **kwargs):
+        # Komissiya order dan, boshlang'ich/legacy yozuvlar ledger ning o'zidan yoziladi
+        if db_field.name == "kind":
+            manual = (TransactionKind.TOP_UP, TransactionKind.CHARGE, TransactionKind.ADJUSTMENT)
+            kwargs["choices"] = [choice for choice in TransactionKind.choices if choice[0] in manual]
+        return super().formfield_for_choice_field(db_field, request, **kwargs)
+
 class DriverGalleryInline(admin.StackedInline):
     """DriverGallery modelini Driver adminida inline ko'rinishda ko'rsatish"""
     model = DriverGallery
@@ -83,11 +101,32 @@ class DriverAdmin(admin.ModelAdmin):
     list_display = ("new_full_name", "car_info", "phone", "status", "locations", "amount",)
     list_filter = ("phone", "status")
     search_fields = ("telegram_id", "phone")
-    list_editable = ("amount", "status")
+    list_editable = ("status",)
     inlines = [DriverGalleryInline, CarInline, DriverTransactionInline]
     readonly_fields = ("created_at", "updated_at")
     ordering = ("-created_at",)
 
+    def get_readonly_fields(self, request, obj=None):
+        # Mavjud haydovchi balansi faqat tranzaksiya yozuvlari orqali o'zgaradi:
+        # amount ni ham, yozuvni ham o'zgartirish balansni ikki marta o'zgartirardi
+        if obj is not None:
+            return (*self.readonly_fields, "amount")
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Eskirgan amount qaytarib yozilmasin (parallel komissiya va ledger yozuvlari)
+        obj.save(update_fields=[
+            field.name for field in obj._meta.concrete_fields if not field.primary_key and field.name != 'amount'
+        ])
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not DriverTransaction:
+            return super().save_formset(request, form, formset, change)
+        for entry in formset.save(commit=False):
+            driver_ledger.post(form.instance.pk, entry.amount, entry.kind, order=entry.order)
+
     def locations(self, obj):
         return f"{obj.from_location} -> {obj.to_location}"
 
@@ -120,7 +159,7 @@ class CityPriceInline(admin.StackedInline):
 @admin.register(City)
 class CityAdmin(admin.ModelAdmin):
     # Ro'yxat ko'rinishi
-    list_display = ['title', 'get_subcategory', 'is_allowed', 'created_at']
+    list_display = ['title', 'get_subcategory', 'has_boundary', 'is_allowed', 'created_at']
     list_filter = ['is_allowed', 'created_at']
     search_fields = ['title']
 
@@ -143,6 +182,12 @@ class CityAdmin(admin.ModelAdmin):
 
     get_subcategory.short_description = "Subkategoriya"
 
+    def has_boundary(self, obj):
+        return bool(obj.boundary)
+
+    has_boundary.boolean = True
+    has_boundary.short_description = "Chegara"
+
 
 # CityPrice alohida admin (ixtiyoriy)
 @admin.register(CityPrice)
@@ -202,14 +247,19 @@ class OrderAdmin(admin.ModelAdmin):
 
     def make_ended(self, request, queryset):
         """Tanlangan orderlarni completed qilish"""
-        updated = queryset.update(status='ended')
+        # updated_at: DispatchIndex.sync o'zgarishni ko'rishi uchun (update() auto_now ni yangilamaydi)
+        driver_ids = list(queryset.values_list('driver_id', flat=True))
+        updated = queryset.update(status='ended', updated_at=timezone.now(), version=F('version') + 1)
+        safe_registry_call(driver_registry.recount_active, driver_ids)
         self.message_user(request, f'{updated} ta order completed holatiga o\'zgartirildi')
 
     make_ended.short_description = "Tanlangan orderlarni completed qilish"
 
     def make_rejected(self, request, queryset):
         """Tanlangan orderlarni cancelled qilish"""
-        updated = queryset.update(status='rejected')
+        driver_ids = list(queryset.values_list('driver_id', flat=True))
+        updated = queryset.update(status='rejected', updated_at=timezone.now(), version=F('version') + 1)
+        safe_registry_call(driver_registry.recount_active, driver_ids)
         self.message_user(request, f'{updated} ta order cancelled holatiga o\'zgartirildi')
 
     make_rejected.short_description = "Tanlangan orderlarni cancelled qilish"
@@ -1,6 +1,9 @@
 # filters.py
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
+
 from ..models import City
+from ..services.city_search import city_search
 
 
 class CityFilter(filters.FilterSet):
@@ -20,4 +23,13 @@ class CityFilter(filters.FilterSet):
     def filter_has_children(self, queryset, name, value):
         if value:
             return queryset.filter(children__isnull=False).distinct()
-        return queryset.filter(children__isnull=True)
\ No newline at end of file
+        return queryset.filter(children__isnull=True)
+
+class CitySearchFilter(SearchFilter):
+    """?search= ni icontains o'rniga city_search indeksi orqali (transliteratsiya va xatoli yozilish bilan)"""
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        return queryset.filter(id__in=city_search.match_ids(term))
@@ -1,8 +1,16 @@
 # bot_app/filters/driver_filter.py
+import logging
+
 from django.db.models.functions import Coalesce
 from django_filters import rest_framework as filters
 from django.db.models import Q, OuterRef, Exists, Subquery, Count
-from ..models import Driver, Car, DriverTransaction, DriverStatus, TravelClass, Order, TravelStatus
+from redis.exceptions import RedisError
+
+from ..models import ACTIVE_ORDER_STATUSES, Driver, Car, DriverTransaction, DriverStatus, TravelClass, Order
+from ..services.city_search import city_search
+from ..services.driver_registry import driver_registry
+
+logger = logging.getLogger(__name__)
 
 
 class DriverFilter(filters.FilterSet):
@@ -30,14 +38,20 @@ class DriverFilter(filters.FilterSet):
     # Yangi filter: Faqat bo'sh driverlarni olish
     exclude_busy = filters.BooleanFilter(method='filter_exclude_busy', label="Exclude busy drivers")
 
+    # Yo'nalishdagi bo'sh online haydovchilar (city id lar): driver registry to'plamlaridan
+    available_from = filters.NumberFilter(method='filter_available', label="Available drivers from city id")
+    available_to = filters.NumberFilter(method='filter_available_to', label="Available drivers to city id")
+
     class Meta:
         model = Driver
         fields = ['telegram_id', 'status', 'from_location', 'to_location', "exclude_busy"]
 
     def filter_by_location(self, queryset, name, value):
+        # Shahar nomi city_search orqali (transliteratsiya, xatoli yozilish) id larga aylantiriladi
+        city_ids = city_search.match_ids(value)
         return queryset.filter(
-            Q(from_location__title__icontains=value) |
-            Q(to_location__title__icontains=value)
+            Q(from_location_id__in=city_ids) |
+            Q(to_location_id__in=city_ids)
         )
 
     def filter_by_car_class(self, queryset, name, value):
@@ -58,31 +72,58 @@ class DriverFilter(filters.FilterSet):
 
     def filter_exclude_busy(self, queryset, name, value):
         """Faol orderlari 4 tadan ortiq bo'lgan driverlarni chiqarib tashlash"""
-        if value:
-            active_statuses = [
-                TravelStatus.CREATED,
-                TravelStatus.ASSIGNED,
-                TravelStatus.ARRIVED,
-                TravelStatus.STARTED
-            ]
-
-            # Faol orderlar sonini hisoblash
-            active_order_count = Order.objects.filter(
-                driver=OuterRef('pk'),
-                status__in=active_statuses
-            ).values('driver').annotate(
-                count=Count('id')
-            ).values('count')
-
-            # Faol orderlar sonini annotation qo'shish
-            queryset = queryset.annotate(
-                active_order_count=Coalesce(Subquery(active_order_count), 0)
-            ).filter(
-                active_order_count__lt=4  # 4 tadan kam bo'lgan driverlarni qaytarish
-            )
+        if not value:
+            return queryset
+
+        # Band haydovchilar Redis dagi driver registry da tayyor to'plam
+        try:
+            busy_ids = driver_registry.busy_driver_ids()
+        except RedisError as e:
+            logger.warning(f"Driver registry unavailable, counting active orders in SQL: {e}")
+            busy_ids = None
+        if busy_ids is not None:
+            return queryset.exclude(id__in=busy_ids)
+
+        # Faol orderlar sonini hisoblash
+        active_order_count = Order.objects.filter(
+            driver=OuterRef('pk'),
+            status__in=ACTIVE_ORDER_STATUSES
+        ).values('driver').annotate(
+            count=Count('id')
+        ).values('count')
+
+        # Faol orderlar sonini annotation qo'shish
+        return queryset.annotate(
+            active_order_count=Coalesce(Subquery(active_order_count), 0)
+        ).filter(
+            active_order_count__lt=driver_registry.max_active_orders
+        )
 
+
+    def filter_available(self, queryset, name, value):
+        """available_from (+ available_to): online, yo'nalishi mos va band bo'lmagan haydovchilar"""
+        from_city_id = int(value)
+        to_city_id = self.form.cleaned_data.get('available_to')
+        to_city_id = int(to_city_id) if to_city_id is not None else None
+
+        try:
+            driver_ids = driver_registry.available(from_city_id, to_city_id)
+        except RedisError as e:
+            logger.warning(f"Driver registry unavailable, filtering available drivers in SQL: {e}")
+            driver_ids = None
+        if driver_ids is not None:
+            return queryset.filter(id__in=driver_ids)
+
+        queryset = queryset.filter(status=DriverStatus.ONLINE, from_location_id=from_city_id)
+        if to_city_id is not None:
+            queryset = queryset.filter(to_location_id=to_city_id)
+        return self.filter_exclude_busy(queryset, 'exclude_busy', True)
+
+    def filter_available_to(self, queryset, name, value):
+        # filter_available da available_from bilan birga qo'llanadi
         return queryset
 
+
 class CarFilter(filters.FilterSet):
     car_number = filters.CharFilter(lookup_expr='icontains')
     car_model = filters.CharFilter(lookup_expr='icontains')
@@ -61,56 +61,11 @@ class OrderFilter(django_filters.FilterSet):
         }
 
     def filter_from_city(self, queryset, name, value):
-        from django.db.models import Q
-        from django.contrib.contenttypes.models import ContentType
-        from ..models import PassengerTravel, PassengerPost
-
-        try:
-            # Get content types
-            travel_content_type = ContentType.objects.get_for_model(PassengerTravel)
-            post_content_type = ContentType.objects.get_for_model(PassengerPost)
-
-            # Get travel objects with matching from_location
-            travel_ids = PassengerTravel.objects.filter(
-                from_location__city__icontains=value
-            ).values_list('id', flat=True)
-
-            # Get post objects with matching from_location
-            post_ids = PassengerPost.objects.filter(
-                from_location__city__icontains=value
-            ).values_list('id', flat=True)
-
-            return queryset.filter(
-                Q(content_type=travel_content_type, object_id__in=travel_ids) |
-                Q(content_type=post_content_type, object_id__in=post_ids)
-            )
-        except Exception as e:
-            # Log the error if needed
-            return queryset.none()
+        # Order.from_city denormalized (PostgreSQL da trigram indeks bilan)
+        return queryset.filter(from_city__icontains=value)
 
     def filter_to_city(self, queryset, name, value):
-        from django.db.models import Q
-        from django.contrib.contenttypes.models import ContentType
-        from ..models import PassengerTravel, PassengerPost
-
-        try:
-            travel_content_type = ContentType.objects.get_for_model(PassengerTravel)
-            post_content_type = ContentType.objects.get_for_model(PassengerPost)
-
-            travel_ids = PassengerTravel.objects.filter(
-                to_location__city__icontains=value
-            ).values_list('id', flat=True)
-
-            post_ids = PassengerPost.objects.filter(
-                to_location__city__icontains=value
-            ).values_list('id', flat=True)
-
-            return queryset.filter(
-                Q(content_type=travel_content_type, object_id__in=travel_ids) |
-                Q(content_type=post_content_type, object_id__in=post_ids)
-            )
-        except Exception:
-            return queryset.none()
+        return queryset.filter(to_city__icontains=value)
 
     def filter_created_today(self, queryset, name, value):
         if value:
@@ -150,55 +105,12 @@ class OrderFilter(django_filters.FilterSet):
 
     def filter_min_price(self, queryset, name, value):
         if value is not None:
-            from django.db.models import Q
-            from django.contrib.contenttypes.models import ContentType
-
-            # Import your related models
-            from ..models import PassengerTravel, PassengerPost
-
-            # Get content types for the models
-            travel_content_type = ContentType.objects.get_for_model(PassengerTravel)
-            post_content_type = ContentType.objects.get_for_model(PassengerPost)
-
-            # Get all travel objects with price >= value
-            travel_ids = PassengerTravel.objects.filter(
-                price__gte=value
-            ).values_list('id', flat=True)
-
-            # Get all post objects with price >= value
-            post_ids = PassengerPost.objects.filter(
-                price__gte=value
-            ).values_list('id', flat=True)
-
-            # Filter orders that reference these objects
-            return queryset.filter(
-                Q(content_type=travel_content_type, object_id__in=travel_ids) |
-                Q(content_type=post_content_type, object_id__in=post_ids)
-            )
+            return queryset.filter(price__gte=value)
         return queryset
 
     def filter_max_price(self, queryset, name, value):
         if value is not None:
-            from django.db.models import Q
-            from django.contrib.contenttypes.models import ContentType
-
-            from ..models import PassengerTravel, PassengerPost
-
-            travel_content_type = ContentType.objects.get_for_model(PassengerTravel)
-            post_content_type = ContentType.objects.get_for_model(PassengerPost)
-
-            travel_ids = PassengerTravel.objects.filter(
-                price__lte=value
-            ).values_list('id', flat=True)
-
-            post_ids = PassengerPost.objects.filter(
-                price__lte=value
-            ).values_list('id', flat=True)
-
-            return queryset.filter(
-                Q(content_type=travel_content_type, object_id__in=travel_ids) |
-                Q(content_type=post_content_type, object_id__in=post_ids)
-            )
+            return queryset.filter(price__lte=value)
         return queryset
 
     def filter_user_and_driver(self, queryset, name, value):
@@ -211,31 +123,9 @@ class OrderFilter(django_filters.FilterSet):
         return queryset
 
     def filter_travel_class(self, queryset, name, value):
-        from django.db.models import Q
-        from django.contrib.contenttypes.models import ContentType
-        from ..models import PassengerTravel, PassengerPost
-
         if value:
-            try:
-                travel_content_type = ContentType.objects.get_for_model(PassengerTravel)
-                post_content_type = ContentType.objects.get_for_model(PassengerPost)
-
-                # Get travel objects with matching travel_class
-                travel_ids = PassengerTravel.objects.filter(
-                    travel_class=value
-                ).values_list('id', flat=True)
-
-                posts_ids = PassengerPost.objects.all().values_list('id', flat=True)
-
-                # Return orders that reference these travel objects
-                return queryset.filter(
-                    Q(content_type=travel_content_type,
-                    object_id__in=travel_ids) |
-                    Q(content_type=post_content_type,
-                      object_id__in=posts_ids)
-                )
-            except (ValueError, TypeError):
-                return queryset.none()
+            # Pochtalar (travel_class="delivery") avvalgidek har doim qo'shiladi
+            return queryset.filter(travel_class__in=[value, "delivery"])
         return queryset
 
 class OrderSearchFilter(django_filters.FilterSet):
@@ -18,7 +18,7 @@ class PassengerPostFilter(django_filters.FilterSet):
 
     # If you want to search within specific keys of the JSON field
     from_city = django_filters.CharFilter(method='filter_from_city')
-    to_city = django_filters.CharFilter(field_name="to_location", lookup_expr='icontains')
+    to_city = django_filters.CharFilter(field_name="to_city", lookup_expr='icontains')
 
     class Meta:
         model = PassengerPost
@@ -29,7 +29,6 @@ class PassengerPostFilter(django_filters.FilterSet):
 
     def filter_from_city(self, queryset, name, value):
         """
-        Custom filter for searching city in from_location JSON field
-        Assuming from_location structure like: {"city": "Tashkent", ...}
+        from_location JSON dagi city bo'yicha qidirish (materialized from_city ustuni orqali)
         """
-        return queryset.filter(from_location__icontains=value)
\ No newline at end of file
+        return queryset.filter(from_city__icontains=value)
\ No newline at end of file
@@ -5,11 +5,11 @@ from ..models import PassengerTravel
 
 class PassengerTravelFilter(django_filters.FilterSet):
     from_city = django_filters.CharFilter(
-        field_name='from_location__city',
+        field_name='from_city',
         lookup_expr='icontains'
     )
     to_city = django_filters.CharFilter(
-        field_name='to_location__city',
+        field_name='to_city',
         lookup_expr='icontains'
     )
     min_price = django_filters.NumberFilter(
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from bot_app.tasks.city_tasks import fill_missing_city_coordinates
+
+
+class Command(BaseCommand):
+    help = 'Fill missing City latitude/longitude via Nominatim (bulk)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--country', default='uz')
+
+    def handle(self, *args, **options):
+        total = fill_missing_city_coordinates(country_code=options['country'])
+        self.stdout.write(self.style.SUCCESS(f'{total} cities without coordinates processed.'))
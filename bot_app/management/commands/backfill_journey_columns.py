@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from bot_app.models import Journey, PassengerPost, PassengerTravel
+
+
+class Command(BaseCommand):
+    help = 'Fill from_city/from_lat/from_lon/to_city/to_lat/to_lon from the location JSON in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--only-missing', action='store_true',
+            help='Only rows whose from_city and to_city are both empty'
+        )
+
+    def handle(self, *args, **options):
+        for model in (PassengerTravel, PassengerPost):
+            queryset = model.objects.only('id', 'from_location', 'to_location')
+            if options['only_missing']:
+                queryset = queryset.filter(from_city='', to_city='')
+
+            total = 0
+            last_id = 0
+            while True:
+                # id bo'yicha kursor: OFFSET siz, har bir chunk alohida tranzaksiyada
+                chunk = list(queryset.filter(id__gt=last_id).order_by('id')[:options['chunk_size']])
+                if not chunk:
+                    break
+                last_id = chunk[-1].id
+
+                for journey in chunk:
+                    journey.fill_location_columns()
+                model.objects.bulk_update(chunk, Journey.LOCATION_COLUMNS)
+
+                total += len(chunk)
+                self.stdout.write(f'  {model.__name__}: {total}', ending='\r')
+
+            self.stdout.write('')
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}: {total} rows updated.'))
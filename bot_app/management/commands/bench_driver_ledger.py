@@ -0,0 +1,106 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from bot_app.models import Driver, Order, TravelStatus
+from bot_app.services.driver_ledger import driver_ledger
+
+# Seed qilingan qatorlar haqiqiy ma'lumotlar bilan to'qnashmasligi uchun
+BENCH_TELEGRAM_ID = 9_100_000_000_000
+BENCH_USER = 9_100_000_000_000
+
+
+class Command(BaseCommand):
+    help = (
+        'Charge commission for many orders of one driver from parallel threads and check for lost updates: '
+        'the ledger (F() update) against the old read-modify-write. Seeded rows are deleted at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100, help='Parallel assignments (one thread each)')
+        parser.add_argument('--price', type=int, default=200_000)
+        parser.add_argument('--balance', type=int, default=10_000_000)
+        parser.add_argument('--naive', action='store_true', help='Also run the old driver.amount -= ... save()')
+
+    @staticmethod
+    def _naive_charge(order, driver_id):
+        # Ledger dan oldingi update_order signali
+        driver = Driver.objects.get(pk=driver_id)
+        driver.amount -= order.price * driver_ledger.commission_rate
+        driver.save()
+
+    @staticmethod
+    def _ledger_charge(order, driver_id):
+        driver_ledger.charge_commission(order, driver_id)
+
+    def _run(self, charge, orders, driver_id):
+        barrier = threading.Barrier(len(orders))
+        errors = []
+
+        def worker(order):
+            try:
+                barrier.wait()
+                charge(order, driver_id)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(order,)) for order in orders]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, errors
+
+    def _report(self, name, options, orders, driver_id, elapsed, errors):
+        commission = round(options['price'] * driver_ledger.commission_rate)
+        expected = options['balance'] - commission * (len(orders) - len(errors))
+        actual = driver_ledger.balance(driver_id)
+        lost = (actual - expected) / commission
+        style = self.style.SUCCESS if lost == 0 and not errors else self.style.ERROR
+        self.stdout.write(style(
+            f'{name:<8} {elapsed * 1000:8.1f} ms  expected {expected}  actual {actual:.0f}  '
+            f'lost updates {lost:g}  errors {len(errors)}'
+        ))
+        for error in errors[:3]:
+            self.stdout.write(f'  {type(error).__name__}: {error}')
+
+    def _seed(self, options):
+        Driver.objects.filter(telegram_id=BENCH_TELEGRAM_ID).delete()
+        driver = Driver.objects.create(
+            telegram_id=BENCH_TELEGRAM_ID, phone='bench-ledger', amount=options['balance']
+        )
+        orders = Order.objects.bulk_create([
+            Order(user=BENCH_USER, status=TravelStatus.ASSIGNED, price=options['price'])
+            for _ in range(options['orders'])
+        ])
+        return driver, orders
+
+    def _cleanup(self, driver, orders):
+        Order.objects.filter(pk__in=[order.pk for order in orders]).delete()
+        driver.delete()
+
+    def handle(self, *args, **options):
+        modes = [('ledger', self._ledger_charge)]
+        if options['naive']:
+            modes.insert(0, ('naive', self._naive_charge))
+
+        for name, charge in modes:
+            driver, orders = self._seed(options)
+            try:
+                elapsed, errors = self._run(charge, orders, driver.pk)
+                self._report(name, options, orders, driver.pk, elapsed, errors)
+
+                if name == 'ledger':
+                    # Takroriy biriktirish balansni o'zgartirmasligi kerak
+                    before = driver_ledger.balance(driver.pk)
+                    self._run(charge, orders, driver.pk)
+                    repeated = driver_ledger.balance(driver.pk) - before
+                    style = self.style.SUCCESS if repeated == 0 else self.style.ERROR
+                    self.stdout.write(style(f'{"replay":<8} balance change {repeated:g} (idempotency)'))
+            finally:
+                self._cleanup(driver, orders)
@@ -0,0 +1,52 @@
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from bot_app.services.location_service import GlobalLocationService
+from bot_app.utils.distance_utils import distances_from_point
+
+
+class Command(BaseCommand):
+    help = 'Benchmark scalar haversine loop against the vectorized NumPy version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 10_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def _best_of(self, repeat, func):
+        best = float('inf')
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - started)
+        return best, result
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        origin_lat, origin_lon = 41.311, 69.279  # Toshkent
+
+        self.stdout.write(f"{'points':>10} {'scalar ms':>12} {'numpy ms':>12} {'speedup':>10} {'max diff km':>12}")
+
+        for size in options['sizes']:
+            lats = [rng.uniform(37.0, 46.0) for _ in range(size)]
+            lons = [rng.uniform(56.0, 73.0) for _ in range(size)]
+            lats_array = np.asarray(lats)
+            lons_array = np.asarray(lons)
+
+            scalar_time, scalar = self._best_of(options['repeat'], lambda: [
+                GlobalLocationService.calculate_distance(origin_lat, origin_lon, lat, lon)
+                for lat, lon in zip(lats, lons)
+            ])
+            vector_time, vector = self._best_of(
+                options['repeat'],
+                lambda: distances_from_point(origin_lat, origin_lon, lats_array, lons_array)
+            )
+
+            max_diff = float(np.max(np.abs(np.asarray(scalar) - vector)))
+            self.stdout.write(
+                f"{size:>10} {scalar_time * 1000:>12.3f} {vector_time * 1000:>12.3f} "
+                f"{scalar_time / vector_time:>9.1f}x {max_diff:>12.2e}"
+            )
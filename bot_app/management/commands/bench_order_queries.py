@@ -0,0 +1,172 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bot_app.filters.driver_filter import DriverFilter
+from bot_app.models import Driver, Order, PassengerTravel, TravelStatus
+
+# Seed qilingan qatorlar haqiqiy ma'lumotlar bilan to'qnashmasligi uchun
+BENCH_USER_BASE = 9_000_000_000_000
+BENCH_OBJECT_ID_BASE = 2_000_000_000
+
+ACTIVE_STATUSES = [TravelStatus.CREATED, TravelStatus.ASSIGNED, TravelStatus.ARRIVED, TravelStatus.STARTED]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed orders and time Order hot queries without and with the Order indexes. '
+        'Drops indexes while running and locks the order table: use on a dev/staging database only. '
+        'Everything is rolled back at the end unless --keep is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--drivers', type=int, default=500)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keep', action='store_true', help='Commit seeded rows instead of rolling back')
+
+    def _best_of(self, repeat, func):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'ANALYZE {Order._meta.db_table}')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def _seed(self, options, rng):
+        drivers = Driver.objects.bulk_create([
+            Driver(telegram_id=BENCH_USER_BASE + i, phone=f'bench-{i}')
+            for i in range(options['drivers'])
+        ])
+        driver_ids = [driver.id for driver in drivers]
+        content_type = ContentType.objects.get_for_model(PassengerTravel)
+        statuses = [choice for choice, _ in TravelStatus.choices]
+        now = timezone.now()
+
+        # created_at ni bir yilga tarqatish uchun auto_now_add vaqtincha o'chiriladi
+        created_at_field = Order._meta.get_field('created_at')
+        created_at_field.auto_now_add = False
+        try:
+            for start in range(0, options['orders'], options['batch_size']):
+                size = min(options['batch_size'], options['orders'] - start)
+                Order.objects.bulk_create([
+                    Order(
+                        user=BENCH_USER_BASE + rng.randrange(options['users']),
+                        driver_id=rng.choice(driver_ids) if rng.random() < 0.7 else None,
+                        status=rng.choice(statuses),
+                        content_type=content_type,
+                        object_id=BENCH_OBJECT_ID_BASE + start + i,
+                        created_at=now - timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+                    )
+                    for i in range(size)
+                ], batch_size=options['batch_size'])
+                self.stdout.write(f'  seeded {start + size}/{options["orders"]}', ending='\r')
+        finally:
+            created_at_field.auto_now_add = True
+        self.stdout.write('')
+
+        return driver_ids, content_type
+
+    def _queries(self, options, driver_ids, content_type):
+        user = BENCH_USER_BASE + options['users'] // 2
+        driver_id = driver_ids[len(driver_ids) // 2]
+        object_id = BENCH_OBJECT_ID_BASE + options['orders'] // 2
+        since = timezone.now() - timedelta(days=1)
+
+        return {
+            'user (by_telegram_id)': lambda: list(Order.objects.filter(user=user)[:20]),
+            'status page': lambda: list(Order.objects.filter(status=TravelStatus.CREATED)[:20]),
+            'driver + active status': lambda: Order.objects.filter(
+                driver_id=driver_id, status__in=ACTIVE_STATUSES
+            ).count(),
+            'content object exists': lambda: Order.objects.filter(
+                content_type=content_type, object_id=object_id
+            ).exists(),
+            'created_at last day': lambda: Order.objects.filter(created_at__gte=since).count(),
+            'latest page': lambda: list(Order.objects.all()[:20]),
+            'exclude_busy drivers': lambda: list(
+                DriverFilter({'exclude_busy': True}, queryset=Driver.objects.all()).qs[:50]
+            ),
+        }
+
+    @staticmethod
+    def _existing_names():
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, Order._meta.db_table))
+
+    # Constraint lar birinchi: SQLite ularni jadvalni qayta qurish orqali o'zgartiradi
+    # va bunda Meta.indexes ham qayta yaratiladi
+    def _drop_indexes(self):
+        with connection.schema_editor() as editor:
+            for constraint in Order._meta.constraints:
+                if constraint.name in self._existing_names():
+                    editor.remove_constraint(Order, constraint)
+            for index in Order._meta.indexes:
+                if index.name in self._existing_names():
+                    editor.remove_index(Order, index)
+
+    def _create_indexes(self):
+        with connection.schema_editor() as editor:
+            for constraint in Order._meta.constraints:
+                if constraint.name not in self._existing_names():
+                    editor.add_constraint(Order, constraint)
+            for index in Order._meta.indexes:
+                if index.name not in self._existing_names():
+                    editor.add_index(Order, index)
+
+    def _time_all(self, queries, repeat):
+        self._analyze()
+        return {name: self._best_of(repeat, func) for name, func in queries.items()}
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+
+        # SQLite schema editor transaction ichida FK tekshiruvi o'chiq bo'lishini talab qiladi
+        constraint_checks_disabled = connection.vendor == 'sqlite' and connection.disable_constraint_checking()
+        try:
+            with transaction.atomic():
+                self.stdout.write(f'Seeding {options["orders"]} orders ({connection.vendor})...')
+                started = time.perf_counter()
+                driver_ids, content_type = self._seed(options, rng)
+                self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+                queries = self._queries(options, driver_ids, content_type)
+
+                self._drop_indexes()
+                before = self._time_all(queries, options['repeat'])
+
+                self._create_indexes()
+                after = self._time_all(queries, options['repeat'])
+
+                self.stdout.write(f"\n{'query':<28}{'no index ms':>14}{'indexed ms':>14}{'speedup':>10}")
+                for name in queries:
+                    self.stdout.write(
+                        f"{name:<28}{before[name] * 1000:>14.2f}{after[name] * 1000:>14.2f}"
+                        f"{before[name] / after[name]:>9.1f}x"
+                    )
+
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('\nSeeded rows rolled back.'))
+        finally:
+            if constraint_checks_disabled:
+                connection.enable_constraint_checking()
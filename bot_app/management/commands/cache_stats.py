@@ -0,0 +1,77 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from redis.exceptions import RedisError
+
+from bot_app.utils.cache_metrics import read_stats, reset_stats
+from bot_app.utils.redis_utils import get_redis
+
+
+class Command(BaseCommand):
+    help = 'Report cache key counts, memory usage and hit rate per namespace'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sample', type=int, default=1000,
+            help='Max keys per namespace measured with MEMORY USAGE (rest is extrapolated)'
+        )
+        parser.add_argument('--reset', action='store_true', help='Reset hit/miss counters after reporting')
+
+    def handle(self, *args, **options):
+        # Django kalit formati: "<KEY_PREFIX>:<VERSION>:<key>"
+        prefix = cache.make_key("")
+
+        try:
+            client = get_redis()
+            keys_by_namespace = defaultdict(list)
+            for raw_key in client.scan_iter(match=f"{prefix}*", count=1000):
+                key = raw_key.decode()[len(prefix):]
+                keys_by_namespace[key.split(':', 1)[0]].append(raw_key)
+
+            memory = {}
+            for namespace, keys in keys_by_namespace.items():
+                sample = keys[:options['sample']]
+                pipe = client.pipeline(transaction=False)
+                for key in sample:
+                    pipe.memory_usage(key)
+                sizes = [size or 0 for size in pipe.execute()]
+                memory[namespace] = int(sum(sizes) * len(keys) / len(sample)) if sample else 0
+
+            stats = read_stats()
+            info = client.info('stats')
+        except RedisError as e:
+            raise CommandError(f"Redis unavailable: {e}")
+
+        namespaces = sorted(set(keys_by_namespace) | set(stats))
+
+        self.stdout.write(f"{'namespace':<28}{'keys':>10}{'memory':>14}{'hits':>10}{'misses':>10}{'hit rate':>10}")
+        for namespace in namespaces:
+            counters = stats.get(namespace, {"hits": 0, "misses": 0})
+            lookups = counters["hits"] + counters["misses"]
+            hit_rate = f"{counters['hits'] / lookups:.1%}" if lookups else "-"
+            self.stdout.write(
+                f"{namespace:<28}{len(keys_by_namespace.get(namespace, [])):>10}"
+                f"{self._format_bytes(memory.get(namespace, 0)):>14}"
+                f"{counters['hits']:>10}{counters['misses']:>10}{hit_rate:>10}"
+            )
+
+        server_hits = info.get('keyspace_hits', 0)
+        server_misses = info.get('keyspace_misses', 0)
+        server_lookups = server_hits + server_misses
+        self.stdout.write(
+            f"\nRedis keyspace: {server_hits} hits, {server_misses} misses"
+            + (f" ({server_hits / server_lookups:.1%} hit rate)" if server_lookups else "")
+        )
+
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Hit/miss counters reset.'))
+
+    @staticmethod
+    def _format_bytes(size: int) -> str:
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if size < 1024:
+                return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+            size /= 1024
+        return f"{size:.1f} TB"
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bot_app.models import City
+from bot_app.services.city_index import city_index
+from bot_app.utils.geometry import encode_wkb, geojson_to_polygons
+
+
+class Command(BaseCommand):
+    help = 'Import City boundary polygons from a GeoJSON FeatureCollection (matched by title)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--name-property', action='append', dest='name_properties',
+            help='Feature property holding the city name (repeatable, default: name, name:uz, name_uz)'
+        )
+
+    def handle(self, *args, **options):
+        name_properties = options['name_properties'] or ['name', 'name:uz', 'name_uz']
+
+        try:
+            with open(options['path'], encoding='utf-8') as f:
+                collection = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"GeoJSON o'qilmadi: {e}")
+
+        cities = {city.title.strip().lower(): city for city in City.objects.defer('boundary')}
+
+        updated = []
+        skipped = 0
+        for feature in collection.get('features', []):
+            properties = feature.get('properties') or {}
+            city = None
+            for prop in name_properties:
+                name = properties.get(prop)
+                if name and name.strip().lower() in cities:
+                    city = cities[name.strip().lower()]
+                    break
+
+            if city is None or not feature.get('geometry'):
+                skipped += 1
+                continue
+
+            try:
+                city.boundary = encode_wkb(geojson_to_polygons(feature['geometry']))
+            except (ValueError, TypeError, IndexError) as e:
+                self.stderr.write(f"{city.title}: {e}")
+                skipped += 1
+                continue
+            updated.append(city)
+
+        City.objects.bulk_update(updated, ['boundary'], batch_size=100)
+        city_index.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(f'{len(updated)} boundaries imported, {skipped} features skipped.'))
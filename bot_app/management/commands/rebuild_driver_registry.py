@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from redis.exceptions import RedisError
+
+from bot_app.services.driver_registry import driver_registry
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis driver registry (online route/class sets, active order counters) from the database'
+
+    def handle(self, *args, **options):
+        try:
+            stats = driver_registry.rebuild()
+        except RedisError as e:
+            raise CommandError(f"Redis unavailable: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Driver registry rebuilt: {stats['online']} online drivers, "
+            f"{stats['with_active_orders']} drivers with active orders."
+        ))
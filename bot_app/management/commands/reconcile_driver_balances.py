@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from bot_app.services.driver_ledger import driver_ledger
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare Driver.amount with the sum of its ledger entries (DriverTransaction, legacy rows excluded). '
+        'With --fix, record each difference as an adjustment entry; balances themselves are never changed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Write adjustment entries for drifted drivers')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--limit', type=int, default=50, help='How many drifted drivers to print')
+
+    def handle(self, *args, **options):
+        drifts = driver_ledger.drifts(batch_size=options['batch_size'])
+        if not drifts:
+            self.stdout.write(self.style.SUCCESS('All driver balances match the ledger.'))
+            return
+
+        for drift in drifts[:options['limit']]:
+            self.stdout.write(
+                f'  driver {drift.driver_id}: balance {drift.balance:g}, '
+                f'ledger {drift.ledger:g}, difference {drift.difference:+g}'
+            )
+        if len(drifts) > options['limit']:
+            self.stdout.write(f'  ... and {len(drifts) - options["limit"]} more')
+
+        if not options['fix']:
+            self.stdout.write(self.style.WARNING(
+                f'{len(drifts)} drivers drifted from the ledger. Run with --fix to record adjustments.'
+            ))
+            return
+
+        fixed = sum(1 for drift in drifts if driver_ledger.fix_drift(drift.driver_id) is not None)
+        self.stdout.write(self.style.SUCCESS(f'Recorded adjustment entries for {fixed} drivers.'))
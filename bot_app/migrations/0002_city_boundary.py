@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='boundary',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
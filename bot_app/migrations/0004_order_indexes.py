@@ -0,0 +1,72 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:57
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_content_orders(apps, schema_editor):
+    """
+    Bitta content obyektga bog'langan takroriy orderlardan bittasini qoldirish.
+    Faqat tegilmagan (driver siz, status=created) nusxalar o'chiriladi: guruhda
+    haydovchi biriktirilgan yoki holati o'zgargan order bitta bo'lsa u qoladi,
+    bir nechta bo'lsa migratsiya to'xtaydi - ularni qo'lda hal qilish kerak.
+    """
+    Order = apps.get_model('bot_app', 'Order')
+    duplicates = (
+        Order.objects.filter(content_type__isnull=False, object_id__isnull=False)
+        .values('content_type', 'object_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+    )
+
+    to_delete, conflicts = [], []
+    for row in duplicates:
+        orders = list(
+            Order.objects.filter(content_type=row['content_type'], object_id=row['object_id'])
+            .order_by('id').values_list('id', 'driver_id', 'status')
+        )
+        touched = [order_id for order_id, driver_id, status in orders if driver_id or status != 'created']
+        if len(touched) > 1:
+            conflicts.append(touched)
+            continue
+        keep = touched[0] if touched else orders[0][0]
+        to_delete.extend(order_id for order_id, _, _ in orders if order_id != keep)
+
+    if conflicts:
+        raise RuntimeError(
+            "Bir content obyektga bir nechta faol/biriktirilgan order bor, qo'lda hal qiling "
+            f"(order id lari): {conflicts}"
+        )
+    Order.objects.filter(id__in=to_delete).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0003_geocodecache'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_content_orders, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['driver', 'status'], name='order_driver_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='order_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='order_unique_content_object'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.9 on 2026-10-17 22:00
+
+from django.db import migrations, models
+
+TRIGRAM_INDEXES = {
+    'order_from_city_trgm_idx': 'from_city',
+    'order_to_city_trgm_idx': 'to_city',
+}
+
+
+def backfill_order_fields(apps, schema_editor):
+    """Mavjud orderlar uchun content obyektdan shahar/narx/klassni ko'chirish"""
+    Order = apps.get_model('bot_app', 'Order')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    for content_type in ContentType.objects.filter(app_label='bot_app', model__in=['passengertravel', 'passengerpost']):
+        Journey = apps.get_model('bot_app', content_type.model)
+        orders = Order.objects.filter(content_type=content_type, object_id__isnull=False).only('id', 'object_id')
+
+        last_id = 0
+        while True:
+            batch = list(orders.filter(id__gt=last_id).order_by('id')[:2000])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            journeys = Journey.objects.in_bulk({order.object_id for order in batch})
+            for order in batch:
+                journey = journeys.get(order.object_id)
+                if journey is None:
+                    continue
+                order.from_city = (journey.from_location or {}).get('city') or ''
+                order.to_city = (journey.to_location or {}).get('city') or ''
+                order.price = journey.price
+                order.travel_class = getattr(journey, 'travel_class', 'delivery')
+            Order.objects.bulk_update(batch, ['from_city', 'to_city', 'price', 'travel_class'])
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # icontains -> UPPER(col) LIKE UPPER('%...%'), shuning uchun indeks UPPER(col) ustida
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON bot_app_order USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0004_order_indexes'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='from_city',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='price',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='to_city',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='travel_class',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['price'], name='order_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['travel_class'], name='order_travel_class_idx'),
+        ),
+        migrations.RunPython(backfill_order_fields, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,154 @@
+# Generated by Django 5.2.9 on 2026-10-17 22:01
+
+from django.db import migrations, models
+
+from bot_app.utils.geometry import parse_location
+
+LOCATION_COLUMNS = ['from_city', 'from_lat', 'from_lon', 'to_city', 'to_lat', 'to_lon']
+
+TRIGRAM_INDEXES = {
+    f'{table}_{column}_trgm_idx': (f'bot_app_{table}', column)
+    for table in ('passengertravel', 'passengerpost')
+    for column in ('from_city', 'to_city')
+}
+
+
+def backfill_location_columns(apps, schema_editor):
+    """Mavjud yo'nalishlar shahar qidiruvidan tushib qolmasligi uchun ustunlarni location JSON dan to'ldirish"""
+    for model_name in ('PassengerTravel', 'PassengerPost'):
+        Journey = apps.get_model('bot_app', model_name)
+        journeys = Journey.objects.only('id', 'from_location', 'to_location')
+
+        last_id = 0
+        while True:
+            batch = list(journeys.filter(id__gt=last_id).order_by('id')[:2000])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for journey in batch:
+                journey.from_city, journey.from_lat, journey.from_lon = parse_location(journey.from_location)
+                journey.to_city, journey.to_lat, journey.to_lon = parse_location(journey.to_location)
+            Journey.objects.bulk_update(batch, LOCATION_COLUMNS)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # from_city__icontains / istartswith -> UPPER(col) LIKE ..., indeks UPPER(col) ustida
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, (table, column) in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0005_order_denormalized_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='passengerpost',
+            name='from_city',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='passengerpost',
+            name='from_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='passengerpost',
+            name='from_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='passengerpost',
+            name='to_city',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='passengerpost',
+            name='to_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='passengerpost',
+            name='to_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='passengertravel',
+            name='from_city',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='passengertravel',
+            name='from_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='passengertravel',
+            name='from_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='passengertravel',
+            name='to_city',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='passengertravel',
+            name='to_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='passengertravel',
+            name='to_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_location_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='passengerpost',
+            index=models.Index(fields=['from_city', 'to_city'], name='passengerpost_route_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengerpost',
+            index=models.Index(fields=['to_city'], name='passengerpost_to_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengerpost',
+            index=models.Index(fields=['from_lat', 'from_lon'], name='passengerpost_from_xy_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengerpost',
+            index=models.Index(fields=['to_lat', 'to_lon'], name='passengerpost_to_xy_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengertravel',
+            index=models.Index(fields=['from_city', 'to_city'], name='passengertravel_route_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengertravel',
+            index=models.Index(fields=['to_city'], name='passengertravel_to_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengertravel',
+            index=models.Index(fields=['from_lat', 'from_lon'], name='passengertravel_from_xy_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengertravel',
+            index=models.Index(fields=['to_lat', 'to_lon'], name='passengertravel_to_xy_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
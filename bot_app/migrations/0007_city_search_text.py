@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-17 22:03
+
+from django.db import migrations, models
+
+from bot_app.utils.text_search import build_search_text, collect_strings
+
+
+def backfill_search_text(apps, schema_editor):
+    City = apps.get_model('bot_app', 'City')
+    cities = list(City.objects.only('id', 'title', 'translate'))
+    for city in cities:
+        city.search_text = build_search_text([city.title, *collect_strings(city.translate)])
+    City.objects.bulk_update(cities, ['search_text'], batch_size=500)
+
+
+def create_trigram_index(apps, schema_editor):
+    # search_text allaqachon kichik harfda: LIKE va pg_trgm operatorlari UPPER() siz ishlaydi
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS city_search_text_trgm_idx ON bot_app_city USING gin (search_text gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS city_search_text_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0006_journey_location_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.9 on 2026-10-17 22:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_opening_entries(apps, schema_editor):
+    # Ledger boshlanishi: joriy balans = opening yozuvi, shundan keyin Driver.amount = yozuvlar yig'indisi
+    Driver = apps.get_model('bot_app', 'Driver')
+    DriverTransaction = apps.get_model('bot_app', 'DriverTransaction')
+    DriverTransaction.objects.bulk_create([
+        DriverTransaction(driver_id=driver_id, amount=amount, kind='opening')
+        for driver_id, amount in Driver.objects.exclude(amount=0).values_list('id', 'amount').iterator()
+    ], batch_size=1000)
+
+
+def delete_opening_entries(apps, schema_editor):
+    apps.get_model('bot_app', 'DriverTransaction').objects.filter(kind='opening').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0008_dispatch_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drivertransaction',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+        # Mavjud yozuvlar balansga qo'shilmagan edi: legacy
+        migrations.AddField(
+            model_name='drivertransaction',
+            name='kind',
+            field=models.CharField(choices=[('opening', "Boshlang'ich balans"), ('top_up', "To'ldirish"), ('commission', 'Komissiya'), ('charge', 'Yechib olish'), ('adjustment', 'Tuzatish'), ('legacy', 'Eski yozuv')], default='legacy', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='drivertransaction',
+            name='kind',
+            field=models.CharField(choices=[('opening', "Boshlang'ich balans"), ('top_up', "To'ldirish"), ('commission', 'Komissiya'), ('charge', 'Yechib olish'), ('adjustment', 'Tuzatish'), ('legacy', 'Eski yozuv')], default='top_up', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='drivertransaction',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='bot_app.order'),
+        ),
+        migrations.RunPython(create_opening_entries, delete_opening_entries),
+    ]
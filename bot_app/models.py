@@ -6,6 +6,9 @@ from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from pydantic import BaseModel
 
+from .utils.geometry import parse_location
+from .utils.text_search import build_search_text, collect_strings
+
 class BotClient(models.Model):
     telegram_id = models.BigIntegerField(unique=True)
     username = models.CharField(max_length=200, null=True, blank=True)
@@ -57,6 +60,10 @@ class TravelStatus(models.TextChoices):
     REJECTED = "rejected", "Rejected"
 
 
+# Haydovchini band qiladigan order statuslari
+ACTIVE_ORDER_STATUSES = [TravelStatus.CREATED, TravelStatus.ASSIGNED, TravelStatus.ARRIVED, TravelStatus.STARTED]
+
+
 class Coordinate(BaseModel):
     longitude: float  # Changed to float, coordinates are typically floats
     latitude: float
@@ -72,9 +79,20 @@ def default_location():
 
 
 class Journey(models.Model):
+    LOCATION_COLUMNS = ['from_city', 'from_lat', 'from_lon', 'to_city', 'to_lat', 'to_lon']
+
     user = models.BigIntegerField()
     from_location = models.JSONField(default=default_location)
     to_location = models.JSONField(default=default_location)
+
+    # from_location/to_location dan save() da to'ldiriladi (qidiruv va indekslar uchun)
+    from_city = models.CharField(max_length=200, default="", blank=True, editable=False)
+    from_lat = models.FloatField(null=True, blank=True, editable=False)
+    from_lon = models.FloatField(null=True, blank=True, editable=False)
+    to_city = models.CharField(max_length=200, default="", blank=True, editable=False)
+    to_lat = models.FloatField(null=True, blank=True, editable=False)
+    to_lon = models.FloatField(null=True, blank=True, editable=False)
+
     price = models.IntegerField(default=0)
     start_time = models.DateTimeField(null=True, blank=True)
     destination = models.TextField(default="")
@@ -83,6 +101,25 @@ class Journey(models.Model):
 
     class Meta:
         abstract = True
+        indexes = [
+            # Yo'nalish qidiruvi (from -> to); icontains uchun PostgreSQL da trigram indekslar (migration 0006)
+            models.Index(fields=['from_city', 'to_city'], name='%(class)s_route_idx'),
+            models.Index(fields=['to_city'], name='%(class)s_to_city_idx'),
+            # Koordinata oraliqlari bo'yicha (bounding box) prefilter
+            models.Index(fields=['from_lat', 'from_lon'], name='%(class)s_from_xy_idx'),
+            models.Index(fields=['to_lat', 'to_lon'], name='%(class)s_to_xy_idx'),
+        ]
+
+    def fill_location_columns(self):
+        self.from_city, self.from_lat, self.from_lon = parse_location(self.from_location)
+        self.to_city, self.to_lat, self.to_lon = parse_location(self.to_location)
+
+    def save(self, *args, **kwargs):
+        self.fill_location_columns()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'from_location', 'to_location'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | set(self.LOCATION_COLUMNS)
+        super().save(*args, **kwargs)
 
 
 class PassengerTravel(Journey):
@@ -94,7 +131,7 @@ class PassengerTravel(Journey):
     def __str__(self):
         return str(self.user)
 
-    class Meta:
+    class Meta(Journey.Meta):
         ordering = ['-created_at']
         verbose_name_plural = "Sayohatlar"
         verbose_name = "Sayohat"
@@ -106,7 +143,7 @@ class PassengerPost(Journey):
     def __str__(self):
         return f"{self.from_location} -> {self.to_location}"
 
-    class Meta:
+    class Meta(Journey.Meta):
         ordering = ['-created_at']
         verbose_name_plural = "Pochtalar"
         verbose_name = "Pochta"
@@ -153,6 +190,10 @@ class Driver(models.Model):
         ordering = ['-created_at']
         verbose_name_plural = "Haydovchilar"
         verbose_name = "Haydovchi"
+        indexes = [
+            # DispatchIndex.sync: oxirgi sync dan keyin o'zgarganlar
+            models.Index(fields=['updated_at'], name='driver_updated_idx'),
+        ]
 
 
 class DriverGallery(models.Model):
@@ -178,9 +219,29 @@ class Car(models.Model):
 
 
 
+class TransactionKind(models.TextChoices):
+    OPENING = "opening", "Boshlang'ich balans"
+    TOP_UP = "top_up", "To'ldirish"
+    COMMISSION = "commission", "Komissiya"
+    CHARGE = "charge", "Yechib olish"
+    ADJUSTMENT = "adjustment", "Tuzatish"
+    # Ledger dan oldingi yozuvlar: balansga qo'shilmagan, reconcile hisobga olmaydi
+    LEGACY = "legacy", "Eski yozuv"
+
+
 class DriverTransaction(models.Model):
+    """
+    Haydovchi balansining append-only ledger i: amount ishorali (yechish manfiy).
+    Driver.amount = LEGACY dan boshqa yozuvlar yig'indisi (services/driver_ledger.py).
+    """
     driver = models.ForeignKey(Driver, on_delete=models.CASCADE)
     amount = models.FloatField()
+    kind = models.CharField(max_length=20, choices=TransactionKind.choices, default=TransactionKind.TOP_UP)
+    order = models.ForeignKey(
+        'Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions'
+    )
+    # Bir xil operatsiya (masalan, order komissiyasi) ikki marta yozilmasligi uchun
+    idempotency_key = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -197,7 +258,11 @@ class City(models.Model):
     subcategory = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    # Shahar chegarasi: WKB MultiPolygon (utils/geometry.py)
+    boundary = models.BinaryField(null=True, blank=True)
     translate = models.JSONField(null=True, blank=True)
+    # title + translate ning normalizatsiya qilingan nomlari (utils/text_search.py)
+    search_text = models.TextField(default="", blank=True, editable=False)
     is_allowed = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -205,6 +270,18 @@ class City(models.Model):
     def __str__(self):
         return self.title
 
+    @property
+    def search_names(self):
+        """Shaharning asl yozilishdagi barcha nomlari"""
+        return [self.title, *collect_strings(self.translate)]
+
+    def save(self, *args, **kwargs):
+        self.search_text = build_search_text(self.search_names)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'title', 'translate'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'search_text'}
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Shaharlar"
@@ -226,11 +303,36 @@ class CityPrice(models.Model):
         verbose_name = "Shahar narxlari"
 
 
+class GeocodeCache(models.Model):
+    # Reverse-geocode natijasi geohash katagi bo'yicha (services/geocode_cache.py)
+    geohash = models.CharField(max_length=12, unique=True)
+    address = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.geohash
+
+    class Meta:
+        verbose_name_plural = "Geocode cache"
+        verbose_name = "Geocode cache"
+
+
 class OrderType(models.TextChoices):
     TRAVEL = "travel", "Travel"
     DELIVERY = "delivery", "Delivery"
 
 
+def journey_order_fields(journey) -> dict:
+    """PassengerTravel/PassengerPost dan Order ga ko'chiriladigan (denormalized) qiymatlar"""
+    return {
+        "from_city": journey.from_city,
+        "to_city": journey.to_city,
+        "price": journey.price,
+        "travel_class": getattr(journey, "travel_class", "delivery"),
+    }
+
+
 class Order(models.Model):
     user = models.BigIntegerField()
     driver = models.ForeignKey('Driver', on_delete=models.SET_NULL, null=True, blank=True)
@@ -239,6 +341,16 @@ class Order(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.PositiveIntegerField(null=True, blank=True)
     content_object = GenericForeignKey('content_type', 'object_id')
+
+    # content_object dan denormalized (filterlar uchun), travel_signals orqali sinxronlanadi
+    from_city = models.CharField(max_length=200, default="", blank=True)
+    to_city = models.CharField(max_length=200, default="", blank=True)
+    price = models.IntegerField(null=True, blank=True)
+    travel_class = models.CharField(max_length=200, default="", blank=True)
+
+    # Har bir o'zgarishda oshadi: services/order_service.py dagi shartli o'tishlar uchun
+    version = models.PositiveIntegerField(default=0, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -246,12 +358,54 @@ class Order(models.Model):
         ordering = ['-created_at']
         verbose_name_plural = "Buyurtmalar"
         verbose_name = "Buyurtma"
+        indexes = [
+            # by_telegram_id / OrderFilter.user (+ default ordering)
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            # OrderFilter.status / status_in
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            # DriverFilter.filter_exclude_busy: driver bo'yicha faol orderlar
+            models.Index(fields=['driver', 'status'], name='order_driver_status_idx'),
+            # Default ordering va created_at oraliq filterlari
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+            # OrderFilter.min_price / max_price / travel_class
+            models.Index(fields=['price'], name='order_price_idx'),
+            models.Index(fields=['travel_class'], name='order_travel_class_idx'),
+            # DispatchIndex.sync: oxirgi sync dan keyin o'zgargan orderlar
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+            # from_city / to_city icontains uchun PostgreSQL da trigram GIN indekslar (migration 0005)
+        ]
+        constraints = [
+            # Bitta PassengerTravel/PassengerPost uchun bitta order (create_order tekshiruvi)
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='order_unique_content_object'),
+        ]
 
     def __str__(self):
         if self.content_object:
             return f"{self.content_type} -> {self.object_id}"
         return f"Order #{self.pk} - User: {self.user}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Bazadagi (driver, status): signallarda faol order o'tishini aniqlash uchun
+        instance._loaded_assignment = (instance.__dict__.get('driver_id'), instance.__dict__.get('status'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Yangi order da content obyekt maydonlarini ko'chirish
+        if self._state.adding and self.content_type_id and self.object_id:
+            content = self.content_object
+            if content is not None:
+                for field, value in journey_order_fields(content).items():
+                    setattr(self, field, value)
+        if not self._state.adding:
+            # Shartli o'tishlar (services/order_service.py) expected_version orqali o'zgarishni ko'radi
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'version' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'version']
+        super().save(*args, **kwargs)
+
     def clean(self):
         super().clean()
         if self.driver and self.pk:
@@ -0,0 +1,32 @@
+# serializers/base.py
+from django.db import models
+from rest_framework import serializers
+
+
+class BatchedListSerializer(serializers.ListSerializer):
+    """
+    many=True uchun ListSerializer: sahifadagi barcha obyektlar uchun
+    child.preload(items) bir marta chaqiriladi, shunda bog'liq ma'lumotlar
+    har bir qator uchun alohida emas, bitta __in so'rov bilan olinadi.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        items = list(iterable)
+        self.child.preload(items)
+        return [self.child.to_representation(item) for item in items]
+
+
+class BatchedSerializerMixin:
+    """preload(instances) ni amalga oshiruvchi serializerlar uchun"""
+
+    _preloaded = False
+
+    def preload(self, instances):
+        self._preloaded = True
+
+    def to_representation(self, instance):
+        # Bitta obyekt (many=False) uchun ham xuddi shu yo'l ishlatiladi
+        if not self._preloaded:
+            self.preload([instance])
+        return super().to_representation(instance)
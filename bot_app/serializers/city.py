@@ -3,6 +3,7 @@ from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
 
 from ..models import City, CityPrice
+from ..utils.geometry import encode_wkb, geojson_to_polygons
 
 
 class CitySerializer(serializers.ModelSerializer):
@@ -21,8 +22,8 @@ class CitySerializer(serializers.ModelSerializer):
 
     def get_price(self, obj):
         try:
-            city_price = CityPrice.objects.get(city=obj)  # ✅ obj is the City instance
-            return CityPriceSerializer(city_price).data
+            # prefetch_related('cityprice') bo'lsa so'rovsiz
+            return CityPriceSerializer(obj.cityprice).data
         except CityPrice.DoesNotExist:
             return {}
 
@@ -43,14 +44,30 @@ class CityCreateSerializer(serializers.ModelSerializer):
         write_only=True,
         help_text="Price object containing economy, comfort, standard fields"
     )
+    boundary = serializers.JSONField(
+        required=False,
+        allow_null=True,
+        write_only=True,
+        help_text="GeoJSON Polygon or MultiPolygon geometry of the city border"
+    )
 
     class Meta:
         model = City
         fields = [
             'title', 'subcategory', 'translate', 'is_allowed',
-            'latitude', 'longitude', 'price'
+            'latitude', 'longitude', 'price', 'boundary'
         ]
 
+    def validate_boundary(self, value):
+        if value is None:
+            return None
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("GeoJSON geometry object kutilgan")
+        try:
+            return encode_wkb(geojson_to_polygons(value))
+        except (ValueError, TypeError, IndexError) as e:
+            raise serializers.ValidationError(str(e))
+
     def validate(self, data):
         price = data.get('price')
         if price:
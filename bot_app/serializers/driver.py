@@ -1,9 +1,44 @@
 # bot_app/serializers/driver.py
+from django.db import transaction
+from django.db.models import Count, Prefetch
 from rest_framework import serializers
 
+from .base import BatchedListSerializer, BatchedSerializerMixin
 from .bot_client import BotClientSerializer
 from .city import CitySerializer
 from ..models import Driver, Car, DriverTransaction, BotClient, DriverGallery
+from ..services.driver_ledger import LedgerError, driver_ledger
+
+
+def with_driver_relations(queryset):
+    """
+    Driver serializerlari uchun kerakli bog'lanishlar: gallery va shaharlar JOIN bilan,
+    mashinalar bitta prefetch so'rovi bilan (eng yangisi birinchi), mashinalar soni annotate.
+    """
+    return queryset.select_related(
+        'drivergallery', 'from_location', 'to_location'
+    ).defer(
+        'from_location__boundary', 'to_location__boundary'
+    ).prefetch_related(
+        Prefetch('driver', queryset=Car.objects.order_by('-created_at'))
+    ).annotate(
+        cars_count=Count('driver', distinct=True)
+    )
+
+
+def get_driver_gallery(driver):
+    """Driver gallery si (select_related bo'lsa qo'shimcha so'rovsiz)"""
+    try:
+        return driver.drivergallery
+    except DriverGallery.DoesNotExist:
+        return None
+
+
+def get_cars_count(driver):
+    cars_count = getattr(driver, 'cars_count', None)
+    if cars_count is None:
+        cars_count = len(driver.driver.all())
+    return cars_count
 
 
 class DriverGallerySerializer(serializers.ModelSerializer):
@@ -59,30 +94,29 @@ class DriverWithCarsSerializer(serializers.ModelSerializer):
 
     def get_cars_count(self, obj):
         """Driverning carlari soni"""
-        return obj.driver.count()
+        return get_cars_count(obj)
 
     def get_profile_image(self, obj):
         """Driverning profile rasmini olish"""
-        try:
-            gallery = DriverGallery.objects.get(telegram_id=obj)
-            if gallery.profile_image:
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(gallery.profile_image.url)
-                return gallery.profile_image.url
-        except DriverGallery.DoesNotExist:
-            pass
+        gallery = get_driver_gallery(obj)
+        if gallery is not None and gallery.profile_image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(gallery.profile_image.url)
+            return gallery.profile_image.url
         return None
 
 class DriverTransactionSerializer(serializers.ModelSerializer):
     driver_name = serializers.CharField(source='driver.from_location', read_only=True)
     driver_telegram_id = serializers.SerializerMethodField()
     driver_profile_image = serializers.SerializerMethodField()  # Yangi qo'shildi
+    # Ixtiyoriy: berilsa qayta yuborilgan so'rov yangi yozuv yaratmaydi
+    idempotency_key = serializers.CharField(write_only=True, required=False, allow_blank=True, max_length=90)
 
     class Meta:
         model = DriverTransaction
         fields = '__all__'
-        read_only_fields = ('created_at',)
+        read_only_fields = ('created_at', 'kind', 'order')
         ref_name = 'DriverTransactionSerializer'
 
     def get_driver_telegram_id(self, obj):
@@ -90,15 +124,12 @@ class DriverTransactionSerializer(serializers.ModelSerializer):
 
     def get_driver_profile_image(self, obj):
         """Transaction uchun driverning rasmi"""
-        try:
-            gallery = DriverGallery.objects.get(telegram_id=obj.driver)
-            if gallery.profile_image:
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(gallery.profile_image.url)
-                return gallery.profile_image.url
-        except DriverGallery.DoesNotExist:
-            pass
+        gallery = get_driver_gallery(obj.driver)
+        if gallery is not None and gallery.profile_image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(gallery.profile_image.url)
+            return gallery.profile_image.url
         return None
 
 
@@ -132,27 +163,23 @@ class DriverSerializer(serializers.ModelSerializer):
 
     def get_profile_image(self, obj):
         """Driverning profile rasmini olish (relative path)"""
-        try:
-            gallery = DriverGallery.objects.get(telegram_id=obj)
-            return gallery.profile_image.path if gallery.profile_image else None
-        except DriverGallery.DoesNotExist:
+        gallery = get_driver_gallery(obj)
+        if gallery is None:
             return ""
+        return gallery.profile_image.path if gallery.profile_image else None
 
     def get_full_profile_image_url(self, obj):
         """Driverning profile rasmini to'liq URL sifatida olish"""
-        try:
-            gallery = DriverGallery.objects.get(telegram_id=obj)
-            if gallery.profile_image:
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(gallery.profile_image.path)
-                return gallery.profile_image.url
-        except DriverGallery.DoesNotExist:
-            pass
+        gallery = get_driver_gallery(obj)
+        if gallery is not None and gallery.profile_image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(gallery.profile_image.path)
+            return gallery.profile_image.url
         return ""
 
 
-class DriverListSerializer(serializers.ModelSerializer):
+class DriverListSerializer(BatchedSerializerMixin, serializers.ModelSerializer):
     cars_count = serializers.SerializerMethodField()
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     latest_car = serializers.SerializerMethodField()
@@ -176,20 +203,31 @@ class DriverListSerializer(serializers.ModelSerializer):
             'created_at'
         ]
         ref_name = 'DriverListSerializer'
+        list_serializer_class = BatchedListSerializer
+
+    def preload(self, instances):
+        """Sahifadagi driverlarning BotClient larini bitta so'rov bilan olish"""
+        telegram_ids = {driver.telegram_id for driver in instances if driver.telegram_id}
+        self._clients = {
+            client.telegram_id: client
+            for client in BotClient.objects.filter(telegram_id__in=telegram_ids)
+        } if telegram_ids else {}
+        super().preload(instances)
 
     def get_driver_info(self, obj):
-        try:
-            client = BotClient.objects.get(telegram_id=obj.telegram_id)
-            return BotClientSerializer(client).data
-        except BotClient.DoesNotExist:
+        client = self._clients.get(obj.telegram_id)
+        if client is None:
             return {}
+        return BotClientSerializer(client).data
 
     def get_cars_count(self, obj):
-        return obj.driver.count()
+        return get_cars_count(obj)
 
     def get_latest_car(self, obj):
         """Eng so'ngi qo'shilgan car ma'lumoti"""
-        latest_car = obj.driver.order_by('-created_at').first()
+        # Prefetch (va Car.Meta.ordering) bo'yicha mashinalar eng yangisidan boshlanadi
+        cars = obj.driver.all()
+        latest_car = cars[0] if cars else None
         if latest_car:
             return {
                 'car_class': latest_car.car_class,
@@ -200,15 +238,12 @@ class DriverListSerializer(serializers.ModelSerializer):
 
     def get_profile_image(self, obj):
         """Driverning profile rasmini olish"""
-        try:
-            gallery = DriverGallery.objects.get(telegram_id=obj)
-            if gallery.profile_image:
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(gallery.profile_image.url)
-                return gallery.profile_image.url
-        except DriverGallery.DoesNotExist:
-            pass
+        gallery = get_driver_gallery(obj)
+        if gallery is not None and gallery.profile_image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(gallery.profile_image.url)
+            return gallery.profile_image.url
         return None
 
 
@@ -233,31 +268,42 @@ class DriverUpdateSerializer(serializers.ModelSerializer):
 
     def get_current_profile_image(self, obj):
         """Joriy profile rasmni olish"""
-        try:
-            gallery = DriverGallery.objects.get(telegram_id=obj)
-            if gallery.profile_image:
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(gallery.profile_image.url)
-                return gallery.profile_image.url
-        except DriverGallery.DoesNotExist:
-            pass
+        gallery = get_driver_gallery(obj)
+        if gallery is not None and gallery.profile_image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(gallery.profile_image.url)
+            return gallery.profile_image.url
         return None
 
     def update(self, instance, validated_data):
         """Driver ma'lumotlarini yangilash va rasmni saqlash"""
         profile_image = validated_data.pop('profile_image', None)
-
-        # Driver ma'lumotlarini yangilash
-        driver = super().update(instance, validated_data)
+        amount = validated_data.pop('amount', None)
+
+        # Faqat yuborilgan ustunlar yoziladi: to'liq save() eskirgan amount ni qaytarib
+        # yozib, parallel F('amount') o'zgarishlarini (komissiya, ledger) yo'qotardi
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if validated_data:
+                instance.save(update_fields=[*validated_data, 'updated_at'])
+            if amount is not None:
+                # Balans yangi qiymatga ledger orqali (tuzatish yozuvi) keltiriladi
+                try:
+                    driver_ledger.set_balance(instance.pk, amount)
+                except LedgerError as e:
+                    raise serializers.ValidationError({'amount': str(e)})
+                instance.amount = driver_ledger.balance(instance.pk)
+        driver = instance
 
         # Agar rasm berilgan bo'lsa, DriverGallery ni yangilash yoki yaratish
         if profile_image:
-            gallery, created = DriverGallery.objects.get_or_create(
-                telegram_id=driver,
-                defaults={'profile_image': profile_image}
-            )
-            if not created:
+            # Yangilangan gallery driver ning related cache ida ham qolishi uchun shu obyekt orqali
+            gallery = get_driver_gallery(driver)
+            if gallery is None:
+                DriverGallery.objects.create(telegram_id=driver, profile_image=profile_image)
+            else:
                 gallery.profile_image = profile_image
                 gallery.save()
 
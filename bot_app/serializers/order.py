@@ -2,12 +2,15 @@
 from rest_framework import serializers
 from django.contrib.contenttypes.models import ContentType
 from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
 import json
 
+from .base import BatchedListSerializer, BatchedSerializerMixin
 from .bot_client import BotClientSerializer
-from .driver import DriverSerializer
+from .driver import DriverSerializer, with_driver_relations
 from .passenger import PassengerSerializer
 from ..models import Order, PassengerTravel, PassengerPost, TravelStatus, OrderType, Driver, BotClient, Passenger, City
+from ..utils.generic_relations import prefetch_content_objects
 
 
 class ContentObjectSerializer(serializers.Serializer):
@@ -46,7 +49,7 @@ class ContentObjectSerializer(serializers.Serializer):
         return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(BatchedSerializerMixin, serializers.ModelSerializer):
     content_object = ContentObjectSerializer(read_only=True)
     driver_details = DriverSerializer(source='driver', read_only=True)
     content_type_name = serializers.CharField(source='content_type.model', read_only=True)
@@ -55,18 +58,29 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = [
-            'id', 'user', 'creator', 'driver', 'driver_details', 'status',
+            'id', 'user', 'creator', 'driver', 'driver_details', 'status', 'version',
             'order_type', 'content_object', 'content_type_name',
         ]
         read_only_fields = ['id', 'content_object']
+        list_serializer_class = BatchedListSerializer
+
+    def preload(self, instances):
+        """Content obyektlar va creator larni bulk yuklash"""
+        prefetch_content_objects(instances)
+
+        user_ids = {order.user for order in instances}
+        self._creators = {
+            passenger.telegram_id: passenger
+            for passenger in Passenger.objects.filter(telegram_id__in=user_ids)
+        } if user_ids else {}
+
+        super().preload(instances)
 
     def get_creator(self, obj):
-        try:
-            creator = Passenger.objects.get(telegram_id=obj.user)
-            return PassengerSerializer(creator).data
-        except Exception as e:
-            print(e)
+        creator = self._creators.get(obj.user)
+        if creator is None:
             return {}
+        return PassengerSerializer(creator).data
 
     def to_representation(self, instance):
         """Override to handle datetime serialization"""
@@ -117,6 +131,11 @@ class OrderCreateSerializer(serializers.ModelSerializer):
                 'object_id': f'{content_type_name} topilmadi'
             })
 
+        if Order.objects.filter(content_type=content_type, object_id=object_id).exists():
+            raise serializers.ValidationError({
+                'object_id': f'{content_type_name} uchun order allaqachon mavjud'
+            })
+
         # Order type va content type mos kelishini tekshirish
         if (order_type == OrderType.TRAVEL and
                 content_type_name != 'passengertravel'):
@@ -137,11 +156,17 @@ class OrderCreateSerializer(serializers.ModelSerializer):
 
         content_type = ContentType.objects.get(model=content_type_name)
 
-        return Order.objects.create(
-            **validated_data,
-            content_type=content_type,
-            object_id=object_id
-        )
+        try:
+            with transaction.atomic():
+                return Order.objects.create(
+                    **validated_data,
+                    content_type=content_type,
+                    object_id=object_id
+                )
+        except IntegrityError:
+            raise serializers.ValidationError({
+                'object_id': f'{content_type_name} uchun order allaqachon mavjud'
+            })
 
 
 class OrderUpdateSerializer(serializers.ModelSerializer):
@@ -150,7 +175,7 @@ class OrderUpdateSerializer(serializers.ModelSerializer):
         fields = ['driver', 'status']
 
 
-class OrderListSerializer(serializers.ModelSerializer):
+class OrderListSerializer(BatchedSerializerMixin, serializers.ModelSerializer):
     driver_details = serializers.SerializerMethodField()
     creator = serializers.SerializerMethodField()
 
@@ -159,18 +184,29 @@ class OrderListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'creator', 'driver', 'driver_details', 'status', 'order_type', 'object_id',
         ]
+        list_serializer_class = BatchedListSerializer
+
+    def preload(self, instances):
+        """Sahifadagi driver va creator larni bittadan __in so'rov bilan olish"""
+        driver_ids = {order.driver_id for order in instances if order.driver_id}
+        self._drivers = with_driver_relations(Driver.objects.all()).in_bulk(driver_ids) if driver_ids else {}
+
+        user_ids = {order.user for order in instances}
+        self._creators = {
+            client.telegram_id: client
+            for client in BotClient.objects.filter(telegram_id__in=user_ids)
+        } if user_ids else {}
+
+        super().preload(instances)
 
     def get_driver_details(self, obj):
-        try:
-            driver = Driver.objects.get(id=obj.driver.id)
-            return DriverSerializer(driver).data
-        except Exception as e:
+        driver = self._drivers.get(obj.driver_id)
+        if driver is None:
             return None
+        return DriverSerializer(driver).data
 
     def get_creator(self, obj):
-        try:
-            creator = BotClient.objects.get(telegram_id=obj.user)
-            return BotClientSerializer(creator).data
-        except Exception as e:
-            print(e)
-            return {}
\ No newline at end of file
+        creator = self._creators.get(obj.user)
+        if creator is None:
+            return {}
+        return BotClientSerializer(creator).data
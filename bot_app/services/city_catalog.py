@@ -0,0 +1,91 @@
+# services/city_catalog.py
+import json
+import logging
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from ..models import City, CityPrice
+from ..serializers.city import CitySerializer
+from ..utils.cache_metrics import cache_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def city_catalog_queryset():
+    """Ruxsat etilgan shaharlar narx va subcategory bilan (CitySerializer uchun N+1 siz)"""
+    return City.objects.filter(is_allowed=True).defer('boundary', 'search_text').select_related(
+        'subcategory'
+    ).prefetch_related(
+        Prefetch('cityprice', queryset=CityPrice.objects.only('city_id', 'economy', 'comfort', 'standard', 'delivery'))
+    )
+
+
+class CityCatalog:
+    """
+    /cities/ ro'yxatining tayyor snapshoti.
+
+    Snapshot CitySerializer natijasi (title bo'yicha tartiblangan) bo'lib,
+    Redis da JSON ko'rinishida versiya kaliti ostida saqlanadi va process
+    ichida ham eslab qolinadi. City yoki CityPrice o'zgarganda versiya
+    yangilanadi, keyingi so'rov snapshotni bir marta qayta quradi.
+    Barqaror holatda ro'yxat bazaga umuman murojaat qilmaydi; versiya
+    ETag sifatida ishlatiladi.
+    """
+
+    VERSION_KEY = "city_catalog_version"
+    KEY_PREFIX = "city_catalog"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local: Optional[Tuple[str, List[Dict[str, Any]]]] = None
+
+    def _snapshot_key(self, version: str) -> str:
+        return f"{self.KEY_PREFIX}:{version}"
+
+    def version(self) -> str:
+        version = cache.get(self.VERSION_KEY)
+        if version is None:
+            cache.add(self.VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(self.VERSION_KEY)
+        return version
+
+    def invalidate(self):
+        cache.set(self.VERSION_KEY, uuid.uuid4().hex, None)
+        with self._lock:
+            self._local = None
+
+    @staticmethod
+    def build() -> List[Dict[str, Any]]:
+        return CitySerializer(city_catalog_queryset().order_by('title'), many=True).data
+
+    def get(self) -> Tuple[str, List[Dict[str, Any]]]:
+        """(version, cities)"""
+        version = self.version()
+        local = self._local
+        if local is not None and local[0] == version:
+            return local
+
+        payload = cache.get(self._snapshot_key(version))
+        if payload is not None:
+            cache_metrics.hit(self.KEY_PREFIX)
+        else:
+            cache_metrics.miss(self.KEY_PREFIX)
+            payload = json.dumps(self.build(), ensure_ascii=False)
+            # Eski versiyalar o'z-o'zidan muddati o'tib ketadi
+            cache.set(self._snapshot_key(version), payload, 24 * 3600)
+            logger.debug(f"City catalog rebuilt for version {version}")
+        cities = json.loads(payload)
+
+        with self._lock:
+            self._local = (version, cities)
+        return version, cities
+
+    def etag(self, version: str) -> str:
+        return f'"{self.KEY_PREFIX}-{version}"'
+
+
+city_catalog = CityCatalog()
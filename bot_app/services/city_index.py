@@ -0,0 +1,167 @@
+# services/city_index.py
+import logging
+import threading
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from ..models import City
+from ..utils.geometry import Polygon, RTree, bbox_of, decode_wkb, point_in_polygons, polygons_area
+from ..utils.spatial_index import KDTree
+
+logger = logging.getLogger(__name__)
+
+
+class CityIndex:
+    """
+    Ruxsat etilgan shaharlar uchun xotiradagi fazoviy indeks.
+
+    Indeks City.latitude/City.longitude dan quriladi, shuningdek shahar nomi
+    bo'yicha saqlangan koordinatalar xaritasini va City.boundary polygonlari
+    uchun R-tree ni ham tutadi. City saqlanganda yoki
+    o'chirilganda cache dagi versiya yangilanadi va har bir process keyingi
+    so'rovda indeksni qayta quradi.
+    """
+
+    VERSION_KEY = "city_index_version"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree: Optional[KDTree] = None
+        self._coordinates: Dict[str, Tuple[float, float]] = {}
+        self._boundaries: Dict[int, List[Polygon]] = {}
+        self._boundary_tree: Optional[RTree] = None
+        self._version: Optional[str] = None
+
+    @classmethod
+    def _current_version(cls) -> str:
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+
+    def invalidate(self):
+        """Barcha processlardagi indeksni eskirgan deb belgilash"""
+        cache.set(self.VERSION_KEY, uuid.uuid4().hex, None)
+        with self._lock:
+            self._tree = None
+
+    def is_stale(self) -> bool:
+        return self._tree is None or self._version != self._current_version()
+
+    def rebuild(self):
+        """Indeksni bazadan qayta qurish"""
+        version = self._current_version()
+        cities = list(City.objects.select_related('subcategory'))
+        located = [city for city in cities if city.latitude is not None and city.longitude is not None]
+        allowed = [city for city in located if city.is_allowed]
+        tree = KDTree([(city.latitude, city.longitude) for city in allowed], allowed)
+        coordinates = {city.title.strip().lower(): (city.latitude, city.longitude) for city in located}
+
+        boundaries = {}
+        entries = []
+        for city in cities:
+            if not city.boundary:
+                continue
+            try:
+                polygons = decode_wkb(city.boundary)
+            except Exception as e:
+                logger.warning(f"City {city.id} boundary o'qilmadi: {e}")
+                continue
+            boundaries[city.id] = polygons
+            entries.append((bbox_of(polygons), (city, polygons, polygons_area(polygons))))
+        boundary_tree = RTree(entries)
+
+        with self._lock:
+            self._tree = tree
+            self._coordinates = coordinates
+            self._boundaries = boundaries
+            self._boundary_tree = boundary_tree
+            self._version = version
+
+        logger.debug(f"City index rebuilt: {len(tree)} cities, {len(boundary_tree)} boundaries")
+
+    def ensure_built(self) -> KDTree:
+        if self.is_stale():
+            self.rebuild()
+        return self._tree
+
+    async def aensure_built(self) -> KDTree:
+        if self.is_stale():
+            await sync_to_async(self.rebuild)()
+        return self._tree
+
+    def nearest(
+            self,
+            lat: float,
+            lon: float,
+            k: int = 1,
+            max_distance_km: Optional[float] = None
+    ) -> List[Tuple[City, float]]:
+        """Eng yaqin k ta shahar: [(city, distance_km), ...]"""
+        return self.ensure_built().nearest(lat, lon, k, max_distance_km)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[City, float]]:
+        """Radius ichidagi shaharlar: [(city, distance_km), ...]"""
+        return self.ensure_built().within(lat, lon, radius_km)
+
+    def coordinates(self, city_name: str) -> Optional[Tuple[float, float]]:
+        """Bazada saqlangan koordinatalarni shahar nomi bo'yicha olish"""
+        self.ensure_built()
+        return self._coordinates.get(city_name.strip().lower())
+
+    async def acoordinates(self, city_name: str) -> Optional[Tuple[float, float]]:
+        await self.aensure_built()
+        return self._coordinates.get(city_name.strip().lower())
+
+    def _containing(self, lat: float, lon: float) -> List[City]:
+        # bbox R-tree dan, keyin aniq point-in-polygon; eng kichik hudud birinchi
+        candidates = [
+            (area, city) for city, polygons, area in self._boundary_tree.query_point(lon, lat)
+            if point_in_polygons(lon, lat, polygons)
+        ]
+        return [city for area, city in sorted(candidates, key=lambda item: item[0])]
+
+    def _contains(self, city_id: int, lat: float, lon: float) -> Optional[bool]:
+        polygons = self._boundaries.get(city_id)
+        if polygons is None:
+            return None
+        return point_in_polygons(lon, lat, polygons)
+
+    def containing(self, lat: float, lon: float) -> List[City]:
+        """Chegarasi nuqtani o'z ichiga olgan shaharlar (eng kichik hudud birinchi)"""
+        self.ensure_built()
+        return self._containing(lat, lon)
+
+    def contains(self, city_id: int, lat: float, lon: float) -> Optional[bool]:
+        """Nuqta shahar chegarasi ichidami; chegara saqlanmagan bo'lsa None"""
+        self.ensure_built()
+        return self._contains(city_id, lat, lon)
+
+    async def acontaining(self, lat: float, lon: float) -> List[City]:
+        await self.aensure_built()
+        return self._containing(lat, lon)
+
+    async def acontains(self, city_id: int, lat: float, lon: float) -> Optional[bool]:
+        await self.aensure_built()
+        return self._contains(city_id, lat, lon)
+
+    async def anearest(
+            self,
+            lat: float,
+            lon: float,
+            k: int = 1,
+            max_distance_km: Optional[float] = None
+    ) -> List[Tuple[City, float]]:
+        tree = await self.aensure_built()
+        return tree.nearest(lat, lon, k, max_distance_km)
+
+    async def awithin(self, lat: float, lon: float, radius_km: float) -> List[Tuple[City, float]]:
+        tree = await self.aensure_built()
+        return tree.within(lat, lon, radius_km)
+
+
+city_index = CityIndex()
@@ -0,0 +1,235 @@
+# services/city_search.py
+import bisect
+import logging
+import threading
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import BooleanField, F, Func, Q, Value
+
+from configuration import env
+from ..models import City
+from ..utils.text_search import match_score, normalize, split_search_text, trigrams
+from .city_index import city_index
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CityEntry:
+    id: int
+    title: str
+    is_allowed: bool
+    names: Tuple[str, ...]      # normalizatsiya qilingan
+    raw_names: Tuple[str, ...]  # asl yozilishi (title + translate)
+
+
+class WordSimilar(Func):
+    """pg_trgm "<%" operatori (word_similarity >= threshold), gin_trgm_ops indeksidan foydalanadi"""
+    arg_joiner = ' <%% '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+class CitySearchIndex:
+    """
+    City.title + City.translate bo'yicha qidiruv (autocomplete).
+
+    Nomlar normalizatsiya qilinadi (kichik harf, kirill -> lotin, apostrofsiz),
+    shuning uchun "Тошкент", "toshkent" va "Tashkent" bitta shaharni topadi.
+    Natijalar ball bo'yicha saralanadi: to'liq moslik > nom boshi > so'z boshi >
+    ichida > trigram o'xshashligi.
+
+    Nomzodlar PostgreSQL da City.search_text ustidagi trigram indeksdan,
+    boshqa bazalarda xotiradagi indeksdan (prefiks bisect + trigram inverted index)
+    olinadi. Ballash ikkala holatda ham bir xil. Xotiradagi indeks CityIndex kabi
+    cache dagi versiya o'zgarganda qayta quriladi.
+    """
+
+    VERSION_KEY = "city_search_version"
+
+    def __init__(self, backend: str = "auto", min_similarity: float = 0.3):
+        self.backend = backend
+        self.min_similarity = min_similarity
+
+        self._lock = threading.Lock()
+        self._entries: Optional[List[CityEntry]] = None
+        self._prefixes: List[Tuple[str, int]] = []
+        self._trigrams: Dict[str, List[int]] = {}
+        self._names: Dict[str, CityEntry] = {}
+        self._version: Optional[str] = None
+
+    @classmethod
+    def _current_version(cls) -> str:
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+
+    def invalidate(self):
+        cache.set(self.VERSION_KEY, uuid.uuid4().hex, None)
+        with self._lock:
+            self._entries = None
+
+    def uses_postgres(self) -> bool:
+        if self.backend == "auto":
+            return connection.vendor == "postgresql"
+        return self.backend == "postgres"
+
+    @staticmethod
+    def _entry(city: City) -> CityEntry:
+        names = split_search_text(city.search_text) or [normalize(city.title)]
+        return CityEntry(
+            id=city.id,
+            title=city.title,
+            is_allowed=city.is_allowed,
+            names=tuple(names),
+            raw_names=tuple(dict.fromkeys(name for name in city.search_names if name)),
+        )
+
+    def rebuild(self):
+        version = self._current_version()
+        cities = City.objects.only('id', 'title', 'translate', 'search_text', 'is_allowed')
+        entries = [self._entry(city) for city in cities]
+
+        prefixes = []
+        trigram_index: Dict[str, List[int]] = {}
+        names: Dict[str, CityEntry] = {}
+        for position, entry in enumerate(entries):
+            keys = set()
+            for name in entry.names:
+                # Bir xil nomli shaharlardan ruxsat etilgani ustun
+                if name not in names or entry.is_allowed and not names[name].is_allowed:
+                    names[name] = entry
+                keys.add(name)
+                keys.update(name.split())
+            prefixes.extend((key, position) for key in keys)
+            for trigram in set().union(*(trigrams(name) for name in entry.names)):
+                trigram_index.setdefault(trigram, []).append(position)
+        prefixes.sort()
+
+        with self._lock:
+            self._entries = entries
+            self._prefixes = prefixes
+            self._trigrams = trigram_index
+            self._names = names
+            self._version = version
+
+        logger.debug(f"City search index rebuilt: {len(entries)} cities")
+
+    def _ensure_built(self) -> List[CityEntry]:
+        if self._entries is None or self._version != self._current_version():
+            self.rebuild()
+        return self._entries
+
+    def _memory_candidates(self, query: str, query_trigrams) -> List[CityEntry]:
+        entries = self._ensure_built()
+        positions: Set[int] = set()
+
+        # Nom yoki so'z boshi bo'yicha
+        start = bisect.bisect_left(self._prefixes, (query,))
+        for key, position in self._prefixes[start:]:
+            if not key.startswith(query):
+                break
+            positions.add(position)
+
+        # Kamida bitta umumiy trigram (ichidagi moslik va xatoli yozilish)
+        counts = Counter()
+        for trigram in query_trigrams:
+            counts.update(self._trigrams.get(trigram, ()))
+        min_shared = max(1, int(len(query_trigrams) * self.min_similarity))
+        positions.update(position for position, shared in counts.items() if shared >= min_shared)
+
+        return [entries[position] for position in positions]
+
+    def _postgres_candidates(self, query: str, limit: int) -> List[CityEntry]:
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        cities = City.objects.only('id', 'title', 'translate', 'search_text', 'is_allowed').filter(
+            Q(search_text__contains=query) | Q(WordSimilar(Value(query), F('search_text')))
+        ).annotate(
+            similarity=TrigramWordSimilarity(Value(query), 'search_text')
+        ).order_by('-similarity')[:limit * 5]
+        return [self._entry(city) for city in cities]
+
+    def _search(self, query: str, limit: int, allowed_only: bool) -> List[Tuple[CityEntry, float]]:
+        query = normalize(query)
+        if not query:
+            return []
+        query_trigrams = trigrams(query)
+
+        if self.uses_postgres():
+            candidates = self._postgres_candidates(query, limit)
+        else:
+            candidates = self._memory_candidates(query, query_trigrams)
+
+        results = []
+        for entry in candidates:
+            if allowed_only and not entry.is_allowed:
+                continue
+            score = max(match_score(query, query_trigrams, name, self.min_similarity) for name in entry.names)
+            if score > 0:
+                results.append((entry, score))
+
+        results.sort(key=lambda item: (-item[1], len(item[0].title), item[0].title))
+        return results[:limit]
+
+    def resolve(
+            self,
+            name: str,
+            lat: Optional[float] = None,
+            lon: Optional[float] = None,
+            max_distance_km: float = 50
+    ) -> Optional[int]:
+        """
+        Erkin matn / location JSON dagi shaharni ruxsat etilgan City id siga aylantirish:
+        avval nomning aniq (normalizatsiya qilingan) mosligi, keyin koordinata bo'yicha
+        eng yaqin shahar, oxirida eng yaxshi qidiruv natijasi.
+        """
+        query = normalize(name)
+        if query:
+            self._ensure_built()
+            entry = self._names.get(query)
+            if entry is not None and entry.is_allowed:
+                return entry.id
+
+        if lat is not None and lon is not None:
+            for city, _ in city_index.nearest(lat, lon, k=1, max_distance_km=max_distance_km):
+                return city.id
+
+        if query:
+            for entry, _ in self._search(query, 1, allowed_only=True):
+                return entry.id
+        return None
+
+    def search(self, query: str, limit: int = 20, allowed_only: bool = True) -> List[Tuple[int, float]]:
+        """Eng mos shaharlar: [(city_id, score), ...] ball bo'yicha kamayish tartibida"""
+        return [(entry.id, score) for entry, score in self._search(query, limit, allowed_only)]
+
+    async def asearch(self, query: str, limit: int = 20, allowed_only: bool = True) -> List[Tuple[int, float]]:
+        return await sync_to_async(self.search)(query, limit, allowed_only)
+
+    def match_ids(self, query: str, limit: int = 100, allowed_only: bool = False) -> List[int]:
+        return [entry.id for entry, _ in self._search(query, limit, allowed_only)]
+
+    def match_names(self, query: str, limit: int = 20, allowed_only: bool = False) -> List[str]:
+        """
+        Mos shaharlarning asl yozilishdagi nomlari - from_city/to_city kabi
+        materialized ustunlarni `__in` bilan (indeks orqali) filterlash uchun
+        """
+        names = []
+        for entry, _ in self._search(query, limit, allowed_only):
+            names.extend(entry.raw_names)
+        return list(dict.fromkeys(names))
+
+
+city_search = CitySearchIndex(
+    backend=env.CITY_SEARCH_BACKEND,
+    min_similarity=env.CITY_SEARCH_MIN_SIMILARITY,
+)
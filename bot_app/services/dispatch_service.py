@@ -0,0 +1,319 @@
+# services/dispatch_service.py
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from configuration import env
+from ..models import ACTIVE_ORDER_STATUSES, Car, Driver, DriverStatus, Order, TravelClass
+from .city_search import city_search
+from .driver_locations import driver_locations
+from .driver_registry import driver_registry
+
+logger = logging.getLogger(__name__)
+
+# Order class -> uni bajara oladigan mashina classlari (DriverFilter.filter_by_car_class bilan bir xil)
+CAR_CLASS_COMPAT = {
+    TravelClass.ECONOMY: {TravelClass.ECONOMY},
+    TravelClass.STANDARD: {TravelClass.STANDARD, TravelClass.COMFORT},
+    TravelClass.COMFORT: {TravelClass.COMFORT},
+}
+
+# Soat farqi va tranzaksiyalar kech commit bo'lishi uchun incremental sync oynasi
+SYNC_OVERLAP = timedelta(seconds=5)
+
+OFFERS_KEY_PREFIX = "dispatch_offers"
+OFFERS_TTL = 24 * 3600
+
+
+@dataclass(frozen=True)
+class DriverRecord:
+    id: int
+    telegram_id: Optional[int]
+    online: bool
+    from_city_id: Optional[int]
+    to_city_id: Optional[int]
+    car_classes: FrozenSet[str]
+    amount: int
+    rating: int
+
+
+class DispatchIndex:
+    """
+    Order uchun haydovchi nomzodlarini tanlash uchun xotiradagi indeks.
+
+    Haydovchilar (from_location, to_location) yo'nalishi va from_location
+    bo'yicha guruhlanadi; har biri uchun mashina classlari, balans va faol
+    orderlar soni saqlanadi. Indeks har refresh_interval sekundda faqat
+    oxirgi sync dan keyin o'zgargan Driver/Car/Order qatorlari bilan
+    yangilanadi, rebuild_ttl sekundda esa to'liq qayta quriladi (o'chirilgan
+    haydovchilar va boshqa haydovchiga o'tgan orderlar shu yerda tozalanadi).
+    """
+
+    def __init__(self, refresh_interval: float = 2, rebuild_ttl: float = 300):
+        self.refresh_interval = refresh_interval
+        self.rebuild_ttl = rebuild_ttl
+
+        self._lock = threading.RLock()
+        self._drivers: Dict[int, DriverRecord] = {}
+        self._active: Dict[int, int] = {}
+        self._by_route: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._by_from: Dict[int, Set[int]] = defaultdict(set)
+        self._synced_at: Optional[datetime] = None
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+
+    @staticmethod
+    def _load_drivers(queryset) -> List[DriverRecord]:
+        drivers = list(queryset.only(
+            'id', 'telegram_id', 'status', 'from_location_id', 'to_location_id', 'amount', 'rating'
+        ))
+        car_classes = defaultdict(set)
+        for driver_id, car_class in Car.objects.filter(driver__in=[d.id for d in drivers]).values_list(
+                'driver_id', 'car_class'):
+            car_classes[driver_id].add(car_class)
+
+        return [
+            DriverRecord(
+                id=driver.id,
+                telegram_id=driver.telegram_id,
+                online=driver.status == DriverStatus.ONLINE,
+                from_city_id=driver.from_location_id,
+                to_city_id=driver.to_location_id,
+                car_classes=frozenset(car_classes[driver.id]),
+                amount=driver.amount,
+                rating=driver.rating,
+            )
+            for driver in drivers
+        ]
+
+    @staticmethod
+    def _load_active_counts(driver_ids=None) -> Dict[int, int]:
+        orders = Order.objects.filter(driver__isnull=False, status__in=ACTIVE_ORDER_STATUSES)
+        if driver_ids is not None:
+            orders = orders.filter(driver_id__in=driver_ids)
+        return dict(orders.values_list('driver_id').annotate(count=Count('id')).order_by())
+
+    def _unlink(self, record: DriverRecord):
+        self._by_route[(record.from_city_id, record.to_city_id)].discard(record.id)
+        self._by_from[record.from_city_id].discard(record.id)
+
+    def _link(self, record: DriverRecord):
+        self._drivers[record.id] = record
+        if record.from_city_id is None:
+            return
+        self._by_route[(record.from_city_id, record.to_city_id)].add(record.id)
+        self._by_from[record.from_city_id].add(record.id)
+
+    def rebuild(self):
+        synced_at = timezone.now()
+        records = self._load_drivers(Driver.objects.all())
+        active = self._load_active_counts()
+
+        with self._lock:
+            self._drivers = {}
+            self._by_route = defaultdict(set)
+            self._by_from = defaultdict(set)
+            for record in records:
+                self._link(record)
+            self._active = active
+            self._synced_at = synced_at
+            self._built_at = self._refreshed_at = time.monotonic()
+
+        logger.debug(f"Dispatch index rebuilt: {len(records)} drivers")
+
+    def sync(self):
+        """Oxirgi sync dan keyin o'zgargan haydovchi, mashina va orderlarni qo'llash"""
+        since = self._synced_at - SYNC_OVERLAP
+        synced_at = timezone.now()
+
+        changed_ids = set(Driver.objects.filter(updated_at__gt=since).values_list('id', flat=True))
+        changed_ids.update(Car.objects.filter(updated_at__gt=since).values_list('driver_id', flat=True))
+        records = self._load_drivers(Driver.objects.filter(id__in=changed_ids)) if changed_ids else []
+
+        order_driver_ids = set(
+            Order.objects.filter(updated_at__gt=since, driver__isnull=False).values_list('driver_id', flat=True)
+        )
+        active = self._load_active_counts(order_driver_ids) if order_driver_ids else {}
+
+        with self._lock:
+            for record in records:
+                previous = self._drivers.get(record.id)
+                if previous is not None:
+                    self._unlink(previous)
+                self._link(record)
+            for driver_id in order_driver_ids:
+                self._active[driver_id] = active.get(driver_id, 0)
+            self._synced_at = synced_at
+            self._refreshed_at = time.monotonic()
+
+        if records or order_driver_ids:
+            logger.debug(f"Dispatch index synced: {len(records)} drivers, {len(order_driver_ids)} order drivers")
+
+    def refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._synced_at is None or now - self._built_at >= self.rebuild_ttl:
+                self.rebuild()
+            elif now - self._refreshed_at >= self.refresh_interval:
+                self.sync()
+
+    def candidates(self, from_city_id: int, to_city_id: Optional[int]) -> List[Tuple[DriverRecord, int, bool]]:
+        """from shahridan chiqadigan haydovchilar: [(record, active_orders, exact_route), ...]"""
+        self.refresh()
+        with self._lock:
+            exact = self._by_route.get((from_city_id, to_city_id), set())
+            driver_ids = list(self._by_from.get(from_city_id, ()))
+            active = {driver_id: self._active.get(driver_id, 0) for driver_id in driver_ids}
+
+        # Faol orderlar soni driver registry dan jonli (index faqat refresh da yangilanadi)
+        try:
+            live = driver_registry.active_counts(driver_ids)
+        except RedisError as e:
+            logger.warning(f"Driver registry unavailable, using dispatch index counts: {e}")
+            live = None
+        if live is not None:
+            active = live
+
+        return [(self._drivers[driver_id], active[driver_id], driver_id in exact) for driver_id in driver_ids]
+
+
+class DispatchEngine:
+    """
+    Yangi order uchun eng mos top K haydovchini tanlash.
+
+    Shartlar: online, from_location order shahri bilan bir xil, mashina classi
+    mos (CAR_CLASS_COMPAT), balans komissiyaga yetadi va faol orderlar soni
+    max_active_orders dan kam. Saralash: to'liq yo'nalish mosligi, kamroq
+    faol order, olib ketish nuqtasiga yaqinlik (GPS heartbeat), yuqori reyting,
+    katta balans.
+    """
+
+    def __init__(self, index: DispatchIndex, top_k: int = 10, max_active_orders: int = 4,
+                 commission_rate: float = 0.05):
+        self.index = index
+        self.top_k = top_k
+        self.max_active_orders = max_active_orders
+        self.commission_rate = commission_rate
+
+    @staticmethod
+    def _order_cities(order: Order) -> Tuple[Optional[int], Optional[int]]:
+        journey = order.content_object
+        from_lat = getattr(journey, 'from_lat', None)
+        from_lon = getattr(journey, 'from_lon', None)
+        to_lat = getattr(journey, 'to_lat', None)
+        to_lon = getattr(journey, 'to_lon', None)
+        return (
+            city_search.resolve(order.from_city, from_lat, from_lon),
+            city_search.resolve(order.to_city, to_lat, to_lon),
+        )
+
+    def rank(self, order: Order) -> List[DriverRecord]:
+        from_city_id, to_city_id = self._order_cities(order)
+        if from_city_id is None:
+            return []
+
+        # delivery va bo'sh class - istalgan mashina
+        allowed_classes = CAR_CLASS_COMPAT.get(order.travel_class)
+        min_amount = (order.price or 0) * self.commission_rate
+
+        eligible = []
+        for record, active_orders, exact_route in self.index.candidates(from_city_id, to_city_id):
+            if not record.online or record.telegram_id is None:
+                continue
+            if allowed_classes is not None and not record.car_classes & allowed_classes:
+                continue
+            if record.amount < min_amount or active_orders >= self.max_active_orders:
+                continue
+            eligible.append((record, active_orders, exact_route))
+
+        distances = self._pickup_distances(order, [record.id for record, _, _ in eligible])
+        ranked = sorted(eligible, key=lambda item: (
+            not item[2], item[1], distances.get(item[0].id, math.inf), -item[0].rating, -item[0].amount, item[0].id
+        ))
+        return [record for record, _, _ in ranked[:self.top_k]]
+
+    @staticmethod
+    def _pickup_distances(order: Order, driver_ids: List[int]) -> Dict[int, float]:
+        """Oxirgi GPS pozitsiyasi ma'lum haydovchilargacha masofa (km)"""
+        journey = order.content_object
+        lat, lon = getattr(journey, 'from_lat', None), getattr(journey, 'from_lon', None)
+        if lat is None or lon is None or not driver_ids:
+            return {}
+        try:
+            return driver_locations.distances(driver_ids, lat, lon)
+        except RedisError as e:
+            logger.warning(f"Driver locations unavailable: {e}")
+            return {}
+
+    def offer(self, order: Order) -> List[DriverRecord]:
+        """Top K haydovchini tanlash va taklif qilinganlarni cache ga yozish"""
+        drivers = self.rank(order)
+        cache.set(self._offers_key(order.pk), [driver.id for driver in drivers], OFFERS_TTL)
+        logger.info(f"Order {order.pk} offered to {len(drivers)} drivers")
+        return drivers
+
+    @staticmethod
+    def _offers_key(order_id: int) -> str:
+        return f"{OFFERS_KEY_PREFIX}:{order_id}"
+
+    def offered_driver_ids(self, order_id: int) -> Optional[List[int]]:
+        """Order taklif qilingan haydovchilar; dispatch qilinmagan bo'lsa None"""
+        return cache.get(self._offers_key(order_id))
+
+    def ineligibility(self, order_id: int, driver_id: int) -> Optional[str]:
+        """
+        Haydovchi orderni ololmasa sababi, aks holda None. rank() dagi qoidalar:
+        online, mashina classi mos, balans komissiyaga yetadi, faol orderlar max_active_orders dan kam
+        """
+        driver = Driver.objects.filter(pk=driver_id).values('status', 'amount').first()
+        if driver is None:
+            return "Driver topilmadi"
+        if driver['status'] != DriverStatus.ONLINE:
+            return "Haydovchi online emas"
+
+        order = Order.objects.filter(pk=order_id).values('price', 'travel_class').first() or {}
+        allowed_classes = CAR_CLASS_COMPAT.get(order.get('travel_class'))
+        if allowed_classes is not None and not Car.objects.filter(
+                driver_id=driver_id, car_class__in=allowed_classes).exists():
+            return "Mashina classi mos emas"
+        if driver['amount'] < (order.get('price') or 0) * self.commission_rate:
+            return "Balans komissiya uchun yetarli emas"
+
+        try:
+            counts = driver_registry.active_counts([driver_id])
+        except RedisError as e:
+            logger.warning(f"Driver registry unavailable, counting active orders in SQL: {e}")
+            counts = None
+        if counts is not None:
+            active_orders = counts[driver_id]
+        else:
+            active_orders = Order.objects.filter(driver_id=driver_id, status__in=ACTIVE_ORDER_STATUSES).count()
+        if active_orders >= self.max_active_orders:
+            return "Haydovchining faol orderlari chegarada"
+        return None
+
+    def can_accept(self, order_id: int, driver_id: int) -> bool:
+        """
+        Dispatch qilinmagan yoki nomzod topilmagan (bo'sh ro'yxat - DriverService.notify
+        hammaga yuboradi) order ni har qanday haydovchi qabul qiladi, aks holda faqat taklif olganlar
+        """
+        offered = self.offered_driver_ids(order_id)
+        return not offered or driver_id in offered
+
+
+dispatch_engine = DispatchEngine(
+    DispatchIndex(refresh_interval=env.DISPATCH_REFRESH_INTERVAL, rebuild_ttl=env.DISPATCH_REBUILD_TTL),
+    top_k=env.DISPATCH_TOP_K,
+    max_active_orders=env.DISPATCH_MAX_ACTIVE_ORDERS,
+    commission_rate=env.DISPATCH_COMMISSION_RATE,
+)
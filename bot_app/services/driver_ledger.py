@@ -0,0 +1,179 @@
+# services/driver_ledger.py
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from configuration import env
+from ..models import Driver, DriverTransaction, Order, TransactionKind
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerError(Exception):
+    pass
+
+
+def api_idempotency_key(key: Optional[str]) -> Optional[str]:
+    """Mijoz kalitlari ichki kalitlar (commission:, opening:) bilan to'qnashmasligi uchun"""
+    return f"api:{key}" if key else None
+
+
+@dataclass(frozen=True)
+class Drift:
+    driver_id: int
+    balance: float
+    ledger: float
+
+    @property
+    def difference(self) -> float:
+        return self.balance - self.ledger
+
+
+class DriverLedger:
+    """
+    Haydovchi balansi o'zgarishlari: har biri DriverTransaction yozuvi va
+    Driver.amount ning F() bilan atomar UPDATE i, bitta tranzaksiyada.
+
+    Read-modify-write yo'q, shuning uchun parallel yechishlar bir-birini
+    yo'qotmaydi va qator faqat bitta UPDATE davomida lock bo'ladi.
+    idempotency_key berilsa operatsiya bir marta qo'llanadi (unique indeks).
+    Driver.amount ning ledger dan tashqari o'zgarishlari (eski ma'lumotlar,
+    qo'lda SQL) `manage.py reconcile_driver_balances --fix` da tuzatish
+    yozuvi sifatida qayd etiladi.
+    """
+
+    def __init__(self, commission_rate: float = 0.05):
+        self.commission_rate = commission_rate
+
+    def post(
+            self,
+            driver_id: int,
+            amount: float,
+            kind: str,
+            order: Optional[Order] = None,
+            idempotency_key: Optional[str] = None
+    ) -> Tuple[DriverTransaction, bool]:
+        """(yozuv, qo'llandi) - kalit bilan avval yozilgan bo'lsa (mavjud yozuv, False)"""
+        amount = round(amount)
+        with transaction.atomic():
+            try:
+                # Savepoint: dublikat kalit tashqi tranzaksiyani buzmasligi uchun
+                with transaction.atomic():
+                    entry = DriverTransaction.objects.create(
+                        driver_id=driver_id,
+                        amount=amount,
+                        kind=kind,
+                        order=order,
+                        idempotency_key=idempotency_key,
+                    )
+            except IntegrityError:
+                if idempotency_key is None:
+                    raise
+                return DriverTransaction.objects.get(idempotency_key=idempotency_key), False
+
+            # updated_at: DispatchIndex.sync balans o'zgarishini ko'rishi uchun
+            updated = Driver.objects.filter(pk=driver_id).update(
+                amount=F('amount') + amount, updated_at=timezone.now()
+            )
+            if not updated:
+                raise LedgerError(f"Driver {driver_id} topilmadi")
+        return entry, True
+
+    def set_balance(self, driver_id: int, amount: float, kind: str = TransactionKind.ADJUSTMENT) -> Optional[DriverTransaction]:
+        """
+        Balansni berilgan qiymatga keltirish (API dagi `amount` yozuvi): farq joriy
+        qiymatdan - qator lock bilan - hisoblanib, tuzatish yozuvi sifatida post qilinadi
+        """
+        with transaction.atomic():
+            current = Driver.objects.select_for_update().filter(pk=driver_id).values_list('amount', flat=True).first()
+            if current is None:
+                raise LedgerError(f"Driver {driver_id} topilmadi")
+            if round(amount) == current:
+                return None
+            entry, _ = self.post(driver_id, amount - current, kind)
+        return entry
+
+    @staticmethod
+    def open_account(driver: Driver) -> Optional[DriverTransaction]:
+        """Yangi haydovchining boshlang'ich balansi (balans allaqachon Driver.amount da)"""
+        if not driver.amount:
+            return None
+        entry, _ = DriverTransaction.objects.get_or_create(
+            idempotency_key=f"opening:{driver.pk}",
+            defaults={'driver': driver, 'amount': driver.amount, 'kind': TransactionKind.OPENING},
+        )
+        return entry
+
+    def balance(self, driver_id: int) -> int:
+        return Driver.objects.filter(pk=driver_id).values_list('amount', flat=True).get()
+
+    @staticmethod
+    def _order_price(order: Order) -> Optional[float]:
+        if order.price is not None:
+            return order.price
+        return getattr(order.content_object, 'price', None)
+
+    def charge_commission(self, order: Order, driver_id: Optional[int] = None) -> Optional[DriverTransaction]:
+        """Order haydovchiga biriktirilganda komissiya - har bir (order, haydovchi) uchun bir marta"""
+        driver_id = driver_id or order.driver_id
+        price = self._order_price(order)
+        if not driver_id or not price:
+            return None
+        entry, applied = self.post(
+            driver_id,
+            -price * self.commission_rate,
+            TransactionKind.COMMISSION,
+            order=order,
+            idempotency_key=f"commission:{order.pk}:{driver_id}",
+        )
+        return entry if applied else None
+
+    # Reconciliation
+
+    @staticmethod
+    def ledger_sums(driver_ids: Optional[Iterable[int]] = None) -> Dict[int, float]:
+        entries = DriverTransaction.objects.exclude(kind=TransactionKind.LEGACY)
+        if driver_ids is not None:
+            entries = entries.filter(driver_id__in=driver_ids)
+        return dict(entries.values_list('driver_id').annotate(total=Sum('amount')).order_by())
+
+    def drifts(self, batch_size: int = 1000) -> List[Drift]:
+        """Driver.amount ledger yig'indisiga teng bo'lmagan haydovchilar"""
+        result = []
+        balances = Driver.objects.order_by('pk').values_list('pk', 'amount')
+        last_id = 0
+        while True:
+            batch = list(balances.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                return result
+            sums = self.ledger_sums([driver_id for driver_id, _ in batch])
+            for driver_id, amount in batch:
+                ledger = sums.get(driver_id, 0)
+                if amount != ledger:
+                    result.append(Drift(driver_id, amount, ledger))
+            last_id = batch[-1][0]
+
+    def fix_drift(self, driver_id: int) -> Optional[DriverTransaction]:
+        """
+        Ledger dan tashqaridagi balans o'zgarishini tuzatish yozuvi bilan qayd etish
+        (balansning o'zi o'zgarmaydi). Qator lock qilinadi, parallel post lar kutadi.
+        """
+        with transaction.atomic():
+            amount = Driver.objects.select_for_update().filter(pk=driver_id).values_list('amount', flat=True).get()
+            ledger = self.ledger_sums([driver_id]).get(driver_id, 0)
+            if amount == ledger:
+                return None
+            has_entries = DriverTransaction.objects.filter(driver_id=driver_id).exclude(
+                kind=TransactionKind.LEGACY).exists()
+            return DriverTransaction.objects.create(
+                driver_id=driver_id,
+                amount=amount - ledger,
+                kind=TransactionKind.ADJUSTMENT if has_entries else TransactionKind.OPENING,
+            )
+
+
+driver_ledger = DriverLedger(commission_rate=env.DISPATCH_COMMISSION_RATE)
@@ -0,0 +1,223 @@
+# services/driver_locations.py
+import logging
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from configuration import env
+from ..models import Driver, DriverStatus
+from ..utils.distance_utils import distances_from_point
+from ..utils.redis_utils import get_redis, redis_configured
+from .driver_registry import driver_registry
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "driver_locations"
+
+# Redis GEO chegaralari (EPSG:900913)
+MAX_LATITUDE = 85.05112878
+
+# Eskirgan pozitsiyalarni GEO va "seen" dan birga o'chirish (ping bilan poyga bo'lmasligi uchun atomar).
+# ARGV: cutoff timestamp, limit
+PRUNE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #stale > 0 then
+    redis.call('ZREM', KEYS[1], unpack(stale))
+    redis.call('ZREM', KEYS[2], unpack(stale))
+end
+return #stale
+"""
+
+
+class DriverLocationService:
+    """
+    Haydovchilarning oxirgi GPS pozitsiyalari Redis GEO da.
+
+    - {prefix}:geo - GEO to'plam, member = Driver.id
+    - {prefix}:seen - Driver.id -> oxirgi ping vaqti (unix), ttl dan eski
+      pozitsiyalar qidiruvda hisobga olinmaydi va ingest paytida tozalanadi
+    - {prefix}:telegram - telegram_id -> Driver.id (bot telegram_id bilan yuboradi)
+
+    Ping lar bitta pipeline bilan yoziladi, bazaga faqat yangi telegram_id
+    uchun bir marta murojaat qilinadi.
+    """
+
+    def __init__(self, prefix: str = PREFIX, ttl: float = 120, prune_limit: int = 1000):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.prune_limit = prune_limit
+        self._prune = None
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    def remember_driver(self, driver: Driver):
+        if driver.telegram_id is not None:
+            get_redis().hset(self._key("telegram"), driver.telegram_id, driver.pk)
+
+    def forget_driver(self, driver: Driver):
+        pipe = get_redis().pipeline()
+        if driver.telegram_id is not None:
+            pipe.hdel(self._key("telegram"), driver.telegram_id)
+        pipe.zrem(self._key("geo"), driver.pk)
+        pipe.zrem(self._key("seen"), driver.pk)
+        pipe.execute()
+
+    def _driver_ids_by_telegram(self, telegram_ids: List[int]) -> Dict[int, int]:
+        if not telegram_ids:
+            return {}
+        client = get_redis()
+        values = client.hmget(self._key("telegram"), telegram_ids)
+        result = {telegram_id: int(value) for telegram_id, value in zip(telegram_ids, values) if value is not None}
+
+        missing = [telegram_id for telegram_id in telegram_ids if telegram_id not in result]
+        if missing:
+            found = dict(Driver.objects.filter(telegram_id__in=missing).values_list('telegram_id', 'id'))
+            if found:
+                client.hset(self._key("telegram"), mapping=found)
+            result.update(found)
+        return result
+
+    @staticmethod
+    def _parse_ping(ping) -> Tuple[Optional[int], Optional[int], float, float, Optional[float]]:
+        """(driver_id, telegram_id, lat, lon, timestamp); noto'g'ri ping uchun ValueError"""
+        if not isinstance(ping, dict):
+            raise ValueError("ping must be an object")
+        lat = float(ping["latitude"])
+        lon = float(ping["longitude"])
+        if not (-MAX_LATITUDE <= lat <= MAX_LATITUDE and -180 <= lon <= 180):
+            raise ValueError("coordinates out of range")
+        driver_id = ping.get("driver_id")
+        telegram_id = ping.get("telegram_id")
+        if driver_id is None and telegram_id is None:
+            raise ValueError("driver_id or telegram_id is required")
+        timestamp = ping.get("timestamp")
+        if timestamp is not None and not math.isfinite(float(timestamp)):
+            raise ValueError("invalid timestamp")
+        return (
+            int(driver_id) if driver_id is not None else None,
+            int(telegram_id) if telegram_id is not None else None,
+            lat,
+            lon,
+            float(timestamp) if timestamp is not None else None,
+        )
+
+    def ingest(self, pings: Iterable[dict]) -> Dict[str, int]:
+        """Ping lar to'plamini yozish: {"accepted": .., "rejected": .., "pruned": ..}"""
+        now = time.time()
+        parsed = []
+        rejected = 0
+        for ping in pings:
+            try:
+                parsed.append(self._parse_ping(ping))
+            except (KeyError, TypeError, ValueError):
+                rejected += 1
+
+        telegram_map = self._driver_ids_by_telegram(
+            list({telegram_id for driver_id, telegram_id, *_ in parsed if driver_id is None})
+        )
+
+        # Bitta haydovchining eng so'nggi pingi qoladi
+        latest: Dict[int, Tuple[float, float, float]] = {}
+        for driver_id, telegram_id, lat, lon, timestamp in parsed:
+            driver_id = driver_id if driver_id is not None else telegram_map.get(telegram_id)
+            # Kelajakdagi vaqt belgisi ping ni "abadiy yangi" qilib qo'ymasligi uchun
+            seen_at = min(timestamp, now) if timestamp is not None else now
+            if driver_id is None or now - seen_at > self.ttl:
+                rejected += 1
+                continue
+            if driver_id not in latest or latest[driver_id][2] <= seen_at:
+                latest[driver_id] = (lat, lon, seen_at)
+
+        pruned = 0
+        if latest:
+            client = get_redis()
+            if self._prune is None:
+                self._prune = client.register_script(PRUNE_SCRIPT)
+            pipe = client.pipeline()
+            pipe.geoadd(self._key("geo"), [
+                value for driver_id, (lat, lon, _) in latest.items() for value in (lon, lat, driver_id)
+            ])
+            pipe.zadd(self._key("seen"), {driver_id: seen_at for driver_id, (_, _, seen_at) in latest.items()})
+            self._prune(keys=[self._key("geo"), self._key("seen")], args=[now - self.ttl, self.prune_limit],
+                        client=pipe)
+            pruned = pipe.execute()[-1]
+
+        return {"accepted": len(latest), "rejected": rejected, "pruned": pruned}
+
+    def nearby(
+            self,
+            lat: float,
+            lon: float,
+            radius_km: float,
+            limit: int = 50,
+            online_only: bool = True
+    ) -> List[Dict[str, float]]:
+        """Radius ichidagi haydovchilar, eng yaqini birinchi: [{"driver_id", "distance_km", ...}]"""
+        client = get_redis()
+        # Eskirgan va offline lar filterlanganidan keyin limit ga yetishi uchun zaxira bilan
+        matches = client.geosearch(
+            self._key("geo"), longitude=lon, latitude=lat, radius=radius_km, unit="km",
+            sort="ASC", count=limit * 3, withdist=True, withcoord=True,
+        )
+        if not matches:
+            return []
+
+        ids = [int(member) for member, *_ in matches]
+        pipe = client.pipeline(transaction=False)
+        pipe.zmscore(self._key("seen"), ids)
+        if online_only:
+            pipe.exists(driver_registry.built_key)
+            pipe.smismember(driver_registry.online_key, ids)
+        results = pipe.execute()
+        seen = results[0]
+        if not online_only:
+            online = [True] * len(ids)
+        elif results[1]:
+            online = results[2]
+        else:
+            # Reyestr hali qurilmagan: deploydan keyin saqlanmagan online haydovchilar to'plamda yo'q
+            online_ids = set(Driver.objects.filter(id__in=ids, status=DriverStatus.ONLINE).values_list('id', flat=True))
+            online = [driver_id in online_ids for driver_id in ids]
+
+        cutoff = time.time() - self.ttl
+        drivers = []
+        for (member, distance, (driver_lon, driver_lat)), seen_at, is_online in zip(matches, seen, online):
+            if seen_at is None or seen_at < cutoff or not is_online:
+                continue
+            drivers.append({
+                "driver_id": int(member),
+                "distance_km": round(distance, 3),
+                "latitude": driver_lat,
+                "longitude": driver_lon,
+                "seen_at": seen_at,
+            })
+            if len(drivers) >= limit:
+                break
+        return drivers
+
+    def distances(self, driver_ids: List[int], lat: float, lon: float) -> Dict[int, float]:
+        """Yangi pozitsiyasi bor haydovchilargacha masofa (km); Redis sozlanmagan bo'lsa bo'sh"""
+        if not driver_ids or not redis_configured():
+            return {}
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.geopos(self._key("geo"), *driver_ids)
+        pipe.zmscore(self._key("seen"), driver_ids)
+        positions, seen = pipe.execute()
+
+        cutoff = time.time() - self.ttl
+        located = [
+            (driver_id, position) for driver_id, position, seen_at in zip(driver_ids, positions, seen)
+            if position is not None and seen_at is not None and seen_at >= cutoff
+        ]
+        if not located:
+            return {}
+        lons = np.array([position[0] for _, position in located])
+        lats = np.array([position[1] for _, position in located])
+        distances = distances_from_point(lat, lon, lats, lons)
+        return {driver_id: float(distance) for (driver_id, _), distance in zip(located, distances)}
+
+
+driver_locations = DriverLocationService(ttl=env.DRIVER_LOCATION_TTL)
@@ -0,0 +1,256 @@
+# services/driver_registry.py
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.db.models import Count
+from redis.exceptions import RedisError
+
+from configuration import env
+from ..models import ACTIVE_ORDER_STATUSES, Car, Driver, DriverStatus, Order
+from ..utils.redis_utils import get_redis, redis_configured
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "driver_registry"
+
+# Haydovchi holatini almashtirish: eski to'plamlardan olib tashlash va online bo'lsa yangilariga qo'shish.
+# ARGV: driver_id, online (0/1), from_city_id, to_city_id, car classlar (vergul bilan)
+SET_STATE_SCRIPT = """
+local prefix = KEYS[1]
+local id = ARGV[1]
+local state_key = prefix .. ':state:' .. id
+local old = redis.call('HMGET', state_key, 'from', 'to', 'classes')
+if old[1] then
+    redis.call('SREM', prefix .. ':route:' .. old[1] .. ':' .. old[2], id)
+    redis.call('SREM', prefix .. ':from:' .. old[1], id)
+    for car_class in string.gmatch(old[3] or '', '[^,]+') do
+        redis.call('SREM', prefix .. ':class:' .. car_class, id)
+    end
+    redis.call('SREM', prefix .. ':online', id)
+    redis.call('DEL', state_key)
+end
+if ARGV[2] == '1' then
+    redis.call('HSET', state_key, 'from', ARGV[3], 'to', ARGV[4], 'classes', ARGV[5])
+    redis.call('SADD', prefix .. ':route:' .. ARGV[3] .. ':' .. ARGV[4], id)
+    redis.call('SADD', prefix .. ':from:' .. ARGV[3], id)
+    for car_class in string.gmatch(ARGV[5], '[^,]+') do
+        redis.call('SADD', prefix .. ':class:' .. car_class, id)
+    end
+    redis.call('SADD', prefix .. ':online', id)
+end
+return 1
+"""
+
+# Faol orderlar hisoblagichi va band haydovchilar to'plami birgalikda.
+# ARGV: driver_id, delta, busy limit
+ADJUST_ACTIVE_SCRIPT = """
+local prefix = KEYS[1]
+local id = ARGV[1]
+local count = redis.call('HINCRBY', prefix .. ':active', id, tonumber(ARGV[2]))
+if count <= 0 then
+    redis.call('HDEL', prefix .. ':active', id)
+    count = 0
+end
+if count >= tonumber(ARGV[3]) then
+    redis.call('SADD', prefix .. ':busy', id)
+else
+    redis.call('SREM', prefix .. ':busy', id)
+end
+return count
+"""
+
+
+class DriverRegistry:
+    """
+    Online haydovchilarning Redis dagi jonli reyestri.
+
+    - {prefix}:route:{from}:{to} / {prefix}:from:{from} / {prefix}:class:{car_class}
+      / {prefix}:online - online haydovchi id lari to'plamlari
+    - {prefix}:state:{id} - haydovchi hozir qaysi to'plamlarda ekanligi
+    - {prefix}:active - haydovchi -> faol orderlar soni (hash)
+    - {prefix}:busy - faol orderlari max_active_orders ga yetganlar
+    - {prefix}:built - rebuild tugaganligi belgisi
+
+    Har bir o'zgarish bitta Lua skript bilan atomar bajariladi. Driver, Car va
+    Order signallari reyestrni yangilab turadi; boshlang'ich holat va drift uchun
+    `manage.py rebuild_driver_registry`.
+    """
+
+    def __init__(self, prefix: str = PREFIX, max_active_orders: int = 4):
+        self.prefix = prefix
+        self.max_active_orders = max_active_orders
+        self._set_state = None
+        self._adjust_active = None
+
+    def _key(self, *parts) -> str:
+        return ":".join([self.prefix, *map(str, parts)])
+
+    @property
+    def online_key(self) -> str:
+        return self._key("online")
+
+    @property
+    def built_key(self) -> str:
+        return self._key("built")
+
+    def _scripts(self):
+        if self._set_state is None:
+            client = get_redis()
+            self._set_state = client.register_script(SET_STATE_SCRIPT)
+            self._adjust_active = client.register_script(ADJUST_ACTIVE_SCRIPT)
+        return self._set_state, self._adjust_active
+
+    @staticmethod
+    def _car_classes(driver_id: int) -> List[str]:
+        return sorted(set(Car.objects.filter(driver_id=driver_id).values_list('car_class', flat=True)))
+
+    def set_driver_state(self, driver: Driver, car_classes: Optional[Iterable[str]] = None):
+        """Driver holati (status, yo'nalish, mashina classlari) ni reyestrga yozish"""
+        if car_classes is None:
+            car_classes = self._car_classes(driver.pk)
+        set_state, _ = self._scripts()
+        set_state(keys=[self.prefix], args=[
+            driver.pk,
+            1 if driver.status == DriverStatus.ONLINE else 0,
+            driver.from_location_id or 0,
+            driver.to_location_id or 0,
+            ",".join(car_classes),
+        ])
+
+    def remove_driver(self, driver_id: int):
+        set_state, _ = self._scripts()
+        set_state(keys=[self.prefix], args=[driver_id, 0, 0, 0, ""])
+        client = get_redis()
+        client.hdel(self._key("active"), driver_id)
+        client.srem(self._key("busy"), driver_id)
+
+    def adjust_active(self, driver_id: int, delta: int) -> int:
+        _, adjust_active = self._scripts()
+        return adjust_active(keys=[self.prefix], args=[driver_id, delta, self.max_active_orders])
+
+    def recount_active(self, driver_ids: Iterable[int]):
+        """Hisoblagichni bazadagi faol orderlar soniga tenglash (queryset.update() lardan keyin)"""
+        driver_ids = [driver_id for driver_id in set(driver_ids) if driver_id]
+        if not driver_ids:
+            return
+        counts = dict(
+            Order.objects.filter(driver_id__in=driver_ids, status__in=ACTIVE_ORDER_STATUSES)
+            .values_list('driver_id').annotate(count=Count('id')).order_by()
+        )
+        pipe = get_redis().pipeline()
+        for driver_id in driver_ids:
+            self._write_active(pipe, driver_id, counts.get(driver_id, 0))
+        pipe.execute()
+
+    def _write_active(self, pipe, driver_id: int, count: int):
+        if count:
+            pipe.hset(self._key("active"), driver_id, count)
+        else:
+            pipe.hdel(self._key("active"), driver_id)
+        if count >= self.max_active_orders:
+            pipe.sadd(self._key("busy"), driver_id)
+        else:
+            pipe.srem(self._key("busy"), driver_id)
+
+    # O'qish
+
+    def busy_driver_ids(self) -> Optional[Set[int]]:
+        """Band haydovchilar; reyestr hali qurilmagan (yoki Redis sozlanmagan) bo'lsa None"""
+        if not redis_configured():
+            return None
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.exists(self._key("built"))
+        pipe.smembers(self._key("busy"))
+        built, busy = pipe.execute()
+        return {int(driver_id) for driver_id in busy} if built else None
+
+    def active_counts(self, driver_ids: Iterable[int]) -> Optional[Dict[int, int]]:
+        """Haydovchilarning faol orderlari soni; reyestr hali qurilmagan (yoki Redis sozlanmagan) bo'lsa None"""
+        if not redis_configured():
+            return None
+        driver_ids = list(driver_ids)
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.exists(self._key("built"))
+        pipe.hmget(self._key("active"), driver_ids or [0])
+        built, values = pipe.execute()
+        if not built:
+            return None
+        return {driver_id: int(value or 0) for driver_id, value in zip(driver_ids, values)}
+
+    def available(
+            self,
+            from_city_id: int,
+            to_city_id: Optional[int] = None,
+            car_classes: Optional[Iterable[str]] = None
+    ) -> Optional[Set[int]]:
+        """
+        Yo'nalish (yoki faqat from shahri) bo'yicha online va band bo'lmagan haydovchilar;
+        reyestr hali qurilmagan (yoki Redis sozlanmagan) bo'lsa None
+        """
+        if not redis_configured():
+            return None
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.exists(self._key("built"))
+        if to_city_id is None:
+            pipe.smembers(self._key("from", from_city_id))
+        else:
+            pipe.smembers(self._key("route", from_city_id, to_city_id))
+        if car_classes is not None:
+            pipe.sunion([self._key("class", car_class) for car_class in car_classes] or [self._key("class", "")])
+        pipe.smembers(self._key("busy"))
+        built, drivers, *rest = pipe.execute()
+        if not built:
+            return None
+
+        if car_classes is not None:
+            drivers &= rest[0]
+        drivers -= rest[-1]
+        return {int(driver_id) for driver_id in drivers}
+
+    # Qayta qurish
+
+    def rebuild(self) -> Dict[str, int]:
+        """Reyestrni bazadan to'liq qayta qurish"""
+        client = get_redis()
+        keys = list(client.scan_iter(match=f"{self.prefix}:*", count=1000))
+        if keys:
+            client.delete(*keys)
+
+        car_classes: Dict[int, Set[str]] = {}
+        for driver_id, car_class in Car.objects.values_list('driver_id', 'car_class'):
+            car_classes.setdefault(driver_id, set()).add(car_class)
+
+        online = 0
+        for driver in Driver.objects.filter(status=DriverStatus.ONLINE).only(
+                'id', 'status', 'from_location_id', 'to_location_id'):
+            self.set_driver_state(driver, sorted(car_classes.get(driver.pk, ())))
+            online += 1
+
+        counts = dict(
+            Order.objects.filter(driver__isnull=False, status__in=ACTIVE_ORDER_STATUSES)
+            .values_list('driver_id').annotate(count=Count('id')).order_by()
+        )
+        pipe = client.pipeline()
+        for driver_id, count in counts.items():
+            self._write_active(pipe, driver_id, count)
+        # O'qiydiganlar shu kalit bo'lmaguncha SQL ga qaytadi
+        pipe.set(self._key("built"), 1)
+        pipe.execute()
+
+        return {"online": online, "with_active_orders": len(counts)}
+
+
+driver_registry = DriverRegistry(max_active_orders=env.DISPATCH_MAX_ACTIVE_ORDERS)
+
+
+def safe_registry_call(func, *args, **kwargs):
+    """
+    Reyestr yangilanishi so'rovni buzmasligi kerak: Redis xatosi log qilinadi,
+    REDIS_URL bo'sh bo'lsa (LocMem rejimi) yangilanish o'tkazib yuboriladi
+    """
+    if not redis_configured():
+        return None
+    try:
+        return func(*args, **kwargs)
+    except RedisError as e:
+        logger.warning(f"Driver registry update failed: {e}")
@@ -1,17 +1,24 @@
-
-from ..models import PassengerTravel, PassengerPost, Order, TravelStatus
+from ..models import TravelStatus
 from ..serializers.order import OrderSerializer
 from ..services.base import BaseService
+from ..services.dispatch_service import dispatch_engine
+from ..services.order_service import get_order_for_notification
+
+
 class DriverService(BaseService):
 
     def notify(self, order_id: int):
-        order = Order.objects.get(id=order_id)
+        order = get_order_for_notification(order_id)
+        payload = OrderSerializer(order).data
+
+        # Yangi order barcha haydovchilarga emas, dispatch tanlagan top K ga taklif qilinadi.
+        # Nomzod topilmasa offer_to yuborilmaydi (bot avvalgidek hammaga yuboradi).
+        if order.driver_id is None and order.status == TravelStatus.CREATED:
+            drivers = dispatch_engine.offer(order)
+            if drivers:
+                payload["offer_to"] = [driver.telegram_id for driver in drivers]
 
         return self._request(
                 "POST",
                 "driver",
-                json=OrderSerializer(order).data)
-
-
-
-
+                json=payload)
@@ -0,0 +1,125 @@
+# services/geocode_cache.py
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils import timezone
+
+from configuration import env
+from ..models import GeocodeCache
+from ..utils import geohash
+from ..utils.cache_metrics import cache_metrics
+from ..utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodeCacheService:
+    """
+    Reverse-geocode natijalari uchun ko'p bosqichli cache:
+    process ichidagi LRU -> Django cache (Redis) -> GeocodeCache jadvali.
+
+    Kalit - geohash katagi, shuning uchun yaqin nuqtalar bitta yozuvni bo'lishadi.
+    Pastki bosqichda topilgan natija yuqori bosqichlarga ham yoziladi.
+    """
+
+    KEY_PREFIX = "geocode"
+
+    def __init__(
+            self,
+            precision: int = 7,
+            lru_size: int = 10000,
+            lru_ttl: float = 3600,
+            cache_ttl: int = 7 * 24 * 3600,
+            db_ttl_days: int = 180,
+    ):
+        self.precision = precision
+        self.cache_ttl = cache_ttl
+        self.db_ttl_days = db_ttl_days
+        self.lru = LRUCache(lru_size, lru_ttl)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"lru_hits": 0, "cache_hits": 0, "db_hits": 0, "misses": 0}
+
+    def key_for(self, lat: float, lon: float) -> str:
+        return geohash.encode(lat, lon, self.precision)
+
+    def _cache_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            self._stats[counter] += 1
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Faqat xotira bosqichlari (LRU va Redis), statistikasiz"""
+        value = self.lru.get(key)
+        if value is None:
+            value = cache.get(self._cache_key(key))
+        return value
+
+    def _load_from_db(self, key: str) -> Optional[Dict[str, Any]]:
+        min_updated_at = timezone.now() - timedelta(days=self.db_ttl_days)
+        entry = GeocodeCache.objects.filter(geohash=key, updated_at__gte=min_updated_at).only('address').first()
+        return entry.address if entry else None
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.lru.get(key)
+        if value is not None:
+            self._count("lru_hits")
+            return value
+
+        value = cache.get(self._cache_key(key))
+        if value is not None:
+            self._count("cache_hits")
+            cache_metrics.hit(self.KEY_PREFIX)
+            self.lru.set(key, value)
+            return value
+        cache_metrics.miss(self.KEY_PREFIX)
+
+        value = await sync_to_async(self._load_from_db)(key)
+        if value is not None:
+            self._count("db_hits")
+            cache.set(self._cache_key(key), value, self.cache_ttl)
+            self.lru.set(key, value)
+            return value
+
+        self._count("misses")
+        return None
+
+    def _save_to_db(self, key: str, value: Dict[str, Any]):
+        GeocodeCache.objects.update_or_create(geohash=key, defaults={"address": value})
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        self.lru.set(key, value)
+        cache.set(self._cache_key(key), value, self.cache_ttl)
+        try:
+            await sync_to_async(self._save_to_db)(key, value)
+        except Exception as e:
+            logger.warning(f"Geocode cache DB write failed for {key}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        lookups = sum(stats.values())
+        hits = lookups - stats["misses"]
+        stats.update({
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "lru_size": len(self.lru),
+            "precision": self.precision,
+        })
+        return stats
+
+
+geocode_cache = GeocodeCacheService(
+    precision=env.GEOCODE_GEOHASH_PRECISION,
+    lru_size=env.GEOCODE_LRU_SIZE,
+    lru_ttl=env.GEOCODE_LRU_TTL,
+    cache_ttl=env.GEOCODE_CACHE_TTL,
+    db_ttl_days=env.GEOCODE_DB_TTL_DAYS,
+)
@@ -2,16 +2,21 @@
 import math
 import asyncio
 from typing import Dict, Any, List, Optional, Tuple
-from asgiref.sync import sync_to_async
 from ..models import City
+from .city_index import city_index
+from .geocode_cache import geocode_cache
+from ..utils.cache_metrics import cache_metrics
+from ..utils.distance_utils import distances_from_point, distance_matrix
 from ..utils.nominatim_utils import aget_coords_from_place, aget_place_from_coords
+from ..utils.singleflight import SingleFlight
 from django.core.cache import cache
 
+geocode_flight = SingleFlight("geocode")
+
 
 class GlobalLocationService:
     # Cache time in seconds
     COORDINATES_CACHE_TIME = 3600  # 1 hour
-    PLACE_CACHE_TIME = 1800  # 30 minutes
 
     @staticmethod
     def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -30,43 +35,90 @@ class GlobalLocationService:
 
         return R * c
 
+    @staticmethod
+    def calculate_distances(lat: float, lon: float, points: List[Tuple[float, float]]) -> List[float]:
+        """Bitta nuqtadan ko'p nuqtalargacha masofalar (km), vektorlashgan"""
+        if not points:
+            return []
+        lats, lons = zip(*points)
+        return distances_from_point(lat, lon, lats, lons).tolist()
+
+    @staticmethod
+    def calculate_distance_matrix(
+            origins: List[Tuple[float, float]],
+            destinations: List[Tuple[float, float]]
+    ) -> List[List[float]]:
+        """Ko'p nuqtadan ko'p nuqtaga masofalar matritsasi (km), vektorlashgan"""
+        if not origins or not destinations:
+            return [[] for _ in origins]
+        origin_lats, origin_lons = zip(*origins)
+        destination_lats, destination_lons = zip(*destinations)
+        return distance_matrix(origin_lats, origin_lons, destination_lats, destination_lons).tolist()
+
     @staticmethod
     async def get_city_coordinates(city_name: str = "", country: str = "uz") -> Optional[Tuple[float, float]]:
-        """Shahar nomi bo'yicha koordinatalarni Nominatim orqali olish (cached)"""
-        cache_key = f"city_coords_{city_name.lower()}_{country}"
+        """
+        Shahar nomi bo'yicha koordinatalarni olish.
+        Avval bazadagi koordinatalar, keyin cache, faqat noma'lum nomlar uchun Nominatim.
+        """
+        stored_coords = await city_index.acoordinates(city_name)
+        if stored_coords:
+            return stored_coords
+
+        cache_key = f"city_coords:{city_name.lower()}:{country}"
 
         # Cache dan tekshirish
         cached_coords = cache.get(cache_key)
         if cached_coords:
+            cache_metrics.hit("city_coords")
             return cached_coords
+        cache_metrics.miss("city_coords")
 
-        try:
+        async def fetch_coords():
             results = await aget_coords_from_place(city_name, country_code=country, limit=1)
             if results and results[0].get('lat') and results[0].get('lon'):
                 coords = (float(results[0]['lat']), float(results[0]['lon']))
                 # Cache ga saqlash
                 cache.set(cache_key, coords, GlobalLocationService.COORDINATES_CACHE_TIME)
                 return coords
+            return None
+
+        try:
+            # Bir xil nom uchun parallel so'rovlar bitta Nominatim so'roviga birlashtiriladi
+            return await geocode_flight.do(cache_key, fetch_coords, peek=lambda: cache.get(cache_key))
         except Exception:
-            pass
+            return None
 
-        return None
+    @staticmethod
+    async def resolve_city_coordinates(city: City) -> Optional[Tuple[float, float]]:
+        """City obyektining koordinatalari: saqlangan bo'lsa darhol, aks holda nom bo'yicha"""
+        if city.latitude is not None and city.longitude is not None:
+            return city.latitude, city.longitude
+        return await GlobalLocationService.get_city_coordinates(city.title)
 
     @staticmethod
     async def get_place_info(lat: float, lon: float) -> Dict[str, Any]:
-        """Koordinatalar bo'yicha joy ma'lumotlarini olish (cached)"""
-        cache_key = f"place_info_{lat:.4f}_{lon:.4f}"
+        """Koordinatalar bo'yicha joy ma'lumotlarini olish (geohash katagi bo'yicha cached)"""
+        key = geocode_cache.key_for(lat, lon)
 
-        # Cache dan tekshirish
-        cached_info = cache.get(cache_key)
+        # LRU -> Redis -> DB
+        cached_info = await geocode_cache.aget(key)
         if cached_info:
-            return cached_info
+            return {**cached_info, "lat": lat, "lon": lon}
 
-        try:
+        async def fetch_place_info():
             address_info = await aget_place_from_coords(lat, lon)
-            # Cache ga saqlash
-            cache.set(cache_key, address_info, GlobalLocationService.PLACE_CACHE_TIME)
+            # Xato natijalar cache ga yozilmaydi
+            if address_info.get("source") != "error":
+                await geocode_cache.aset(key, address_info)
             return address_info
+
+        try:
+            # Bitta katak uchun parallel so'rovlar birlashtiriladi
+            address_info = await geocode_flight.do(
+                f"place_info_{key}", fetch_place_info, peek=lambda: geocode_cache.peek(key)
+            )
+            return {**address_info, "lat": lat, "lon": lon}
         except Exception:
             return {}
 
@@ -78,10 +130,20 @@ class GlobalLocationService:
             max_distance_km: float = 20.0
     ) -> Tuple[bool, float, Dict[str, Any], Dict[str, Any]]:
         """
-        Koordinata shahar hududida ekanligini tekshirish (optimized)
+        Koordinata shahar hududida ekanligini tekshirish (optimized).
+        Shahar chegarasi saqlangan bo'lsa tarmoqsiz point-in-polygon tekshiruvi ishlatiladi.
         """
-        # Parallel ravishda ma'lumotlarni olish
-        city_coords_task = GlobalLocationService.get_city_coordinates(city.title)
+        inside = await city_index.acontains(city.id, lat, lon)
+        if inside is not None:
+            city_coords = await GlobalLocationService.resolve_city_coordinates(city)
+            distance = (
+                GlobalLocationService.calculate_distance(lat, lon, city_coords[0], city_coords[1])
+                if city_coords else 0
+            )
+            return inside, distance, {}, {}
+
+        # Chegara yo'q: radius + reverse geocode bo'yicha taxminiy tekshiruv
+        city_coords_task = GlobalLocationService.resolve_city_coordinates(city)
         address_info_task = GlobalLocationService.get_place_info(lat, lon)
 
         city_coords, address_info = await asyncio.gather(city_coords_task, address_info_task)
@@ -117,48 +179,38 @@ class GlobalLocationService:
         """
         # Joy ma'lumotlarini olish
         address_info = await GlobalLocationService.get_place_info(lat, lon)
+
+        # Chegarasi nuqtani o'z ichiga olgan eng kichik ruxsat etilgan shahar
+        for city in await city_index.acontaining(lat, lon):
+            if city.is_allowed:
+                city_coords = await GlobalLocationService.resolve_city_coordinates(city)
+                distance = (
+                    GlobalLocationService.calculate_distance(lat, lon, city_coords[0], city_coords[1])
+                    if city_coords else 0
+                )
+                return city, distance, address_info
+
         location_city_name = address_info.get('shahar_tuman', "")
 
         if not location_city_name:
             return None, 0, address_info
 
-        # Barcha ruxsat etilgan shaharlarni bir martta olish
-        @sync_to_async
-        def get_allowed_cities():
-            return list(City.objects.filter(is_allowed=True))
-
-        cities = await get_allowed_cities()
-
-        # Shahar koordinatalarini parallel olish
-        cities_with_coords = []
-        for city in cities:
-            city_coords = await GlobalLocationService.get_city_coordinates(city.title)
-            if city_coords:
-                cities_with_coords.append((city, city_coords))
+        # Radius ichidagi shaharlar indeksdan masofa bo'yicha saralangan holda olinadi
+        candidates = await city_index.awithin(lat, lon, max_distance_km)
 
         best_match = None
         min_distance = float('inf')
         location_city_name_lower = location_city_name.lower()
 
-        for city, city_coords in cities_with_coords:
-            # Nomlar mos kelishini tekshirish (tezroq)
+        for city, distance in candidates:
             city_title_lower = city.title.lower()
 
             # Nom mos kelishini tekshirish
-            name_match = (city_title_lower in location_city_name_lower or
-                          location_city_name_lower in city_title_lower)
-
-            if name_match:
-                distance = GlobalLocationService.calculate_distance(
-                    lat, lon, city_coords[0], city_coords[1]
-                )
-
-                if distance <= max_distance_km and distance < min_distance:
-                    min_distance = distance
-                    best_match = city
-                    # Agar juda yaqin bo'lsa, keyingilarini tekshirishni to'xtatish
-                    if distance < 1.0:  # 1 km dan kam
-                        break
+            if (city_title_lower in location_city_name_lower or
+                    location_city_name_lower in city_title_lower):
+                best_match = city
+                min_distance = distance
+                break
 
         return best_match, min_distance, address_info
 
@@ -218,51 +270,28 @@ class GlobalLocationService:
         address_info = await GlobalLocationService.get_place_info(lat, lon)
         location_city_name = address_info.get('shahar_tuman', '')
 
-        # Barcha ruxsat etilgan shaharlarni olish
-        @sync_to_async
-        def get_allowed_cities():
-            return list(City.objects.filter(is_allowed=True))
-
-        cities = await get_allowed_cities()
-
-        # Parallel ravishda koordinatalarni olish
-        city_coords_tasks = [GlobalLocationService.get_city_coordinates(city.title) for city in cities]
-        cities_coords = await asyncio.gather(*city_coords_tasks)
+        # Radius ichidagi eng yaqin 10 ta shahar indeksdan olinadi
+        cities = await city_index.anearest(lat, lon, k=10, max_distance_km=max_distance_km)
 
         results = []
         location_city_name_lower = location_city_name.lower()
 
-        for city, city_coords in zip(cities, cities_coords):
-            if not city_coords:
-                continue
-
-            distance = GlobalLocationService.calculate_distance(
-                lat, lon, city_coords[0], city_coords[1]
-            )
-
-            if distance <= max_distance_km:
-                match_type = "distance"
-
-                # Nom bo'yicha tekshirish
-                if location_city_name:
-                    city_title_lower = city.title.lower()
-                    if (city_title_lower in location_city_name_lower or
-                            location_city_name_lower in city_title_lower):
-                        match_type = "name"
-
-                results.append({
-                    "city": city,
-                    "distance_km": round(distance, 2),
-                    "coordinates": {"latitude": city_coords[0], "longitude": city_coords[1]},
-                    "match_type": match_type
-                })
-
-        # Masofa bo'yicha saralash
-        results.sort(key=lambda x: x["distance_km"])
-
-        # Faqat eng yaqin 10 ta shaharni qaytarish (agar ko'p bo'lsa)
-        if len(results) > 10:
-            results = results[:10]
+        for city, distance in cities:
+            match_type = "distance"
+
+            # Nom bo'yicha tekshirish
+            if location_city_name:
+                city_title_lower = city.title.lower()
+                if (city_title_lower in location_city_name_lower or
+                        location_city_name_lower in city_title_lower):
+                    match_type = "name"
+
+            results.append({
+                "city": city,
+                "distance_km": round(distance, 2),
+                "coordinates": {"latitude": city.latitude, "longitude": city.longitude},
+                "match_type": match_type
+            })
 
         return results
 
@@ -0,0 +1,164 @@
+# services/order_service.py
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import F
+from django.db.models.sql import UpdateQuery
+from django.utils import timezone
+
+from ..models import ACTIVE_ORDER_STATUSES, Order, TravelStatus
+from ..utils.generic_relations import prefetch_content_objects
+from .driver_ledger import LedgerError, driver_ledger
+from .driver_registry import driver_registry, safe_registry_call
+
+logger = logging.getLogger(__name__)
+
+# Ruxsat etilgan o'tishlar: status -> undan keyin bo'lishi mumkin bo'lganlar
+ORDER_TRANSITIONS: Dict[str, Set[str]] = {
+    TravelStatus.CREATED: {TravelStatus.ASSIGNED, TravelStatus.REJECTED},
+    TravelStatus.ASSIGNED: {TravelStatus.ARRIVED, TravelStatus.STARTED, TravelStatus.REJECTED},
+    TravelStatus.ARRIVED: {TravelStatus.STARTED, TravelStatus.REJECTED},
+    TravelStatus.STARTED: {TravelStatus.ENDED},
+    TravelStatus.ENDED: set(),
+    TravelStatus.REJECTED: set(),
+}
+
+# RETURNING ni qo'llaydigan bazalar (SQLite 3.35+)
+RETURNING_VENDORS = {"postgresql", "sqlite"}
+
+STATE_FIELDS = ("id", "status", "driver_id", "version", "price")
+
+
+class OrderTransitionError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class OrderState:
+    id: int
+    status: str
+    driver_id: Optional[int]
+    version: int
+    price: Optional[int]
+
+
+def get_order_for_notification(order_id: int) -> Order:
+    """Notification payload uchun order: driver bog'lanishlari va content obyekti bilan"""
+    order = Order.objects.select_related(
+        'content_type', 'driver__drivergallery', 'driver__from_location', 'driver__to_location'
+    ).defer(
+        'driver__from_location__boundary', 'driver__to_location__boundary'
+    ).prefetch_related('driver__driver').get(id=order_id)
+    prefetch_content_objects([order])
+    return order
+
+
+def get_order_state(order_id: int) -> Optional[OrderState]:
+    row = Order.objects.filter(pk=order_id).values_list(*STATE_FIELDS).first()
+    return OrderState(*row) if row else None
+
+
+def _conditional_update(order_id: int, conditions: dict, values: dict) -> Optional[OrderState]:
+    """
+    Bitta `UPDATE ... WHERE id = .. AND <conditions>`: shart bajarilmasa None.
+    PostgreSQL / SQLite da yangi holat RETURNING bilan shu so'rovning o'zidan olinadi.
+    Parallel so'rovlardan faqat bittasi shartni qanoatlantiradi - qolganlari qator
+    lock ini kutib, yangilangan qatorda shartni qayta tekshiradi va 0 qator oladi.
+    """
+    queryset = Order.objects.filter(pk=order_id, **conditions)
+    values = {**values, 'version': F('version') + 1, 'updated_at': timezone.now()}
+    using = router.db_for_write(Order)
+    connection = connections[using]
+
+    if connection.vendor not in RETURNING_VENDORS:
+        if not queryset.update(**values):
+            return None
+        return get_order_state(order_id)
+
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    sql, params = query.get_compiler(using).as_sql()
+    opts = Order._meta
+    columns = ", ".join(connection.ops.quote_name(opts.get_field(name).column) for name in STATE_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {columns}", params)
+        row = cursor.fetchone()
+    return OrderState(*row) if row else None
+
+
+def _after_transition(previous_driver_id: Optional[int], state: OrderState):
+    """queryset.update() signallarni chaqirmaydi: registry, komissiya va bot xabarlari shu yerda"""
+    from ..tasks.travel_tasks import notify_driver_bot, notify_passenger_bot
+
+    new_driver_id = state.driver_id if state.status in ACTIVE_ORDER_STATUSES else None
+    if previous_driver_id != new_driver_id:
+        def move():
+            if previous_driver_id:
+                safe_registry_call(driver_registry.adjust_active, previous_driver_id, -1)
+            if new_driver_id:
+                safe_registry_call(driver_registry.adjust_active, new_driver_id, 1)
+
+        transaction.on_commit(move)
+
+    if state.status == TravelStatus.ASSIGNED and state.driver_id:
+        try:
+            driver_ledger.charge_commission(Order(pk=state.id, driver_id=state.driver_id, price=state.price))
+        except (LedgerError, DatabaseError) as e:
+            logger.error(f"Commission for order {state.id} failed: {e}")
+
+    # update_order signali bilan bir xil xabarlar
+    if state.status == TravelStatus.STARTED:
+        transaction.on_commit(lambda: notify_driver_bot.delay(state.id))
+    elif state.status in (TravelStatus.ASSIGNED, TravelStatus.ARRIVED, TravelStatus.ENDED):
+        transaction.on_commit(lambda: notify_passenger_bot.delay(state.id))
+
+
+def accept_order(order_id: int, driver_id: int) -> Optional[OrderState]:
+    """
+    Haydovchi orderni qabul qiladi: `status = created AND driver IS NULL` bo'lsa
+    biriktiriladi. Bir vaqtda qabul qilganlardan faqat bittasi yutadi; qolganlariga None.
+    """
+    with transaction.atomic():
+        state = _conditional_update(
+            order_id,
+            {'status': TravelStatus.CREATED, 'driver__isnull': True},
+            {'status': TravelStatus.ASSIGNED, 'driver_id': driver_id},
+        )
+        if state is not None:
+            _after_transition(None, state)
+    return state
+
+
+def transition_order(
+        order_id: int,
+        to_status: str,
+        driver_id: Optional[int] = None,
+        expected_version: Optional[int] = None
+) -> Optional[OrderState]:
+    """
+    Orderni to_status ga o'tkazish - joriy status ORDER_TRANSITIONS bo'yicha
+    ruxsat etilganlardan biri bo'lsa (va berilgan bo'lsa, order shu haydovchiniki
+    va version mos kelsa). Shart bajarilmasa None.
+    """
+    if to_status not in ORDER_TRANSITIONS:
+        raise OrderTransitionError(f"Noma'lum status: {to_status}")
+    if to_status == TravelStatus.ASSIGNED:
+        raise OrderTransitionError("Biriktirish accept_order orqali")
+    sources = [status for status, targets in ORDER_TRANSITIONS.items() if to_status in targets]
+    if not sources:
+        raise OrderTransitionError(f"{to_status} ga o'tib bo'lmaydi")
+
+    conditions = {'status__in': sources}
+    if driver_id is not None:
+        conditions['driver_id'] = driver_id
+    if expected_version is not None:
+        conditions['version'] = expected_version
+
+    with transaction.atomic():
+        state = _conditional_update(order_id, conditions, {'status': to_status})
+        if state is not None:
+            # Manba statuslarning barchasi faol: haydovchi bo'lsa u hisoblagichda edi
+            _after_transition(state.driver_id, state)
+    return state
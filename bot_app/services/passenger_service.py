@@ -1,11 +1,12 @@
 from ..models import Order
 from ..serializers.order import OrderSerializer
 from ..services.base import BaseService
+from ..services.order_service import get_order_for_notification
 
 class PassengerService(BaseService):
     def notify(self, order_id):
         try:
-            order = Order.objects.get(id=order_id)
+            order = get_order_for_notification(order_id)
             data = OrderSerializer(order).data
             return self._request(
                 "POST",
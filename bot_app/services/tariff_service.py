@@ -0,0 +1,241 @@
+# services/tariff_service.py
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.core.cache import cache
+
+from configuration import env
+from ..models import City, CityPrice
+from ..utils.distance_utils import haversine
+from ..utils.geometry import parse_location
+from .city_search import city_search
+
+logger = logging.getLogger(__name__)
+
+TARIFF_CLASSES = ("economy", "standard", "comfort", "delivery")
+DEFAULT_CLASSES = ("economy", "standard", "comfort")
+CLASS_INDEX = {travel_class: index for index, travel_class in enumerate(TARIFF_CLASSES)}
+
+MAX_PASSENGERS = 8
+
+# Nomi topilmagan location koordinatasi uchun eng yaqin shahar radiusi
+NEAREST_CITY_KM = 50
+
+
+class TariffError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class TariffMatrix:
+    version: str
+    rows: Dict[int, int]          # city_id -> vektor indeksi
+    prices: np.ndarray            # (len(TARIFF_CLASSES), n) shahar narxlari, narx yo'q bo'lsa NaN
+    lats: np.ndarray              # (n,), koordinata yo'q bo'lsa NaN
+    lons: np.ndarray              # (n,)
+
+
+class TariffEngine:
+    """
+    Yo'nalish narxlari: har bir travel class uchun shahar narxlari vektori.
+
+    Yo'nalishning asosiy narxi - ikki shahar CityPrice laridan kattasi (narxi
+    bor tomon, agar faqat bittasida bo'lsa). Ikkala shaharning koordinatasi
+    bo'lsa TARIFF_INCLUDED_KM dan ortiq har bir km uchun TARIFF_PER_KM
+    qo'shiladi, natija TARIFF_ROUND_TO ga yaxlitlanadi.
+
+    Vektorlar (n ta shahar uchun O(n) xotira) xotirada saqlanadi va City yoki
+    CityPrice o'zgarganda (cache dagi versiya orqali) qayta quriladi; yo'nalish
+    narxi va masofasi har bir quote da ikki shahar qiymatlaridan hisoblanadi.
+    """
+
+    VERSION_KEY = "tariff_matrix_version"
+
+    def __init__(self, per_km: float = 0, included_km: float = 0, round_to: int = 1000):
+        self.per_km = per_km
+        self.included_km = included_km
+        self.round_to = round_to
+
+        self._lock = threading.Lock()
+        self._matrix: Optional[TariffMatrix] = None
+
+    @classmethod
+    def _current_version(cls) -> str:
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+
+    def invalidate(self):
+        cache.set(self.VERSION_KEY, uuid.uuid4().hex, None)
+        with self._lock:
+            self._matrix = None
+
+    def rebuild(self) -> TariffMatrix:
+        version = self._current_version()
+        cities = list(City.objects.filter(is_allowed=True).only('id', 'latitude', 'longitude'))
+        rows = {city.id: row for row, city in enumerate(cities)}
+
+        n = len(cities)
+        city_prices = np.full((len(TARIFF_CLASSES), n), np.nan)
+        for price in CityPrice.objects.filter(city_id__in=rows).values('city_id', *TARIFF_CLASSES):
+            row = rows[price['city_id']]
+            for index, travel_class in enumerate(TARIFF_CLASSES):
+                if price[travel_class] is not None:
+                    city_prices[index, row] = float(price[travel_class])
+
+        lats = np.array([city.latitude if city.latitude is not None else np.nan for city in cities])
+        lons = np.array([city.longitude if city.longitude is not None else np.nan for city in cities])
+
+        matrix = TariffMatrix(version, rows, city_prices, lats, lons)
+        with self._lock:
+            self._matrix = matrix
+
+        logger.debug(f"Tariff prices rebuilt: {n} cities")
+        return matrix
+
+    def matrix(self) -> TariffMatrix:
+        matrix = self._matrix
+        if matrix is None or matrix.version != self._current_version():
+            matrix = self.rebuild()
+        return matrix
+
+    def resolve_city(self, value, matrix: Optional[TariffMatrix] = None) -> int:
+        """
+        Shahar id si: son (City.id), nom, yoki {"city": ..., "location": {...}} JSON
+        (nom va koordinata city_search.resolve orqali).
+        """
+        matrix = matrix or self.matrix()
+
+        if isinstance(value, int) and not isinstance(value, bool):
+            if value in matrix.rows:
+                return value
+            raise TariffError(f"City {value} topilmadi")
+
+        if isinstance(value, dict):
+            name, lat, lon = parse_location(value)
+        else:
+            name, lat, lon = str(value or "").strip(), None, None
+
+        city_id = city_search.resolve(name, lat, lon, max_distance_km=NEAREST_CITY_KM)
+        if city_id in matrix.rows:
+            return city_id
+
+        raise TariffError(f"Shahar topilmadi: {name or value}")
+
+    def quote(
+            self,
+            from_city_id: int,
+            to_city_id: int,
+            classes: Sequence[str] = DEFAULT_CLASSES,
+            matrix: Optional[TariffMatrix] = None
+    ) -> Dict[str, Optional[int]]:
+        """Bir yo'nalish uchun bir nechta class narxi: {class: price | None}"""
+        matrix = matrix or self.matrix()
+        i, j = matrix.rows[from_city_id], matrix.rows[to_city_id]
+
+        # fmax: bir tomonda NaN bo'lsa ikkinchisi olinadi
+        prices = np.fmax(matrix.prices[:, i], matrix.prices[:, j])
+        distance = self._distance(matrix, i, j)
+        if not np.isnan(distance):
+            prices = prices + max(distance - self.included_km, 0) * self.per_km
+        if self.round_to:
+            prices = np.round(prices / self.round_to) * self.round_to
+
+        result = {}
+        for travel_class in classes:
+            price = prices[CLASS_INDEX[travel_class]]
+            result[travel_class] = None if np.isnan(price) else int(price)
+        return result
+
+    @staticmethod
+    def _distance(matrix: TariffMatrix, i: int, j: int) -> float:
+        return float(haversine(matrix.lats[i], matrix.lons[i], matrix.lats[j], matrix.lons[j]))
+
+    def distance_km(
+            self,
+            from_city_id: int,
+            to_city_id: int,
+            matrix: Optional[TariffMatrix] = None
+    ) -> Optional[float]:
+        matrix = matrix or self.matrix()
+        distance = self._distance(matrix, matrix.rows[from_city_id], matrix.rows[to_city_id])
+        return None if np.isnan(distance) else round(float(distance), 1)
+
+    @staticmethod
+    def validate_classes(classes: Optional[Iterable[str]]) -> Tuple[str, ...]:
+        if not classes:
+            return DEFAULT_CLASSES
+        if isinstance(classes, str):
+            classes = [classes]
+        if not isinstance(classes, (list, tuple)):
+            raise TariffError("car_class ro'yxat bo'lishi kerak")
+        unknown = [travel_class for travel_class in classes if travel_class not in CLASS_INDEX]
+        if unknown:
+            raise TariffError(f"Noma'lum class: {', '.join(map(str, unknown))}")
+        return tuple(dict.fromkeys(classes))
+
+    @staticmethod
+    def validate_passengers(passengers) -> int:
+        if isinstance(passengers, bool) or not isinstance(passengers, int) or not 1 <= passengers <= MAX_PASSENGERS:
+            raise TariffError(f"passengers 1..{MAX_PASSENGERS} oralig'ida bo'lishi kerak")
+        return passengers
+
+    def calculate(self, data: dict, matrix: Optional[TariffMatrix] = None) -> Dict[str, object]:
+        """/calculate/ so'rovi: from/to va ixtiyoriy car_class ro'yxati"""
+        matrix = matrix or self.matrix()
+        source = data.get("from_location", data.get("from", data.get("from_city")))
+        destination = data.get("to_location", data.get("to", data.get("to_city")))
+        if source is None or destination is None:
+            raise TariffError("from va to talab qilinadi")
+
+        classes = self.validate_classes(data.get("car_class", data.get("classes")))
+        from_city_id = self.resolve_city(source, matrix)
+        to_city_id = self.resolve_city(destination, matrix)
+
+        return {
+            "from_city": from_city_id,
+            "to_city": to_city_id,
+            "distance_km": self.distance_km(from_city_id, to_city_id, matrix),
+            "car_class": self.quote(from_city_id, to_city_id, classes, matrix),
+        }
+
+    def calculate_batch(self, routes: List[dict]) -> List[Dict[str, object]]:
+        """
+        Bir nechta yo'nalish bitta matritsa versiyasidan: har biri calculate()
+        natijasi + passengers va total (narx * passengers). Xato bo'lgan
+        yo'nalish butun so'rovni emas, faqat o'z natijasini buzadi.
+        """
+        matrix = self.matrix()
+        results = []
+        for route in routes:
+            try:
+                if not isinstance(route, dict):
+                    raise TariffError("Yo'nalish JSON obyekt bo'lishi kerak")
+                passengers = self.validate_passengers(route.get("passengers", 1))
+                quote = self.calculate(route, matrix)
+            except TariffError as e:
+                results.append({"status": "error", "message": str(e)})
+                continue
+
+            results.append({
+                "status": "success",
+                **quote,
+                "passengers": passengers,
+                "total": {
+                    travel_class: price * passengers if price is not None else None
+                    for travel_class, price in quote["car_class"].items()
+                },
+            })
+        return results
+
+tariff_engine = TariffEngine(
+    per_km=env.TARIFF_PER_KM,
+    included_km=env.TARIFF_INCLUDED_KM,
+    round_to=env.TARIFF_ROUND_TO,
+)
@@ -1,2 +1,4 @@
 from .travel_signals import *
 from .order_signals import *
+from .city_signals import *
+from .driver_signals import *
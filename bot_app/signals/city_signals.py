@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from ..models import City, CityPrice
+from ..services.city_catalog import city_catalog
+from ..services.city_index import city_index
+from ..services.city_search import city_search
+from ..services.tariff_service import tariff_engine
+from ..tasks.city_tasks import backfill_city_coordinates
+
+
+# Versiya commit dan keyin almashadi: aks holda parallel so'rov commit gacha bo'lgan
+# ma'lumotdan snapshot qurib, uni yangi versiya (va ETag) ostida cache lab qo'yadi
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def invalidate_city_index(sender, instance, **kwargs):
+    def invalidate():
+        city_index.invalidate()
+        city_search.invalidate()
+        city_catalog.invalidate()
+        tariff_engine.invalidate()
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=CityPrice)
+@receiver(post_delete, sender=CityPrice)
+def invalidate_city_prices(sender, instance, **kwargs):
+    def invalidate():
+        city_catalog.invalidate()
+        tariff_engine.invalidate()
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=City)
+def schedule_coordinates_backfill(sender, instance, **kwargs):
+    if instance.latitude is None or instance.longitude is None:
+        transaction.on_commit(lambda: backfill_city_coordinates.delay())
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from ..models import Car, Driver
+from ..services.driver_ledger import driver_ledger
+from ..services.driver_locations import driver_locations
+from ..services.driver_registry import driver_registry, safe_registry_call
+
+
+@receiver(post_save, sender=Driver)
+def register_driver(sender, instance, created=False, **kwargs):
+    if created:
+        driver_ledger.open_account(instance)
+
+    def update():
+        safe_registry_call(driver_registry.set_driver_state, instance)
+        safe_registry_call(driver_locations.remember_driver, instance)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_delete, sender=Driver)
+def unregister_driver(sender, instance, **kwargs):
+    def update():
+        safe_registry_call(driver_registry.remove_driver, instance.pk)
+        safe_registry_call(driver_locations.forget_driver, instance)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def update_driver_car_classes(sender, instance, **kwargs):
+    def update():
+        driver = Driver.objects.filter(pk=instance.driver_id).only(
+            'id', 'status', 'from_location_id', 'to_location_id'
+        ).first()
+        if driver is not None:
+            safe_registry_call(driver_registry.set_driver_state, driver)
+
+    transaction.on_commit(update)
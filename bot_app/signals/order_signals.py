@@ -1,9 +1,16 @@
-from django.db.models.signals import pre_save
+import logging
+
+from django.db import DatabaseError, transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
-from ..models import Order, TravelStatus, Driver
+from ..models import ACTIVE_ORDER_STATUSES, Order, TravelStatus
+from ..services.driver_ledger import LedgerError, driver_ledger
+from ..services.driver_registry import driver_registry, safe_registry_call
 from ..tasks.travel_tasks import notify_driver_bot, notify_passenger_bot
 
+logger = logging.getLogger(__name__)
+
 
 @receiver(pre_save, sender=Order)
 def update_order(sender, instance: Order, **kwargs):
@@ -11,13 +18,6 @@ def update_order(sender, instance: Order, **kwargs):
     if instance.driver and (instance.status == TravelStatus.CREATED or instance.status == TravelStatus.ASSIGNED):
 
         instance.status = TravelStatus.ASSIGNED
-        try:
-            driver = Driver.objects.get(pk=instance.driver.pk)
-            driver.amount -= instance.content_object.price * 0.05
-            driver.save()
-        except Exception as e:
-            pass
-
         notify_passenger_bot.delay(instance.pk)
 
     if instance.driver and instance.status == TravelStatus.ARRIVED:
@@ -27,4 +27,46 @@ def update_order(sender, instance: Order, **kwargs):
         notify_passenger_bot.delay(instance.pk)
 
     if instance.driver and instance.status == TravelStatus.STARTED:
-        notify_driver_bot.delay(instance.pk)
\ No newline at end of file
+        notify_driver_bot.delay(instance.pk)
+
+
+@receiver(post_save, sender=Order)
+def charge_commission(sender, instance: Order, **kwargs):
+    """Biriktirilgan haydovchidan komissiya: ledger yozuvi + F() bilan balans, (order, haydovchi) uchun bir marta"""
+    if not instance.driver_id or instance.status != TravelStatus.ASSIGNED:
+        return
+    try:
+        driver_ledger.charge_commission(instance)
+    except (LedgerError, DatabaseError) as e:
+        logger.error(f"Commission for order {instance.pk} failed: {e}")
+
+
+def _active_driver_id(driver_id, status):
+    return driver_id if driver_id and status in ACTIVE_ORDER_STATUSES else None
+
+
+def _move_active_order(old_driver_id, new_driver_id):
+    if old_driver_id == new_driver_id:
+        return
+
+    def apply():
+        if old_driver_id:
+            safe_registry_call(driver_registry.adjust_active, old_driver_id, -1)
+        if new_driver_id:
+            safe_registry_call(driver_registry.adjust_active, new_driver_id, 1)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Order)
+def track_active_orders(sender, instance: Order, **kwargs):
+    """Driver registry dagi faol orderlar hisoblagichini o'tish bo'yicha yangilash"""
+    old_driver_id = _active_driver_id(*getattr(instance, '_loaded_assignment', (None, None)))
+    new_driver_id = _active_driver_id(instance.driver_id, instance.status)
+    instance._loaded_assignment = (instance.driver_id, instance.status)
+    _move_active_order(old_driver_id, new_driver_id)
+
+
+@receiver(post_delete, sender=Order)
+def untrack_active_order(sender, instance: Order, **kwargs):
+    _move_active_order(_active_driver_id(*getattr(instance, '_loaded_assignment', (None, None))), None)
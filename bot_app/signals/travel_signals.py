@@ -1,11 +1,11 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
+from django.db import IntegrityError, transaction
 import logging
 from telebot import TeleBot
 from configuration import env
-from ..models import PassengerTravel, OrderType, PassengerPost, Order
+from ..models import PassengerTravel, OrderType, PassengerPost, Order, journey_order_fields
 
 from ..tasks.travel_tasks import notify_driver_bot
 
@@ -20,9 +20,9 @@ def send_message_view(order_pk):
     from datetime import datetime
     import pytz
     from ..serializers.order import OrderSerializer
-    from ..models import Order
+    from ..services.order_service import get_order_for_notification
 
-    order_n = Order.objects.get(pk=order_pk)
+    order_n = get_order_for_notification(order_pk)
     order_data = OrderSerializer(order_n).data
     creator = order_data.get("creator", {})
     content = order_data.get("content_object", {})
@@ -67,6 +67,18 @@ def send_message_view(order_pk):
 
 
 
+@receiver(post_save, sender=PassengerTravel)
+@receiver(post_save, sender=PassengerPost)
+def sync_order_fields(sender, instance, created, **kwargs):
+    """Sayohat/pochta o'zgarganda Order dagi denormalized maydonlarni yangilash"""
+    if created:
+        return
+    content_type = ContentType.objects.get_for_model(sender)
+    Order.objects.filter(content_type=content_type, object_id=instance.pk).update(
+        **journey_order_fields(instance)
+    )
+
+
 @receiver(post_save, sender=PassengerTravel)
 @receiver(post_save, sender=PassengerPost)
 def create_order(sender, instance, created, **kwargs):
@@ -80,12 +92,14 @@ def create_order(sender, instance, created, **kwargs):
         logger.warning(f"Order already exists for {sender.__name__} {instance.pk}")
         return
     try:
-        order = Order.objects.create(
-            user=instance.user,
-            order_type=order_type,
-            content_object=instance,
-            object_id=instance.pk,
-        )
+        # Parallel yaratishda unique (content_type, object_id) constraint ishlaydi
+        with transaction.atomic():
+            order = Order.objects.create(
+                user=instance.user,
+                order_type=order_type,
+                content_object=instance,
+                object_id=instance.pk,
+            )
 
         # Celery task ishga tushishi
         transaction.on_commit(lambda: notify_driver_bot.delay(order.pk))
@@ -94,5 +108,7 @@ def create_order(sender, instance, created, **kwargs):
         transaction.on_commit(lambda: send_message_view(order.pk))
 
         logger.info(f"Order {order.pk} created from {sender.__name__} {instance.pk}")
+    except IntegrityError:
+        logger.warning(f"Order already exists for {sender.__name__} {instance.pk}")
     except Exception as e:
         logger.error(f"Failed to create Order for {sender.__name__} {instance.pk}: {e}", exc_info=True)
@@ -0,0 +1,62 @@
+# tasks/city_tasks.py
+import logging
+
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from django.core.cache import cache
+from django.db.models import Q
+
+from ..models import City
+from ..services.city_catalog import city_catalog
+from ..services.city_index import city_index
+from ..services.tariff_service import tariff_engine
+from ..utils.nominatim_utils import aget_coords_from_place
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_LOCK_KEY = "city_coords_backfill_lock"
+BACKFILL_LOCK_TIMEOUT = 30 * 60
+BACKFILL_BATCH_SIZE = 50
+
+
+def fill_missing_city_coordinates(country_code: str = "uz") -> int:
+    """Koordinatasi yo'q shaharlarni Nominatim orqali to'ldirish, bazaga bulk_update bilan yozish"""
+    cities = list(City.objects.filter(Q(latitude__isnull=True) | Q(longitude__isnull=True)))
+    if not cities:
+        return 0
+
+    resolved = []
+    # So'rovlar tezligi nominatim_utils dagi umumiy rate limiter bilan cheklanadi
+    for city in cities:
+        results = async_to_sync(aget_coords_from_place)(city.title, country_code=country_code, limit=1)
+        if results and results[0].get('lat') and results[0].get('lon'):
+            city.latitude = float(results[0]['lat'])
+            city.longitude = float(results[0]['lon'])
+            resolved.append(city)
+        else:
+            logger.warning(f"Coordinates not found for city {city.pk} ({city.title})")
+
+        if len(resolved) >= BACKFILL_BATCH_SIZE:
+            City.objects.bulk_update(resolved, ['latitude', 'longitude'])
+            resolved = []
+
+    if resolved:
+        City.objects.bulk_update(resolved, ['latitude', 'longitude'])
+
+    # bulk_update signal yubormaydi
+    city_index.invalidate()
+    city_catalog.invalidate()
+    tariff_engine.invalidate()
+    return len(cities)
+
+
+@shared_task
+def backfill_city_coordinates():
+    if not cache.add(BACKFILL_LOCK_KEY, 1, BACKFILL_LOCK_TIMEOUT):
+        return
+    try:
+        fill_missing_city_coordinates()
+    except Exception as e:
+        logger.error(f"City coordinates backfill failed: {e}", exc_info=True)
+    finally:
+        cache.delete(BACKFILL_LOCK_KEY)
@@ -28,6 +28,7 @@ router.register(r'passengers', PassengerViewSet, basename='passenger')
 urlpatterns = [
     path('sms/', api.urls),
     path('calculate/', calculate_views.calculate),
+    path('calculate/batch/', calculate_views.calculate_batch),
     path('health/', HealthView.as_view(), name='health'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,86 @@
+# utils/cache_metrics.py
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+from redis.exceptions import RedisError
+
+from .redis_utils import get_redis, redis_configured
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "cache_stats"
+
+
+class CacheMetrics:
+    """
+    Namespace bo'yicha cache hit/miss hisoblagichlari.
+
+    Hisoblagichlar process ichida yig'iladi va har flush_interval sekundda
+    bitta pipeline bilan Redis dagi umumiy hash ga qo'shiladi, shuning uchun
+    har bir cache murojaatiga qo'shimcha round-trip qo'shilmaydi.
+    """
+
+    def __init__(self, flush_interval: float = 5):
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._pending: Counter = Counter()
+        self._flushed_at = time.monotonic()
+
+    def hit(self, namespace: str):
+        self._record(f"{namespace}:hits")
+
+    def miss(self, namespace: str):
+        self._record(f"{namespace}:misses")
+
+    def _record(self, field: str):
+        with self._lock:
+            self._pending[field] += 1
+            if time.monotonic() - self._flushed_at < self.flush_interval:
+                return
+            pending, self._pending = self._pending, Counter()
+            self._flushed_at = time.monotonic()
+        self._flush(pending)
+
+    def _flush(self, pending: Counter):
+        # REDIS_URL siz (LocMem) umumiy hisoblagich yo'q
+        if not redis_configured():
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for field, count in pending.items():
+                pipe.hincrby(STATS_KEY, field, count)
+            pipe.execute()
+        except RedisError as e:
+            logger.debug(f"Cache metrics flush failed: {e}")
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._flushed_at = time.monotonic()
+        if pending:
+            self._flush(pending)
+
+
+def read_stats() -> Dict[str, Dict[str, int]]:
+    """Redis dagi umumiy hisoblagichlar: {namespace: {"hits": .., "misses": ..}}"""
+    stats: Dict[str, Dict[str, int]] = {}
+    if not redis_configured():
+        return stats
+    for field, value in get_redis().hgetall(STATS_KEY).items():
+        namespace, _, kind = field.decode().rpartition(":")
+        stats.setdefault(namespace, {"hits": 0, "misses": 0})[kind] = int(value)
+    return stats
+
+
+def reset_stats():
+    if redis_configured():
+        get_redis().delete(STATS_KEY)
+
+
+cache_metrics = CacheMetrics()
+atexit.register(cache_metrics.flush)
@@ -0,0 +1,73 @@
+# utils/circuit_breaker.py
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Oddiy circuit breaker (closed -> open -> half-open).
+
+    Ketma-ket failure_threshold ta xatodan keyin reset_timeout davomida
+    so'rovlar darhol rad etiladi. Keyin bitta sinov so'roviga ruxsat beriladi:
+    muvaffaqiyatli bo'lsa breaker yopiladi, aks holda yana ochiladi.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def before_call(self):
+        """So'rovdan oldin chaqiriladi; breaker ochiq bo'lsa CircuitOpen"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Bitta sinov so'roviga ruxsat
+                self._state = self.HALF_OPEN
+                return
+
+            raise CircuitOpen(f"{self.name}: circuit open")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def release_probe(self):
+        """Sinov so'rovi upstream javobisiz tugadi (bekor qilindi): keyingi chaqiruv yana sinaydi"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit {self.name} opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
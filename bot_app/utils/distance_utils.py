@@ -0,0 +1,38 @@
+# utils/distance_utils.py
+from typing import Sequence, Union
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+
+def haversine(lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike) -> np.ndarray:
+    """
+    Vektorlashgan haversine (km).
+    Argumentlar numpy broadcasting qoidalari bo'yicha kengaytiriladi.
+    """
+    lat1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    lon1 = np.radians(np.asarray(lon1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lon2, dtype=np.float64))
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distances_from_point(lat: float, lon: float, lats: ArrayLike, lons: ArrayLike) -> np.ndarray:
+    """Bitta nuqtadan nuqtalar massiviga masofalar (km), shakli (n,)"""
+    return haversine(lat, lon, lats, lons)
+
+
+def distance_matrix(lats1: ArrayLike, lons1: ArrayLike, lats2: ArrayLike, lons2: ArrayLike) -> np.ndarray:
+    """Ko'pdan-ko'pga masofalar matritsasi (km), shakli (n, m)"""
+    lats1 = np.asarray(lats1, dtype=np.float64)[:, np.newaxis]
+    lons1 = np.asarray(lons1, dtype=np.float64)[:, np.newaxis]
+    lats2 = np.asarray(lats2, dtype=np.float64)[np.newaxis, :]
+    lons2 = np.asarray(lons2, dtype=np.float64)[np.newaxis, :]
+    return haversine(lats1, lons1, lats2, lons2)
@@ -0,0 +1,43 @@
+# utils/generic_relations.py
+from collections import defaultdict
+from typing import Iterable, List
+
+from django.contrib.contenttypes.models import ContentType
+
+
+def prefetch_content_objects(instances: Iterable, field_name: str = 'content_object') -> List:
+    """
+    GenericForeignKey obyektlarini bulk yuklash.
+
+    Obyektlar content_type_id bo'yicha guruhlanadi, har bir model bitta in_bulk
+    so'rovi bilan olinadi va natija GenericForeignKey cache iga yoziladi,
+    shuning uchun keyingi instance.content_object murojaatlari so'rov yubormaydi.
+    Allaqachon yuklangan obyektlar o'tkazib yuboriladi.
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+
+    field = instances[0]._meta.get_field(field_name)
+    pending = [instance for instance in instances if not field.is_cached(instance)]
+
+    ids_by_content_type = defaultdict(set)
+    for instance in pending:
+        content_type_id = getattr(instance, field.ct_field + '_id')
+        object_id = getattr(instance, field.fk_field)
+        if content_type_id and object_id is not None:
+            ids_by_content_type[content_type_id].add(object_id)
+
+    objects_by_content_type = {}
+    for content_type_id, object_ids in ids_by_content_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        objects_by_content_type[content_type_id] = (
+            model._base_manager.in_bulk(object_ids) if model is not None else {}
+        )
+
+    for instance in pending:
+        content_type_id = getattr(instance, field.ct_field + '_id')
+        objects = objects_by_content_type.get(content_type_id, {})
+        field.set_cached_value(instance, objects.get(getattr(instance, field.fk_field)))
+
+    return instances
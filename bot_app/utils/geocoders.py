@@ -0,0 +1,222 @@
+# utils/geocoders.py
+import csv
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+
+from configuration import env
+from .nominatim_utils import anominatim_reverse, anominatim_search, build_address
+from .spatial_index import KDTree
+
+logger = logging.getLogger(__name__)
+
+
+class BaseGeocoder:
+    """
+    Geocoder backend interfeysi.
+    reverse() parse_address shaklidagi dict qaytaradi (mahalla, shahar_tuman, viloyat, ...),
+    search() esa shu shakldagi natijalar ro'yxatini "lat"/"lon" bilan qaytaradi.
+    """
+
+    source = "base"
+
+    async def reverse(self, lat: float, lon: float) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def search(
+            self,
+            place_name: str,
+            country_code: str,
+            accept_language: str = "uz",
+            limit: int = 1
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class NominatimGeocoder(BaseGeocoder):
+    """OpenStreetMap Nominatim (tarmoq orqali)"""
+
+    source = "nominatim"
+
+    async def reverse(self, lat, lon):
+        return await anominatim_reverse(lat, lon)
+
+    async def search(self, place_name, country_code, accept_language="uz", limit=1):
+        return await anominatim_search(place_name, country_code, accept_language=accept_language, limit=limit)
+
+
+class LocalGeocoder(BaseGeocoder):
+    """
+    Offline reverse-geocoder: diskdagi nuqtalar jadvali xotiradagi k-d tree da.
+
+    Dataset CSV yoki JSON bo'lib, har bir yozuvda latitude, longitude,
+    shahar_tuman va ixtiyoriy mahalla, viloyat, display_name maydonlari bor.
+    Dataset berilmasa ruxsat etilgan shaharlar (City) indeksidan foydalaniladi.
+    """
+
+    source = "local"
+
+    def __init__(self, dataset_path: str = "", max_distance_km: float = 50):
+        self.dataset_path = dataset_path
+        self.max_distance_km = max_distance_km
+
+        self._lock = threading.Lock()
+        self._tree: Optional[KDTree] = None
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _read_rows(path: Path) -> List[Dict[str, Any]]:
+        with path.open(encoding='utf-8') as f:
+            if path.suffix.lower() == '.json':
+                return json.load(f)
+            return list(csv.DictReader(f))
+
+    def _load_dataset(self):
+        with self._lock:
+            if self._tree is not None:
+                return
+
+            rows = []
+            for row in self._read_rows(Path(self.dataset_path)):
+                try:
+                    row['latitude'] = float(row['latitude'])
+                    row['longitude'] = float(row['longitude'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                rows.append(row)
+
+            self._by_name = {}
+            for row in rows:
+                for name in (row.get('shahar_tuman'), row.get('mahalla')):
+                    if name:
+                        self._by_name.setdefault(name.strip().lower(), row)
+
+            self._tree = KDTree([(row['latitude'], row['longitude']) for row in rows], rows)
+            logger.info(f"Local geocoder dataset loaded: {len(rows)} points from {self.dataset_path}")
+
+    def _result(self, row: Dict[str, Any], lat: float, lon: float) -> Dict[str, Any]:
+        result = build_address(
+            source=self.source,
+            display_name=row.get('display_name') or "",
+            mahalla=row.get('mahalla') or None,
+            shahar_tuman=row.get('shahar_tuman') or None,
+            viloyat=row.get('viloyat') or None,
+            raw=row,
+        )
+        result.update({"lat": lat, "lon": lon})
+        return result
+
+    async def _nearest_row(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        if self.dataset_path:
+            if self._tree is None:
+                await sync_to_async(self._load_dataset)()
+            found = self._tree.nearest(lat, lon, 1, self.max_distance_km)
+            return found[0][0] if found else None
+
+        from ..services.city_index import city_index
+        found = await city_index.anearest(lat, lon, 1, self.max_distance_km)
+        return self._city_row(found[0][0]) if found else None
+
+    async def _row_by_name(self, place_name: str) -> Optional[Dict[str, Any]]:
+        if self.dataset_path:
+            if self._tree is None:
+                await sync_to_async(self._load_dataset)()
+            return self._by_name.get(place_name.strip().lower())
+
+        from ..services.city_index import city_index
+        coords = await city_index.acoordinates(place_name)
+        if not coords:
+            return None
+        return {"shahar_tuman": place_name, "latitude": coords[0], "longitude": coords[1]}
+
+    @staticmethod
+    def _city_row(city) -> Dict[str, Any]:
+        return {
+            "shahar_tuman": city.title,
+            "viloyat": city.subcategory.title if city.subcategory else None,
+            "latitude": city.latitude,
+            "longitude": city.longitude,
+        }
+
+    async def reverse(self, lat, lon):
+        row = await self._nearest_row(lat, lon)
+        if row is None:
+            result = build_address(self.source, "", None, None, None, {})
+            result.update({"lat": lat, "lon": lon})
+            return result
+        return self._result(row, lat, lon)
+
+    async def search(self, place_name, country_code, accept_language="uz", limit=1):
+        row = await self._row_by_name(place_name)
+        if row is None:
+            return []
+        return [self._result(row, row['latitude'], row['longitude'])]
+
+
+class StubGeocoder(BaseGeocoder):
+    """Testlar uchun tarmoqsiz, deterministik backend"""
+
+    source = "stub"
+
+    def __init__(
+            self,
+            address: Optional[Dict[str, Optional[str]]] = None,
+            places: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        self.address = address or {"mahalla": None, "shahar_tuman": "Toshkent", "viloyat": "Toshkent"}
+        self.places = {name.strip().lower(): coords for name, coords in (places or {}).items()}
+
+    async def reverse(self, lat, lon):
+        result = build_address(
+            source=self.source,
+            display_name="",
+            mahalla=self.address.get("mahalla"),
+            shahar_tuman=self.address.get("shahar_tuman"),
+            viloyat=self.address.get("viloyat"),
+            raw={},
+        )
+        result.update({"lat": lat, "lon": lon})
+        return result
+
+    async def search(self, place_name, country_code, accept_language="uz", limit=1):
+        coords = self.places.get(place_name.strip().lower())
+        if coords is None:
+            return []
+        result = build_address(self.source, place_name, None, place_name, None, {})
+        result.update({"lat": coords[0], "lon": coords[1]})
+        return [result]
+
+
+GEOCODER_BACKENDS = {
+    "nominatim": NominatimGeocoder,
+    "local": LocalGeocoder,
+    "stub": StubGeocoder,
+}
+
+_geocoder: Optional[BaseGeocoder] = None
+
+
+def _create_geocoder(backend: str) -> BaseGeocoder:
+    if backend not in GEOCODER_BACKENDS:
+        raise ValueError(f"Unknown GEOCODER_BACKEND: {backend}")
+    if backend == "local":
+        return LocalGeocoder(env.GEOCODER_DATASET_PATH, env.GEOCODER_LOCAL_MAX_DISTANCE_KM)
+    return GEOCODER_BACKENDS[backend]()
+
+
+def get_geocoder() -> BaseGeocoder:
+    """GEOCODER_BACKEND sozlamasi bo'yicha joriy geocoder"""
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = _create_geocoder(env.GEOCODER_BACKEND)
+    return _geocoder
+
+
+def set_geocoder(geocoder: Optional[BaseGeocoder]):
+    """Geocoder ni almashtirish (masalan testlarda StubGeocoder); None - sozlamaga qaytish"""
+    global _geocoder
+    _geocoder = geocoder
@@ -0,0 +1,197 @@
+# utils/geometry.py
+import math
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Koordinatalar GeoJSON tartibida: (longitude, latitude)
+Point = Tuple[float, float]
+Ring = List[Point]
+Polygon = List[Ring]  # birinchi ring - tashqi chegara, qolganlari - teshiklar
+BBox = Tuple[float, float, float, float]  # (min_lon, min_lat, max_lon, max_lat)
+
+WKB_POLYGON = 3
+WKB_MULTIPOLYGON = 6
+
+
+def geojson_to_polygons(geometry: Dict[str, Any]) -> List[Polygon]:
+    """GeoJSON Polygon/MultiPolygon geometriyasini polygonlar ro'yxatiga o'tkazish"""
+    geometry_type = geometry.get("type")
+    coordinates = geometry.get("coordinates") or []
+
+    if geometry_type == "Polygon":
+        raw_polygons = [coordinates]
+    elif geometry_type == "MultiPolygon":
+        raw_polygons = coordinates
+    else:
+        raise ValueError(f"Polygon yoki MultiPolygon kutilgan, {geometry_type} berildi")
+
+    polygons = []
+    for raw_polygon in raw_polygons:
+        polygon = [[(float(point[0]), float(point[1])) for point in ring] for ring in raw_polygon]
+        if not polygon or len(polygon[0]) < 3:
+            raise ValueError("Polygon kamida 3 nuqtadan iborat bo'lishi kerak")
+        polygons.append(polygon)
+    return polygons
+
+
+def encode_wkb(polygons: Sequence[Polygon]) -> bytes:
+    """Polygonlarni WKB MultiPolygon (little-endian) ko'rinishida saqlash"""
+    parts = [struct.pack('<BII', 1, WKB_MULTIPOLYGON, len(polygons))]
+    for polygon in polygons:
+        parts.append(struct.pack('<BII', 1, WKB_POLYGON, len(polygon)))
+        for ring in polygon:
+            parts.append(struct.pack('<I', len(ring)))
+            parts.append(struct.pack(f'<{len(ring) * 2}d', *(value for point in ring for value in point)))
+    return b''.join(parts)
+
+
+def decode_wkb(blob: bytes) -> List[Polygon]:
+    """WKB Polygon/MultiPolygon ni polygonlar ro'yxatiga o'qish"""
+    data = bytes(blob)
+
+    def read_polygon(offset: int) -> Tuple[Polygon, int]:
+        order = '<' if data[offset] == 1 else '>'
+        geometry_type, ring_count = struct.unpack_from(f'{order}II', data, offset + 1)
+        if geometry_type != WKB_POLYGON:
+            raise ValueError(f"WKB Polygon kutilgan, turi {geometry_type}")
+        offset += 9
+
+        polygon = []
+        for _ in range(ring_count):
+            (point_count,) = struct.unpack_from(f'{order}I', data, offset)
+            offset += 4
+            values = struct.unpack_from(f'{order}{point_count * 2}d', data, offset)
+            offset += point_count * 16
+            polygon.append(list(zip(values[0::2], values[1::2])))
+        return polygon, offset
+
+    order = '<' if data[0] == 1 else '>'
+    (geometry_type,) = struct.unpack_from(f'{order}I', data, 1)
+
+    if geometry_type == WKB_POLYGON:
+        return [read_polygon(0)[0]]
+    if geometry_type != WKB_MULTIPOLYGON:
+        raise ValueError(f"WKB Polygon/MultiPolygon kutilgan, turi {geometry_type}")
+
+    (polygon_count,) = struct.unpack_from(f'{order}I', data, 5)
+    offset = 9
+    polygons = []
+    for _ in range(polygon_count):
+        polygon, offset = read_polygon(offset)
+        polygons.append(polygon)
+    return polygons
+
+
+def bbox_of(polygons: Sequence[Polygon]) -> BBox:
+    points = [point for polygon in polygons for point in polygon[0]]
+    lons = [point[0] for point in points]
+    lats = [point[1] for point in points]
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def bbox_contains(bbox: BBox, lon: float, lat: float) -> bool:
+    return bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3]
+
+
+def point_in_ring(lon: float, lat: float, ring: Ring) -> bool:
+    """Ray casting: nuqta ring ichidami"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def point_in_polygons(lon: float, lat: float, polygons: Sequence[Polygon]) -> bool:
+    """Nuqta polygonlardan birining ichida (teshiklardan tashqarida)mi"""
+    for polygon in polygons:
+        if point_in_ring(lon, lat, polygon[0]) and not any(
+                point_in_ring(lon, lat, hole) for hole in polygon[1:]
+        ):
+            return True
+    return False
+
+
+def polygons_area(polygons: Sequence[Polygon]) -> float:
+    """Taxminiy maydon (gradus^2) - ichma-ich hududlarni solishtirish uchun"""
+    area = 0.0
+    for polygon in polygons:
+        ring = polygon[0]
+        area += abs(sum(
+            ring[i][0] * ring[i - 1][1] - ring[i - 1][0] * ring[i][1] for i in range(len(ring))
+        )) / 2
+    return area
+
+
+class RTree:
+    """
+    Statik R-tree (Sort-Tile-Recursive bilan to'ldirilgan).
+    Bounding box larni saqlaydi va nuqtani o'z ichiga olgan yozuvlarni topadi.
+    """
+
+    NODE_CAPACITY = 16
+
+    def __init__(self, entries: Sequence[Tuple[BBox, Any]]):
+        # Har bir element: (bbox, child, is_leaf_entry)
+        level = [(bbox, payload, True) for bbox, payload in entries]
+        while len(level) > self.NODE_CAPACITY:
+            level = self._pack(level)
+        self._root = level
+        self._size = len(entries)
+
+    def __len__(self):
+        return self._size
+
+    @classmethod
+    def _pack(cls, items):
+        capacity = cls.NODE_CAPACITY
+        slab_count = math.ceil(math.sqrt(math.ceil(len(items) / capacity)))
+        slab_size = slab_count * capacity
+
+        items = sorted(items, key=lambda item: item[0][0] + item[0][2])
+        nodes = []
+        for start in range(0, len(items), slab_size):
+            slab = sorted(items[start:start + slab_size], key=lambda item: item[0][1] + item[0][3])
+            for node_start in range(0, len(slab), capacity):
+                children = slab[node_start:node_start + capacity]
+                bbox = (
+                    min(child[0][0] for child in children),
+                    min(child[0][1] for child in children),
+                    max(child[0][2] for child in children),
+                    max(child[0][3] for child in children),
+                )
+                nodes.append((bbox, children, False))
+        return nodes
+
+    def query_point(self, lon: float, lat: float) -> List[Any]:
+        """Bounding box i nuqtani o'z ichiga olgan yozuvlar"""
+        found = []
+        stack = [self._root]
+        while stack:
+            for bbox, child, is_leaf_entry in stack.pop():
+                if not bbox_contains(bbox, lon, lat):
+                    continue
+                if is_leaf_entry:
+                    found.append(child)
+                else:
+                    stack.append(child)
+        return found
+
+
+def parse_location(value) -> Tuple[str, Optional[float], Optional[float]]:
+    """Location JSON dan (city, latitude, longitude)"""
+    if not isinstance(value, dict):
+        return "", None, None
+
+    coordinate = value.get("location") or {}
+    try:
+        latitude = float(coordinate["latitude"])
+        longitude = float(coordinate["longitude"])
+    except (KeyError, TypeError, ValueError):
+        latitude = longitude = None
+
+    return (value.get("city") or "").strip(), latitude, longitude
@@ -0,0 +1,110 @@
+# utils/http_session.py
+import asyncio
+import atexit
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+
+class SessionPool:
+    """
+    Uzoq yashovchi aiohttp ClientSession (connection pool + keep-alive).
+
+    Session alohida daemon threaddagi doimiy event loop ga bog'langan.
+    async_to_sync har bir so'rovni yangi loop da ishga tushirgani uchun
+    chaqiruvchi loop dan so'rovlar shu loop ga uzatiladi, shuning uchun
+    TCP/TLS ulanishlar so'rovlar orasida qayta ishlatiladi.
+    Fork dan keyin (gunicorn/celery prefork) pool qaytadan yaratiladi.
+    """
+
+    def __init__(
+            self,
+            limit: int = 20,
+            limit_per_host: int = 10,
+            keepalive_timeout: float = 60,
+            dns_cache_ttl: int = 300,
+            headers: Optional[Dict[str, str]] = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.headers = headers or {}
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[ClientSession] = None
+        self._pid: Optional[int] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="http-session-pool", daemon=True)
+            thread.start()
+
+            self._loop = loop
+            self._thread = thread
+            self._session = None
+            self._pid = os.getpid()
+            return loop
+
+    async def _get_session(self) -> ClientSession:
+        # Faqat pool loop ichida chaqiriladi
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self._session = ClientSession(connector=connector, headers=self.headers)
+        return self._session
+
+    async def _get_json(self, url: str, params: Optional[Dict[str, Any]], timeout: float) -> Any:
+        session = await self._get_session()
+        async with session.get(url, params=params, timeout=ClientTimeout(total=timeout)) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10) -> Any:
+        """GET so'rov yuborib JSON javobni qaytarish (istalgan event loop dan chaqirish mumkin)"""
+        loop = self._ensure_loop()
+        coro = self._get_json(url, params, timeout)
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is loop:
+            return await coro
+
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def close(self):
+        """Session va loop ni yopish"""
+        with self._lock:
+            loop, session = self._loop, self._session
+            if loop is None or self._pid != os.getpid():
+                return
+            self._loop = None
+            self._session = None
+
+        if session is not None and not session.closed and loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+            except Exception:
+                pass
+        loop.call_soon_threadsafe(loop.stop)
+
+
+def create_session_pool(**kwargs) -> SessionPool:
+    pool = SessionPool(**kwargs)
+    atexit.register(pool.close)
+    return pool
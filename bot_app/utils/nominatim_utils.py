@@ -1,12 +1,66 @@
 # utils/nominatim_utils.py
-from typing import Dict, Any, List
-from aiohttp import ClientSession
+from typing import Dict, Any, List, Optional
 import asyncio
 
+from aiohttp import ClientResponseError
+
+from configuration import env
+from .circuit_breaker import CircuitBreaker
+from .http_session import create_session_pool
+from .rate_limit import RateLimited, TokenBucket
+
 USER_AGENT = "RideNowBot/1.0 (admin@ridenow.uz)"
 NOMINATIM_REVERSE = "https://nominatim.openstreetmap.org/reverse"
 NOMINATIM_SEARCH = "https://nominatim.openstreetmap.org/search"
 
+# Barcha Nominatim so'rovlari uchun umumiy connection pool
+nominatim_pool = create_session_pool(
+    limit=env.NOMINATIM_POOL_LIMIT,
+    limit_per_host=env.NOMINATIM_POOL_LIMIT_PER_HOST,
+    keepalive_timeout=env.NOMINATIM_KEEPALIVE_TIMEOUT,
+    headers={"User-Agent": USER_AGENT},
+)
+
+# Barcha processlar uchun umumiy limit (Redis) va upstream ishlamayotganda tez rad etish
+nominatim_limiter = TokenBucket(
+    "nominatim",
+    rate=env.NOMINATIM_RATE_LIMIT,
+    capacity=env.NOMINATIM_BURST,
+    max_wait=env.NOMINATIM_MAX_WAIT,
+)
+nominatim_breaker = CircuitBreaker(
+    "nominatim",
+    failure_threshold=env.NOMINATIM_FAILURE_THRESHOLD,
+    reset_timeout=env.NOMINATIM_RESET_TIMEOUT,
+)
+
+
+async def nominatim_get(url: str, params: Dict[str, Any]) -> Any:
+    """Nominatim ga so'rov: circuit breaker va rate limit orqali"""
+    # Breaker token dan oldin: ochiq breaker rad etgan so'rov umumiy tokenni sarflamaydi va kutmaydi
+    nominatim_breaker.before_call()
+
+    try:
+        await nominatim_limiter.acquire()
+        data = await nominatim_pool.get_json(url, params=params, timeout=env.NOMINATIM_TIMEOUT)
+    except (asyncio.CancelledError, RateLimited):
+        # Upstream javob bermadi: half-open sinovi keyingi chaqiruvga qoladi
+        nominatim_breaker.release_probe()
+        raise
+    except ClientResponseError as e:
+        if e.status >= 500 or e.status == 429:
+            nominatim_breaker.record_failure()
+        else:
+            # 4xx (429 dan tashqari) - so'rov xatosi, upstream javob berdi va sog'lom
+            nominatim_breaker.record_success()
+        raise
+    except Exception:
+        nominatim_breaker.record_failure()
+        raise
+
+    nominatim_breaker.record_success()
+    return data
+
 
 def parse_address(data: Dict[str, Any]) -> Dict[str, Any]:
     address = data.get("address", {})
@@ -29,26 +83,59 @@ def parse_address(data: Dict[str, Any]) -> Dict[str, Any]:
         or address.get("province")
     )
 
+    return build_address(
+        source="nominatim",
+        display_name=data.get("display_name", ""),
+        mahalla=mahalla,
+        shahar_tuman=shahar_tuman,
+        viloyat=viloyat,
+        raw=data,
+    )
+
+
+def build_address(
+        source: str,
+        display_name: str,
+        mahalla: Optional[str],
+        shahar_tuman: Optional[str],
+        viloyat: Optional[str],
+        raw: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Barcha geocoder backendlari uchun bir xil manzil shakli"""
     parts = [p for p in [mahalla, shahar_tuman, viloyat] if p]
-    full_address = ", ".join(parts) or data.get("display_name", "Noma'lum manzil")
+    full_address = ", ".join(parts) or display_name or "Noma'lum manzil"
 
     return {
-        "source": "nominatim",
-        "display_name": data.get("display_name", ""),
+        "source": source,
+        "display_name": display_name,
         "mahalla": mahalla,
         "shahar_tuman": shahar_tuman,
         "viloyat": viloyat,
         "full_address": full_address,
-        "raw": data,
+        "raw": raw,
     }
 
 
 async def aget_place_from_coords(lat: float, lon: float) -> Dict[str, Any]:
     """
-    Koordinatalar orqali manzil ma'lumotlarini olish
+    Koordinatalar orqali manzil ma'lumotlarini olish (sozlangan geocoder backend orqali)
     """
-    key = f"rev:{lat:.6f}:{lon:.6f}"
+    from .geocoders import get_geocoder
+    return await get_geocoder().reverse(lat, lon)
 
+
+async def aget_coords_from_place(place_name: str, country_code, accept_language: str = "uz", limit: int = 1) -> List[Dict[str, Any]]:
+    """
+    Shahar/tuman nomi orqali koordinatalarni olish (sozlangan geocoder backend orqali)
+    """
+    from .geocoders import get_geocoder
+    return await get_geocoder().search(place_name, country_code, accept_language=accept_language, limit=limit)
+
+
+async def anominatim_reverse(lat: float, lon: float) -> Dict[str, Any]:
+    """
+    Koordinatalar orqali manzil ma'lumotlarini Nominatim dan olish
+    """
     params = {
         "lat": lat,
         "lon": lon,
@@ -57,18 +144,15 @@ async def aget_place_from_coords(lat: float, lon: float) -> Dict[str, Any]:
         "zoom": 18,
         "accept-language": "uz",
     }
-    headers = {"User-Agent": USER_AGENT}
 
     try:
-        async with ClientSession() as session:
-            async with session.get(NOMINATIM_REVERSE, params=params, headers=headers, timeout=10) as resp:
-                data = await resp.json()
-                result = parse_address(data)
-                result.update({
-                    "lat": lat,
-                    "lon": lon
-                })
-                return result
+        data = await nominatim_get(NOMINATIM_REVERSE, params)
+        result = parse_address(data)
+        result.update({
+            "lat": lat,
+            "lon": lon
+        })
+        return result
     except Exception as e:
         return {
             "source": "error",
@@ -84,9 +168,9 @@ async def aget_place_from_coords(lat: float, lon: float) -> Dict[str, Any]:
         }
 
 
-async def aget_coords_from_place(place_name: str, country_code, accept_language: str = "uz", limit: int = 1) -> List[Dict[str, Any]]:
+async def anominatim_search(place_name: str, country_code, accept_language: str = "uz", limit: int = 1) -> List[Dict[str, Any]]:
     """
-    Shahar/tuman nomi orqali koordinatalarni olish
+    Shahar/tuman nomi orqali koordinatalarni Nominatim dan olish
     """
     params = {
         "q": place_name,
@@ -97,28 +181,24 @@ async def aget_coords_from_place(place_name: str, country_code, accept_language:
         "accept-language": accept_language,
     }
 
-    headers = {"User-Agent": USER_AGENT}
-
     try:
-        async with ClientSession() as session:
-            async with session.get(NOMINATIM_SEARCH, params=params, headers=headers, timeout=10) as resp:
-                data = await resp.json()
-
-                results = []
-                for item in data:
-                    result = parse_address(item)
-                    result.update({
-                        "lat": float(item.get("lat", 0)),
-                        "lon": float(item.get("lon", 0)),
-                        "importance": float(item.get("importance", 0)),
-                        "place_id": item.get("place_id"),
-                        "type": item.get("type"),
-                        "category": item.get("category")
-                    })
-                    results.append(result)
-
-                results.sort(key=lambda x: x.get("importance", 0), reverse=True)
-                return results
+        data = await nominatim_get(NOMINATIM_SEARCH, params)
+
+        results = []
+        for item in data:
+            result = parse_address(item)
+            result.update({
+                "lat": float(item.get("lat", 0)),
+                "lon": float(item.get("lon", 0)),
+                "importance": float(item.get("importance", 0)),
+                "place_id": item.get("place_id"),
+                "type": item.get("type"),
+                "category": item.get("category")
+            })
+            results.append(result)
+
+        results.sort(key=lambda x: x.get("importance", 0), reverse=True)
+        return results
 
     except Exception as e:
         return [{
@@ -0,0 +1,102 @@
+# utils/rate_limit.py
+import asyncio
+import logging
+import threading
+import time
+
+from redis.exceptions import RedisError
+
+from .redis_utils import get_redis, redis_configured
+
+logger = logging.getLogger(__name__)
+
+# Token bucket: kutish kerak bo'lsa token oldindan band qilinadi (tokens manfiy bo'ladi),
+# shunda navbat adolatli bo'ladi va har bir chaqiruv bitta round-trip oladi.
+# Qaytaradi: kutish vaqti (ms), yoki -1 agar kutish max_wait dan oshsa (token olinmaydi).
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+
+local wait = 0
+if tokens < 1 then
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+    if wait > max_wait then
+        return -1
+    end
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + max_wait + 1000)
+return wait
+"""
+
+
+class RateLimited(Exception):
+    pass
+
+
+class TokenBucket:
+    """
+    Processlar orasida Redis orqali bo'lingan token bucket.
+    Redis ishlamasa process ichidagi bucket ishlatiladi.
+    """
+
+    REDIS_RETRY_AFTER = 30
+
+    def __init__(self, name: str, rate: float, capacity: float = 1, max_wait: float = 2):
+        self.key = f"ratelimit:{name}"
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._redis_down_until = 0.0
+
+    def _reserve_local(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            wait = 0.0
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+                if wait > self.max_wait:
+                    return -1
+            self._tokens -= 1
+            return wait
+
+    def _reserve(self) -> float:
+        """Token band qilish: kutish vaqti (sekund) yoki -1"""
+        if redis_configured() and time.monotonic() >= self._redis_down_until:
+            try:
+                wait_ms = get_redis().eval(
+                    TOKEN_BUCKET_SCRIPT, 1, self.key,
+                    self.rate, self.capacity, int(self.max_wait * 1000)
+                )
+                return wait_ms / 1000 if wait_ms >= 0 else -1
+            except RedisError as e:
+                logger.warning(f"Rate limiter Redis unavailable, process-local bucket: {e}")
+                self._redis_down_until = time.monotonic() + self.REDIS_RETRY_AFTER
+
+        return self._reserve_local()
+
+    async def acquire(self):
+        """Token olish; navbat max_wait dan uzun bo'lsa RateLimited"""
+        wait = self._reserve()
+        if wait < 0:
+            raise RateLimited(f"{self.key}: rate limit exceeded")
+        if wait:
+            await asyncio.sleep(wait)
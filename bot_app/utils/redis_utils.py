@@ -0,0 +1,36 @@
+# utils/redis_utils.py
+import threading
+from typing import Optional
+
+import redis
+from redis.exceptions import RedisError
+
+from configuration import env
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+
+
+class RedisNotConfigured(RedisError):
+    """REDIS_URL bo'sh (LocMem cache rejimi): Redis ishlamayotgandek qaraladi"""
+
+
+def redis_configured() -> bool:
+    return bool(env.REDIS_URL)
+
+
+def get_redis() -> redis.Redis:
+    """REDIS_URL bo'yicha umumiy (thread-safe, connection pool li) Redis client"""
+    global _client
+    if not redis_configured():
+        raise RedisNotConfigured("REDIS_URL is not set")
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    env.REDIS_URL,
+                    socket_connect_timeout=1,
+                    socket_timeout=1,
+                    health_check_interval=30,
+                )
+    return _client
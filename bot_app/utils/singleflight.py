@@ -0,0 +1,139 @@
+# utils/singleflight.py
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from redis.exceptions import RedisError
+
+from .redis_utils import get_redis, redis_configured
+
+logger = logging.getLogger(__name__)
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Bir xil kalit uchun parallel so'rovlarni bitta so'rovga birlashtirish.
+
+    Process ichida: birinchi chaqiruvchi (leader) so'rovni bajaradi, qolganlari
+    uning natijasini kutadi. Processlar orasida: leader Redis lock oladi,
+    lock ni ololmagan process natija cache ga tushishini (peek) kutadi.
+    Redis ishlamasa faqat process ichidagi birlashtirish qoladi.
+    """
+
+    REDIS_RETRY_AFTER = 30  # Redis xatosidan keyin qayta urinishgacha (sekund)
+
+    def __init__(
+            self,
+            namespace: str,
+            lock_timeout: float = 15,
+            wait_timeout: float = 12,
+            poll_interval: float = 0.05,
+    ):
+        self.namespace = namespace
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+
+    async def do(
+            self,
+            key: str,
+            fetch: Callable[[], Awaitable[Any]],
+            peek: Optional[Callable[[], Any]] = None,
+    ) -> Any:
+        """
+        fetch() ni kalit bo'yicha bir marta bajarish.
+        peek() - boshqa process natijasini cache dan o'qish (None - hali yo'q).
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+
+        # Future thread-safe: kutuvchilar boshqa event loop da bo'lishi mumkin (async_to_sync)
+        if not is_leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await self._fetch_across_processes(key, fetch, peek)
+        except asyncio.CancelledError:
+            future.set_exception(RuntimeError(f"single-flight leader cancelled: {key}"))
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _mark_redis_down(self, error: Exception):
+        logger.warning(f"Single-flight Redis unavailable, process-local only: {error}")
+        self._redis_down_until = time.monotonic() + self.REDIS_RETRY_AFTER
+
+    async def _fetch_across_processes(self, key, fetch, peek):
+        # REDIS_URL siz faqat process ichidagi birlashtirish
+        if peek is None or not redis_configured() or not self._redis_available():
+            return await fetch()
+
+        lock_key = f"singleflight:{self.namespace}:{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            client = get_redis()
+            acquired = client.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000))
+        except RedisError as e:
+            self._mark_redis_down(e)
+            return await fetch()
+
+        if acquired:
+            try:
+                return await fetch()
+            finally:
+                try:
+                    client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except RedisError as e:
+                    self._mark_redis_down(e)
+
+        # Boshqa process so'rov yubormoqda - natija cache ga tushishini kutamiz
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+
+            value = peek()
+            if value is not None:
+                return value
+
+            try:
+                if not client.exists(lock_key):
+                    break
+            except RedisError as e:
+                self._mark_redis_down(e)
+                break
+
+        # Leader natijani cache ga yozmagan (xato yoki timeout) - o'zimiz olamiz
+        value = peek()
+        if value is not None:
+            return value
+        return await fetch()
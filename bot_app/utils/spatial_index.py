@@ -0,0 +1,149 @@
+# utils/spatial_index.py
+import heapq
+import math
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .distance_utils import EARTH_RADIUS_KM, distances_from_point
+
+
+def to_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    """Kenglik/uzunlikni birlik sferadagi 3D nuqtaga o'tkazish"""
+    lat_rad = math.radians(lat)
+    lon_rad = math.radians(lon)
+    cos_lat = math.cos(lat_rad)
+    return cos_lat * math.cos(lon_rad), cos_lat * math.sin(lon_rad), math.sin(lat_rad)
+
+
+def km_to_chord(distance_km: float) -> float:
+    """Katta doira masofasini (km) vatar uzunligiga aylantirish"""
+    angle = min(distance_km / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+class KDTree:
+    """
+    Koordinatalar uchun 3D k-d tree.
+
+    Nuqtalar birlik sferaga proyeksiya qilinadi, shuning uchun bo'linish
+    tekisliklari 180-meridian atrofida ham to'g'ri ishlaydi. Barglardagi
+    nuqtalar gacha masofa vektorlashgan haversine bilan bir martada hisoblanadi.
+    """
+
+    LEAF_SIZE = 64
+
+    def __init__(self, points: Sequence[Tuple[float, float]], payloads: Optional[Sequence[Any]] = None):
+        if payloads is not None and len(payloads) != len(points):
+            raise ValueError("points va payloads uzunligi bir xil bo'lishi kerak")
+
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self._lats = coords[:, 0]
+        self._lons = coords[:, 1]
+
+        lat_rad = np.radians(self._lats)
+        lon_rad = np.radians(self._lons)
+        self._xyz = np.column_stack((
+            np.cos(lat_rad) * np.cos(lon_rad),
+            np.cos(lat_rad) * np.sin(lon_rad),
+            np.sin(lat_rad),
+        ))
+
+        self._payloads = list(payloads) if payloads is not None else list(range(len(coords)))
+        self._root = self._build(np.arange(len(coords)), 0) if len(coords) else None
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def _build(self, indexes: np.ndarray, depth: int):
+        if len(indexes) <= self.LEAF_SIZE:
+            return indexes
+
+        axis = depth % 3
+        median = len(indexes) // 2
+        order = indexes[np.argpartition(self._xyz[indexes, axis], median)]
+        split = self._xyz[order[median], axis]
+
+        return (
+            split,
+            axis,
+            self._build(order[:median], depth + 1),
+            self._build(order[median:], depth + 1),
+        )
+
+    def _leaf_distances(self, lat: float, lon: float, indexes: np.ndarray) -> np.ndarray:
+        return distances_from_point(lat, lon, self._lats[indexes], self._lons[indexes])
+
+    def nearest(
+            self,
+            lat: float,
+            lon: float,
+            k: int = 1,
+            max_distance_km: Optional[float] = None
+    ) -> List[Tuple[Any, float]]:
+        """Eng yaqin k ta nuqta: [(payload, distance_km), ...] masofa bo'yicha saralangan"""
+        if k <= 0 or self._root is None:
+            return []
+
+        target = to_xyz(lat, lon)
+        limit_km = max_distance_km if max_distance_km is not None else float('inf')
+        heap: List[Tuple[float, int]] = []  # (-distance_km, index) max-heap
+
+        def bound_km() -> float:
+            return limit_km if len(heap) < k else min(limit_km, -heap[0][0])
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+
+            if isinstance(node, np.ndarray):
+                distances = self._leaf_distances(lat, lon, node)
+                for index, distance in zip(node.tolist(), distances.tolist()):
+                    if distance > limit_km:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-distance, index))
+                    elif distance < -heap[0][0]:
+                        heapq.heapreplace(heap, (-distance, index))
+                continue
+
+            split, axis, left, right = node
+            diff = target[axis] - split
+            near, far = (left, right) if diff <= 0 else (right, left)
+
+            bound = bound_km()
+            if bound == float('inf') or abs(diff) <= km_to_chord(bound):
+                stack.append(far)
+            stack.append(near)
+
+        result = sorted((-neg, index) for neg, index in heap)
+        return [(self._payloads[index], distance) for distance, index in result]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[Any, float]]:
+        """Radius ichidagi barcha nuqtalar: [(payload, distance_km), ...] masofa bo'yicha saralangan"""
+        if self._root is None:
+            return []
+
+        target = to_xyz(lat, lon)
+        limit = km_to_chord(radius_km)
+        found: List[Tuple[float, int]] = []
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+
+            if isinstance(node, np.ndarray):
+                distances = self._leaf_distances(lat, lon, node)
+                mask = distances <= radius_km
+                found.extend(zip(distances[mask].tolist(), node[mask].tolist()))
+                continue
+
+            split, axis, left, right = node
+            diff = target[axis] - split
+            near, far = (left, right) if diff <= 0 else (right, left)
+            stack.append(near)
+            if abs(diff) <= limit:
+                stack.append(far)
+
+        found.sort()
+        return [(self._payloads[index], distance) for distance, index in found]
@@ -0,0 +1,99 @@
+# utils/text_search.py
+import re
+import unicodedata
+from typing import Any, FrozenSet, Iterable, List
+
+# Kirill (o'zbek + rus) -> lotin. Apostrofli harflar (o', g') apostrofsiz yoziladi,
+# chunki foydalanuvchilar ularni har xil belgilar bilan yozishadi yoki umuman yozmaydi.
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'ғ': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'қ': 'q', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'ў': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'x', 'ҳ': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '',
+    'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+
+# Rus va o'zbek yozuvidagi farqlarni bir xil ko'rinishga keltirish:
+# Samarkand / Samarqand, Khiva / Xiva
+PHONETIC_FOLDS = (('kh', 'x'), ('q', 'k'))
+
+SEPARATOR = ' | '
+
+_TRANSLATION = str.maketrans(CYRILLIC_TO_LATIN)
+_APOSTROPHES = re.compile(r"['`ʻʼ‘’]")
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    """Qidiruv uchun matn: kichik harf, lotin yozuvi, faqat [a-z0-9] va bitta probel"""
+    text = unicodedata.normalize('NFKC', text or '').lower().translate(_TRANSLATION)
+    # Diakritikalarni olib tashlash (é -> e)
+    text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    text = _APOSTROPHES.sub('', text)
+    text = _NON_ALNUM.sub(' ', text).strip()
+    for source, target in PHONETIC_FOLDS:
+        text = text.replace(source, target)
+    return text
+
+
+def collect_strings(value: Any) -> List[str]:
+    """JSON qiymatidagi barcha satrlar (City.translate uchun)"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return [s for item in value for s in collect_strings(item)]
+    return []
+
+
+def build_search_text(values: Iterable[str]) -> str:
+    """Normalizatsiya qilingan nomlar SEPARATOR bilan, takrorlarsiz"""
+    names = []
+    for value in values:
+        name = normalize(value)
+        if name and name not in names:
+            names.append(name)
+    return SEPARATOR.join(names)
+
+
+def split_search_text(search_text: str) -> List[str]:
+    return [name for name in search_text.split(SEPARATOR) if name]
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """pg_trgm uslubidagi trigramlar: har bir so'z "  " va " " bilan o'raladi"""
+    result = set()
+    for word in text.split():
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """pg_trgm similarity(): umumiy trigramlar / barcha trigramlar"""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def match_score(query: str, query_trigrams: FrozenSet[str], name: str, min_similarity: float) -> float:
+    """
+    Normalizatsiya qilingan so'rov va nom uchun ball (0..1):
+    to'liq moslik > nom boshi > so'z boshi > ichida > trigram o'xshashligi.
+    """
+    if name == query:
+        return 1.0
+    if name.startswith(query):
+        return 0.9
+    if f' {query}' in f' {name}':
+        return 0.8
+    if query in name:
+        return 0.7
+
+    # So'rov nomning bitta so'ziga o'xshash bo'lishi yetarli (pg_trgm word_similarity ga yaqin)
+    best = similarity(query_trigrams, trigrams(name))
+    for word in name.split():
+        best = max(best, similarity(query_trigrams, trigrams(word)))
+    return 0.6 * best if best >= min_similarity else 0.0
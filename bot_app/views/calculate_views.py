@@ -1,22 +1,47 @@
 import json
 
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from ..services.tariff_service import TariffError, tariff_engine
+
+MAX_BATCH_ROUTES = 200
 
 
 @csrf_exempt
+@require_POST
 def calculate(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "JSON noto'g'ri"}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"status": "error", "message": "JSON obyekt kutilgan"}, status=400)
+
+    try:
+        quote = tariff_engine.calculate(data)
+    except TariffError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
-    result = json.loads(request.body)
+    return JsonResponse({"status": "success", **quote})
 
-    jsons = {
-        "status": "success",
-        "car_class": {
-            "comfort": 230_000,
-            "economy": 450_000,
-            "standard": 500_000
 
-        }
-    }
+@csrf_exempt
+@require_POST
+def calculate_batch(request):
+    """{"routes": [{"from": .., "to": .., "car_class": [..], "passengers": 1}, ...]}"""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "JSON noto'g'ri"}, status=400)
+
+    routes = data.get("routes") if isinstance(data, dict) else data
+    if not isinstance(routes, list) or not routes:
+        return JsonResponse({"status": "error", "message": "routes ro'yxati talab qilinadi"}, status=400)
+    if len(routes) > MAX_BATCH_ROUTES:
+        return JsonResponse(
+            {"status": "error", "message": f"Bir so'rovda ko'pi bilan {MAX_BATCH_ROUTES} ta yo'nalish"}, status=400
+        )
 
-    return JsonResponse(jsons)
+    return JsonResponse({"status": "success", "results": tariff_engine.calculate_batch(routes)})
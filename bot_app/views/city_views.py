@@ -1,5 +1,4 @@
 from asgiref.sync import async_to_sync, sync_to_async
-from django.db.models import Q, Prefetch
 from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -8,7 +7,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 import logging
 
-from ..filters.city_filters import CityFilter
+from ..filters.city_filters import CityFilter, CitySearchFilter
 from ..models import City, CityPrice
 from ..serializers.city import (
     CitySerializer,
@@ -19,28 +18,45 @@ from ..serializers.city import (
     CityValidationResponseSerializer,
     NearbyCitiesResponseSerializer
 )
+from ..services.city_catalog import city_catalog, city_catalog_queryset
+from ..services.city_search import city_search
 from ..services.location_service import GlobalLocationService
 
 logger = logging.getLogger(__name__)
 
 
 class CityViewSet(viewsets.ModelViewSet):
-    queryset = City.objects.filter(is_allowed=True).prefetch_related(
-        Prefetch('cityprice', queryset=CityPrice.objects.only('economy', 'comfort', 'standard'))
-    )
+    queryset = city_catalog_queryset()
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, CitySearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_allowed', 'subcategory']
     filterset_class = CityFilter
     search_fields = ['title']
     ordering_fields = ['title', 'created_at', 'updated_at']
     ordering = ['title']
 
+    # Bu parametrlar bo'lmasa ro'yxat city_catalog snapshotidan beriladi
+    CATALOG_QUERY_PARAMS = {'page', 'format'}
+
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return CityCreateSerializer
         return CitySerializer
 
+    def list(self, request, *args, **kwargs):
+        if not set(request.query_params) <= self.CATALOG_QUERY_PARAMS:
+            return super().list(request, *args, **kwargs)
+
+        version, cities = city_catalog.get()
+        etag = city_catalog.etag(version)
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        page = self.paginate_queryset(cities)
+        response = self.get_paginated_response(page) if page is not None else Response(cities)
+        response['ETag'] = etag
+        return response
+
     def create(self, request, *args, **kwargs):
         """Sync wrapper for async create"""
         return async_to_sync(self._async_create)(request, *args, **kwargs)
@@ -252,7 +268,7 @@ class CityViewSet(viewsets.ModelViewSet):
         """Get location information for a city"""
         city = await sync_to_async(self.get_object)()
 
-        city_coords = await GlobalLocationService.get_city_coordinates(city.title)
+        city_coords = await GlobalLocationService.resolve_city_coordinates(city)
         if not city_coords:
             return Response({
                 "error": "Shahar uchun lokatsiya ma'lumotlari topilmadi"
@@ -285,20 +301,23 @@ class CityViewSet(viewsets.ModelViewSet):
                 "error": "name parametri talab qilinadi"
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 50)
+        except ValueError:
+            limit = 20
+
         @sync_to_async
         def get_cities():
-            return list(City.objects.filter(
-                Q(title__icontains=city_name) | Q(title__iexact=city_name),
-                is_allowed=True
-            ).prefetch_related(
-                Prefetch('cityprice', queryset=CityPrice.objects.only('economy', 'comfort', 'standard'))
-            ))
+            # Ball bo'yicha tartib saqlanadi
+            ranked = city_search.search(city_name, limit=limit)
+            cities = city_catalog_queryset().in_bulk([city_id for city_id, _ in ranked])
+            return [cities[city_id] for city_id, _ in ranked if city_id in cities]
 
         cities = await get_cities()
 
         results = []
         for city in cities:
-            city_coords = await GlobalLocationService.get_city_coordinates(city.title)
+            city_coords = await GlobalLocationService.resolve_city_coordinates(city)
 
             city_data = await sync_to_async(self._prepare_city_response)(city, request)
 
@@ -1,4 +1,8 @@
 # bot_app/views/driver_views.py
+import logging
+import math
+
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
@@ -6,17 +10,24 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Sum
-from ..models import DriverStatus, Driver, DriverTransaction
+from redis.exceptions import RedisError
+
+from configuration import env
+from ..models import DriverStatus, Driver, DriverTransaction, TransactionKind
 from ..serializers.driver import DriverSerializer, DriverListSerializer, DriverUpdateSerializer, \
-    DriverTransactionSerializer, DriverCreateSerializer
+    DriverTransactionSerializer, DriverCreateSerializer, with_driver_relations
 from ..filters.driver_filter import DriverFilter, DriverTransactionFilter
+from ..services.driver_ledger import api_idempotency_key, driver_ledger
+from ..services.driver_locations import MAX_LATITUDE, driver_locations
+
+logger = logging.getLogger(__name__)
 
 
 class DriverViewSet(viewsets.ModelViewSet):
     """
     Driverlar uchun ViewSet
     """
-    queryset = Driver.objects.all()
+    queryset = with_driver_relations(Driver.objects.all())
     serializer_class = DriverSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -51,7 +62,7 @@ class DriverViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        driver = get_object_or_404(Driver, telegram_id=telegram_id)
+        driver = get_object_or_404(self.get_queryset(), telegram_id=telegram_id)
         serializer = self.get_serializer(driver)
         return Response(serializer.data)
 
@@ -68,7 +79,8 @@ class DriverViewSet(viewsets.ModelViewSet):
             )
 
         driver.status = new_status
-        driver.save()
+        # post_save signali driver registry ni yangilaydi
+        driver.save(update_fields=['status', 'updated_at'])
 
         return Response({
             'message': 'Status updated successfully',
@@ -76,6 +88,58 @@ class DriverViewSet(viewsets.ModelViewSet):
             'status_display': driver.get_status_display()
         })
 
+    @action(detail=False, methods=['post'])
+    def heartbeat(self, request):
+        """
+        Driver bot dan GPS ping lar to'plami:
+        {"pings": [{"telegram_id" | "driver_id", "latitude", "longitude", "timestamp"?}, ...]}
+        """
+        pings = request.data.get('pings') if isinstance(request.data, dict) else request.data
+        if not isinstance(pings, list):
+            return Response({'error': 'pings list is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(pings) > env.DRIVER_HEARTBEAT_MAX_BATCH:
+            return Response(
+                {'error': f'At most {env.DRIVER_HEARTBEAT_MAX_BATCH} pings per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            result = driver_locations.ingest(pings)
+        except RedisError as e:
+            logger.error(f"Heartbeat ingest failed: {e}")
+            return Response({'error': 'Location store unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(result)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Nuqta atrofidagi online haydovchilar (oxirgi GPS pozitsiyasi bo'yicha), eng yaqini birinchi"""
+        try:
+            lat = float(request.query_params['lat'])
+            lon = float(request.query_params['lon'])
+            radius_km = min(float(request.query_params.get('radius_km', 5)), 100)
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'lat and lon are required, radius_km and limit must be numbers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # NaN taqqoslashlarda False: chegaralar tekshiruvidan o'tolmaydi
+        if not (-MAX_LATITUDE <= lat <= MAX_LATITUDE and -180 <= lon <= 180):
+            return Response({'error': 'lat/lon out of range'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (math.isfinite(radius_km) and radius_km > 0) or limit < 1:
+            return Response(
+                {'error': 'radius_km must be positive and limit at least 1'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            drivers = driver_locations.nearby(lat, lon, radius_km, limit)
+        except RedisError as e:
+            logger.error(f"Nearby drivers query failed: {e}")
+            return Response({'error': 'Location store unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({'count': len(drivers), 'results': drivers})
+
     @action(detail=False, methods=['get'])
     def search(self, request):
         """Driverlarni qidirish"""
@@ -87,7 +151,7 @@ class DriverViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        drivers = Driver.objects.filter(
+        drivers = with_driver_relations(Driver.objects.all()).filter(
             Q(from_location__icontains=query) |
             Q(to_location__icontains=query) |
             Q(phone__icontains=query)
@@ -98,9 +162,14 @@ class DriverViewSet(viewsets.ModelViewSet):
 
 class DriverTransactionViewSet(viewsets.ModelViewSet):
     """
-    Driver transaksiyalari uchun ViewSet
+    Driver transaksiyalari uchun ViewSet.
+    API orqali yozilgan yozuvlar avvalgidek faqat qayd (legacy) - balansni o'zgartirmaydi
+    va ledger yig'indisiga kirmaydi. Ledger yozuvlarini (komissiya, tuzatish, ...)
+    o'zgartirish/o'chirish mumkin emas.
     """
-    queryset = DriverTransaction.objects.all().select_related('driver')
+    queryset = DriverTransaction.objects.all().select_related(
+        'driver__drivergallery', 'driver__from_location'
+    ).defer('driver__from_location__boundary')
     serializer_class = DriverTransactionSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -108,6 +177,27 @@ class DriverTransactionViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'amount']
     ordering = ['-created_at']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('update', 'partial_update', 'destroy'):
+            queryset = queryset.filter(kind=TransactionKind.LEGACY)
+        return queryset
+
+    def perform_create(self, serializer):
+        key = api_idempotency_key(serializer.validated_data.pop('idempotency_key', None))
+        if key is None:
+            serializer.save(kind=TransactionKind.LEGACY)
+            return
+        try:
+            with transaction.atomic():
+                serializer.save(kind=TransactionKind.LEGACY, idempotency_key=key)
+        except IntegrityError:
+            serializer.instance = DriverTransaction.objects.get(idempotency_key=key)
+
+    def perform_update(self, serializer):
+        serializer.validated_data.pop('idempotency_key', None)
+        serializer.save()
+
     @action(detail=False, methods=['get'])
     def driver_stats(self, request):
         """Driver statistikasi"""
@@ -126,7 +216,7 @@ class DriverTransactionViewSet(viewsets.ModelViewSet):
 
             return Response({
                 'driver_id': driver_id,
-                'driver_name': driver.from_location,
+                'driver_name': str(driver.from_location) if driver.from_location_id else None,
                 'total_earnings': total_earnings,
                 'transaction_count': transactions.count(),
                 'current_balance': driver.amount
@@ -147,9 +237,13 @@ class DriverTransactionViewSet(viewsets.ModelViewSet):
                 {'error': 'driver_id parameter is required'},
             )
         try:
+            driver_ledger.post(
+                int(driver_id),
+                -float(price),
+                TransactionKind.CHARGE,
+                idempotency_key=api_idempotency_key(request.query_params.get('idempotency_key')),
+            )
             driver = Driver.objects.get(id=driver_id)
-            driver.amount -= float(price)
-            driver.save()
             return Response({
                 'driver': DriverSerializer(driver).data,
 
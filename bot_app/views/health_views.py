@@ -4,6 +4,8 @@ from django.http import JsonResponse
 from django.views import View
 import logging
 
+from ..services.geocode_cache import geocode_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,5 +17,6 @@ class HealthView(View):
         return JsonResponse({
             "status": "healthy",
             "service": "event-backend",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "geocode_cache": geocode_cache.stats(),
         })
\ No newline at end of file
@@ -1,14 +1,44 @@
 # views.py
+from dataclasses import asdict
+
 from rest_framework import viewsets, filters, status
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, PermissionDenied, ValidationError
 from rest_framework.response import Response
 
-from ..models import Order
+from ..models import Driver, Order, TravelStatus
 from ..serializers.order import (
     OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer, OrderListSerializer,
 )
 from ..filters.order_filters import OrderFilter
+from ..services.dispatch_service import dispatch_engine
+from ..services.order_service import (
+    OrderTransitionError, accept_order, get_order_state, transition_order,
+)
+
+
+class OrderConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Order allaqachon boshqa haydovchiga biriktirilgan"
+    default_code = "conflict"
+
+
+NOT_OFFERED = "Order bu haydovchiga taklif qilinmagan"
+
+
+def _conflict_response(order_id):
+    """Shart bajarilmadi: joriy holat (faqat yutqazgan so'rov uchun bitta SELECT)"""
+    current = get_order_state(order_id)
+    if current is None:
+        return Response({'error': 'Order topilmadi'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'error': 'conflict', 'order': asdict(current)}, status=status.HTTP_409_CONFLICT)
+
+
+def _int_or_none(value):
+    if value in (None, ""):
+        return None
+    return int(value)
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -34,9 +64,112 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderListSerializer
         return OrderSerializer
 
+    def perform_update(self, serializer):
+        """
+        status/driver o'zgarishlari shartli UPDATE lar orqali: biriktirish accept_order,
+        status transition_order (version bilan), haydovchi almashtirish faqat driver ustuni
+        """
+        order = serializer.instance
+        data = serializer.validated_data
+        driver = data.get('driver')
+        new_status = data.get('status')
+
+        if driver is not None and driver.pk != order.driver_id:
+            # accept dagi kabi: haydovchi dispatch qoidalariga mos va order unga taklif qilingan
+            reason = dispatch_engine.ineligibility(order.pk, driver.pk)
+            if reason:
+                raise ValidationError({'driver': reason})
+            if not dispatch_engine.can_accept(order.pk, driver.pk):
+                raise PermissionDenied(NOT_OFFERED)
+
+        # Bo'sh orderga haydovchi biriktirish - accept bilan bir xil shartli UPDATE
+        if (driver is not None and order.driver_id is None
+                and new_status in (None, TravelStatus.CREATED, TravelStatus.ASSIGNED)):
+            if accept_order(order.pk, driver.pk) is None:
+                raise OrderConflict()
+            serializer.instance = self.get_queryset().get(pk=order.pk)
+            return
+
+        if 'driver' in data and (driver.pk if driver else None) != order.driver_id:
+            order.driver = driver
+            order.save(update_fields=['driver', 'updated_at'])
+
+        if new_status is not None and new_status != order.status:
+            try:
+                state = transition_order(order.pk, new_status, expected_version=order.version)
+            except OrderTransitionError as e:
+                raise ValidationError({'status': str(e)})
+            if state is None:
+                raise OrderConflict("Order holati o'zgargan, qayta yuklang")
+
+        serializer.instance = self.get_queryset().get(pk=order.pk)
+
+    @action(detail=True, methods=['post'])
+    def accept(self, request, pk=None):
+        """
+        Haydovchi orderni qabul qiladi: {"driver_id" | "telegram_id"}.
+        Bitta shartli UPDATE: parallel qabul qilishlardan faqat bittasi 200 oladi, qolganlari 409.
+        """
+        try:
+            order_id = int(pk)
+            driver_id = _int_or_none(request.data.get('driver_id'))
+            telegram_id = _int_or_none(request.data.get('telegram_id'))
+        except (TypeError, ValueError):
+            return Response({'error': 'order id, driver_id va telegram_id butun son bo\'lishi kerak'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if driver_id is None and telegram_id is not None:
+            driver_id = Driver.objects.filter(telegram_id=telegram_id).values_list('id', flat=True).first()
+        if driver_id is None:
+            return Response({'error': 'Driver topilmadi'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Haydovchi mavjud va dispatch qoidalariga mos (dispatch qilinmagan order uchun ham)
+        reason = dispatch_engine.ineligibility(order_id, driver_id)
+        if reason:
+            return Response({'error': reason}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Dispatch qilingan order ni faqat taklif olgan haydovchilar qabul qiladi
+        if not dispatch_engine.can_accept(order_id, driver_id):
+            return Response({'error': NOT_OFFERED}, status=status.HTTP_403_FORBIDDEN)
+
+        state = accept_order(order_id, driver_id)
+        if state is None:
+            return _conflict_response(order_id)
+        return Response(asdict(state), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def transition(self, request, pk=None):
+        """
+        Status o'tishi: {"status", "driver_id"?, "version"?}. Joriy status ruxsat
+        etilmagan, haydovchi yoki version mos kelmasa 409 va orderning joriy holati.
+        """
+        try:
+            order_id = int(pk)
+            driver_id = _int_or_none(request.data.get('driver_id'))
+            version = _int_or_none(request.data.get('version'))
+        except (TypeError, ValueError):
+            return Response({'error': 'order id, driver_id va version butun son bo\'lishi kerak'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            state = transition_order(order_id, request.data.get('status'), driver_id, version)
+        except OrderTransitionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if state is None:
+            return _conflict_response(order_id)
+        return Response(asdict(state), status=status.HTTP_200_OK)
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
+        # OrderListSerializer driverlarni o'zi batch qilib oladi
+        if self.action != 'list':
+            queryset = queryset.select_related(
+                'driver__drivergallery', 'driver__from_location', 'driver__to_location'
+            ).defer(
+                'driver__from_location__boundary', 'driver__to_location__boundary'
+            ).prefetch_related('driver__driver')
+
         # Dynamic filtering based on query parameters
         status_list = self.request.query_params.get('status_list')
         if status_list:
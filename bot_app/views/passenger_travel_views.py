@@ -8,6 +8,7 @@ from django.db.models import Q
 
 from ..filters.passenger_travel_filter import PassengerTravelFilter
 from ..models import PassengerTravel
+from ..services.city_search import city_search
 from ..serializers.passenger_travel import (
     PassengerTravelSerializer,
     PassengerTravelCreateSerializer,
@@ -60,18 +61,16 @@ class PassengerTravelViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def search_routes(self, request):
-        """Search for travels by from and to locations (JSON field uchun)"""
+        """Search for travels by from and to locations (materialized city ustunlari orqali)"""
         from_city = request.query_params.get('from')
         to_city = request.query_params.get('to')
 
         queryset = self.filter_queryset(self.get_queryset())
 
         if from_city:
-            # JSON field ichida qidirish
-            queryset = queryset.filter(from_location__city__icontains=from_city)
+            queryset = queryset.filter(self._city_query('from_city', from_city))
         if to_city:
-            # JSON field ichida qidirish
-            queryset = queryset.filter(to_location__city__icontains=to_city)
+            queryset = queryset.filter(self._city_query('to_city', to_city))
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
@@ -88,13 +87,21 @@ class PassengerTravelViewSet(viewsets.ModelViewSet):
 
         # from_location yoki to_location da qidirish
         queryset = self.filter_queryset(self.get_queryset()).filter(
-            Q(from_location__city__icontains=search_term) |
-            Q(to_location__city__icontains=search_term)
+            self._city_query('from_city', search_term) |
+            self._city_query('to_city', search_term)
         )
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @staticmethod
+    def _city_query(field, term):
+        """
+        Katalogdagi mos shaharlarning barcha nomlari bo'yicha (Тошкент -> Toshkent)
+        yoki katalogda yo'q erkin matn uchun icontains
+        """
+        return Q(**{f'{field}__in': city_search.match_names(term)}) | Q(**{f'{field}__icontains': term})
+
     def get_queryset(self):
         """Asosiy queryset - JSON fieldlarni optimize qilish"""
         queryset = super().get_queryset()
@@ -195,6 +195,32 @@ CORS_ALLOW_HEADERS = [
 CELERY_BROKER_URL = env.REDIS_URL
 CELERY_RESULT_BACKEND = env.REDIS_URL
 
+# Barcha gunicorn/celery processlari uchun umumiy cache.
+# Kalitlar "<KEY_PREFIX>:<VERSION>:<namespace>:..." ko'rinishida saqlanadi.
+if env.REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': env.REDIS_URL,
+            'KEY_PREFIX': env.CACHE_KEY_PREFIX,
+            'VERSION': env.CACHE_VERSION,
+            'TIMEOUT': env.CACHE_DEFAULT_TIMEOUT,
+            'OPTIONS': {
+                'socket_connect_timeout': 1,
+                'socket_timeout': 1,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'KEY_PREFIX': env.CACHE_KEY_PREFIX,
+            'VERSION': env.CACHE_VERSION,
+            'TIMEOUT': env.CACHE_DEFAULT_TIMEOUT,
+        }
+    }
+
 SWAGGER_SETTINGS = {
     'DEFAULT_MODEL_RENDERING': 'example',
     'USE_SESSION_AUTH': False,
@@ -29,10 +29,60 @@ class EventSettings(BaseSettings):
     # redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # django cache (REDIS_URL dagi Redis; REDIS_URL bo'sh bo'lsa LocMem)
+    CACHE_KEY_PREFIX: str = "goz"
+    CACHE_VERSION: int = 1
+    CACHE_DEFAULT_TIMEOUT: int = 300
+
     # passenger / driver
     PASSENGER_BOT_URL: str = "http://localhost:8888"
     DRIVER_BOT_URL: str = "http://localhost:8080"
 
+    # geocoder backend: nominatim | local | stub
+    GEOCODER_BACKEND: str = "nominatim"
+    GEOCODER_DATASET_PATH: str = ""
+    GEOCODER_LOCAL_MAX_DISTANCE_KM: float = 50
+
+    # nominatim http pool
+    NOMINATIM_TIMEOUT: float = 10
+    NOMINATIM_POOL_LIMIT: int = 20
+    NOMINATIM_POOL_LIMIT_PER_HOST: int = 10
+    NOMINATIM_KEEPALIVE_TIMEOUT: float = 60
+
+    # nominatim throttling (public Nominatim: ~1 req/s)
+    NOMINATIM_RATE_LIMIT: float = 1.0
+    NOMINATIM_BURST: int = 1
+    NOMINATIM_MAX_WAIT: float = 2
+    NOMINATIM_FAILURE_THRESHOLD: int = 5
+    NOMINATIM_RESET_TIMEOUT: float = 30
+
+    # reverse-geocode cache (geohash precision 7 ~ 150m katak)
+    GEOCODE_GEOHASH_PRECISION: int = 7
+    GEOCODE_LRU_SIZE: int = 10000
+    GEOCODE_LRU_TTL: float = 3600
+    GEOCODE_CACHE_TTL: int = 7 * 24 * 3600
+    GEOCODE_DB_TTL_DAYS: int = 180
+
+    # city search: auto (PostgreSQL da trigram indeks, aks holda xotiradagi indeks) | memory | postgres
+    CITY_SEARCH_BACKEND: str = "auto"
+    CITY_SEARCH_MIN_SIMILARITY: float = 0.3
+
+    # tariff: CityPrice asosida, TARIFF_INCLUDED_KM dan ortiq har km uchun qo'shimcha (so'm)
+    TARIFF_PER_KM: float = 0
+    TARIFF_INCLUDED_KM: float = 0
+    TARIFF_ROUND_TO: int = 1000
+
+    # dispatch: yangi order taklif qilinadigan haydovchilar
+    DISPATCH_TOP_K: int = 10
+    DISPATCH_MAX_ACTIVE_ORDERS: int = 4
+    DISPATCH_COMMISSION_RATE: float = 0.05
+    DISPATCH_REFRESH_INTERVAL: float = 2
+    DISPATCH_REBUILD_TTL: float = 300
+
+    # driver GPS heartbeat: pozitsiya shu sekunddan eski bo'lsa hisobga olinmaydi
+    DRIVER_LOCATION_TTL: float = 120
+    DRIVER_HEARTBEAT_MAX_BATCH: int = 1000
+
     # Telegram bot token (.env yoki environment'dan olinadi)
     MAIN_BOT: str = ""
 